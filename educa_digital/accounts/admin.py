@@ -3,7 +3,8 @@ from django.contrib import admin
 from .models import UserProfile
 
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'tipo_usuario')
+    list_display = ('user', 'tipo_usuario', 'tenant')
+    list_filter = ('tenant',)
     search_fields = ('user__email', 'user__username')
 
 admin.site.register(UserProfile, UserProfileAdmin)
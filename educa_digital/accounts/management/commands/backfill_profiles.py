@@ -0,0 +1,72 @@
+# profile/management/commands/backfill_profiles.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from educa_digital.accounts import profiles
+from educa_digital.core.routers import pin_to_primary
+from educa_digital.matricula.models import ResponsibleProfile, StudentProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Cria o UserProfile dos usuários que ainda não têm um. O tipo vem do '
+        'perfil da matrícula vinculado (responsável ou aluno); staff vira "admin". '
+        'Usuários sem tipo identificável são listados e ficam sem perfil, para revisão.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas informa quantos perfis seriam criados.')
+
+    def handle(self, *args, **options):
+        pin_to_primary()
+        User = get_user_model()
+        queryset = User.objects.filter(userprofile__isnull=True).order_by('pk')
+
+        if options['dry_run']:
+            self.stdout.write('%d usuários sem perfil.' % queryset.count())
+            return
+
+        total, last_pk, skipped = 0, 0, []
+        while True:
+            users = list(queryset.filter(pk__gt=last_pk).only('pk', 'username', 'is_staff')[:options['batch_size']])
+            if not users:
+                break
+            last_pk = users[-1].pk
+            typed = []
+            for user, tipo_usuario in self.infer_types(users):
+                if tipo_usuario is None:
+                    skipped.append(user.username)
+                else:
+                    typed.append((user, tipo_usuario))
+            profiles.provision(typed)
+            total += len(typed)
+            self.stdout.write('%d perfis criados...' % total)
+
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                '%d usuários sem tipo identificável (sem perfil de matrícula e fora da equipe) '
+                'ficaram sem perfil: %s' % (len(skipped), ', '.join(skipped))
+            ))
+        self.stdout.write(self.style.SUCCESS('%d perfis criados.' % total))
+
+    @staticmethod
+    def infer_types(users):
+        """
+        Pares (usuário, tipo_usuario), com None quando o tipo não pode ser inferido.
+        """
+        ids = [user.pk for user in users]
+        responsibles = set(ResponsibleProfile.objects.filter(user_id__in=ids).values_list('user_id', flat=True))
+        students = set(StudentProfile.objects.filter(user_id__in=ids).values_list('user_id', flat=True))
+
+        for user in users:
+            if user.is_staff:
+                tipo_usuario = 'admin'
+            elif user.pk in responsibles:
+                tipo_usuario = 'responsavel'
+            elif user.pk in students:
+                tipo_usuario = 'aluno'
+            else:
+                tipo_usuario = None
+            yield user, tipo_usuario
@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 12:56
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índice em UPPER(auth_user.email): é a expressão que o Django usa em
+    `email__iexact`, para achar usuários pelo e-mail sem varrer a tabela.
+    """
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_upper_idx ON auth_user (UPPER(email))',
+            'DROP INDEX auth_user_email_upper_idx',
+        ),
+    ]
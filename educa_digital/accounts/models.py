@@ -1,6 +1,7 @@
 # profile/models.py
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 User = get_user_model()
 
@@ -11,9 +12,17 @@ USER_TYPE_CHOICES = [
     ('admin', 'Administrador'),
 ]
 
+
+def profile_cache_key(user_id):
+    return f"user-profile:{user_id}"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     tipo_usuario = models.CharField(max_length=20, choices=USER_TYPE_CHOICES)
+    # Rede de ensino do usuário (core/tenancy.py); vazio para os usuários
+    # anteriores às redes, que pertencem à rede padrão.
+    tenant = models.ForeignKey('core.Tenant', on_delete=models.PROTECT, null=True, blank=True)
     # Adicione outros campos específicos do perfil conforme necessário, por exemplo:
     telefone = models.CharField(max_length=20, blank=True, null=True)
     endereco = models.CharField(max_length=255, blank=True, null=True)
@@ -21,3 +30,15 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.email} - {self.tipo_usuario}"
+
+    # O perfil é lido pelo cache (ver profiles.get_profile); qualquer escrita,
+    # inclusive pelo admin, descarta a cópia em cache.
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(profile_cache_key(self.user_id))
+
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        cache.delete(profile_cache_key(user_id))
+        return result
@@ -0,0 +1,34 @@
+# profile/permissions.py
+from rest_framework.permissions import IsAuthenticated
+
+from . import profiles
+
+
+class IsTenantMember(IsAuthenticated):
+    """
+    Usuário autenticado da rede ativa na requisição (core/tenancy.py). Sem
+    isso, qualquer usuário escolheria a rede pelo cabeçalho X-Tenant ou pelo
+    hostname. A equipe (is_staff) atende todas as redes.
+    """
+    message = 'Usuário não pertence a esta rede de ensino.'
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        user = request.user
+        return user.is_staff or profiles.tenant_id_of(user) == request.tenant.pk
+
+
+class IsStaffOrCanViewModel(IsTenantMember):
+    """
+    Membro da rede que seja da equipe ou tenha a permissão de visualizar o
+    modelo da view (ex.: matricula.view_enrollmentevent), concedida aos
+    usuários das integrações pela API de usuários.
+    """
+    message = 'Acesso restrito à equipe e às integrações autorizadas.'
+
+    def has_permission(self, request, view):
+        if not super().has_permission(request, view):
+            return False
+        opts = view.get_queryset().model._meta
+        return request.user.is_staff or request.user.has_perm('%s.view_%s' % (opts.app_label, opts.model_name))
@@ -0,0 +1,51 @@
+# profile/profiles.py
+"""
+Criação e leitura dos perfis (UserProfile).
+
+Os perfis são criados junto com os usuários (em lote, com o tipo e a rede
+já definidos) e lidos pelo cache, sem consultar o banco a cada requisição.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from educa_digital.core import tenancy
+
+from .models import UserProfile, profile_cache_key
+
+
+def provision(users):
+    """
+    Cria, com um único INSERT, os perfis de `users` (pares (usuário, tipo_usuario))
+    na rede ativa. Usuários que já têm perfil são ignorados.
+    """
+    tenant_id = tenancy.tenant_id_for_new_rows()
+    profiles = [
+        UserProfile(user=user, tipo_usuario=tipo_usuario, tenant_id=tenant_id) for user, tipo_usuario in users
+    ]
+    UserProfile.objects.bulk_create(profiles, ignore_conflicts=True)
+
+
+def get_profile(user):
+    """
+    Perfil do usuário: primeiro da instância (`user._profile_cache`), depois
+    do cache e só então do banco. Usuários anteriores ao provisionamento
+    (ver `backfill_profiles`) ganham um perfil no primeiro acesso.
+    """
+    profile = getattr(user, '_profile_cache', None)
+    if profile is not None:
+        return profile
+
+    key = profile_cache_key(user.pk)
+    profile = cache.get(key)
+    if profile is None:
+        profile, _ = UserProfile.objects.get_or_create(user_id=user.pk)
+        cache.set(key, profile, settings.PROFILE_CACHE_TIMEOUT)
+    user._profile_cache = profile
+    return profile
+
+
+def tenant_id_of(user):
+    """
+    Rede do usuário (a padrão para perfis sem rede).
+    """
+    return get_profile(user).tenant_id or tenancy.default_tenant().pk
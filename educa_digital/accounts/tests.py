@@ -1,3 +1,65 @@
+import io
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from educa_digital.matricula.models import ResponsibleProfile, StudentProfile
+from educa_digital.matricula.tests import create_enrollment, enrollment_payload
+from .models import UserProfile
+
+
+class UserProfileTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_enrollment_provisions_profiles(self):
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+        response = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            dict(UserProfile.objects.exclude(user__username='secretaria').values_list('user__email', 'tipo_usuario')),
+            {'lucia@example.com': 'responsavel', 'pedro@example.com': 'aluno'},
+        )
+        # Na rede da requisição
+        self.assertEqual(
+            set(UserProfile.objects.exclude(user__username='secretaria').values_list('tenant__slug', flat=True)),
+            {settings.DEFAULT_TENANT},
+        )
+
+    def test_profile_read_is_cached_and_invalidated_on_update(self):
+        user = User.objects.create_user('lucia@example.com', email='lucia@example.com', password='x')
+        UserProfile.objects.create(user=user, tipo_usuario='responsavel')
+        self.client.force_authenticate(user)
+
+        self.assertEqual(self.client.get('/profile/profile/').data['tipo_usuario'], 'responsavel')
+        with self.assertNumQueries(0):
+            response = self.client.get('/profile/profile/')
+        self.assertEqual(response.data['tipo_usuario'], 'responsavel')
+
+        response = self.client.patch('/profile/profile/', {'telefone': '11955554444'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/profile/profile/').data['telefone'], '11955554444')
+
+    def test_backfill_infers_type_from_linked_profiles(self):
+        enrollment = create_enrollment()
+        responsible = User.objects.create_user('ana@example.com', email='ana@example.com')
+        student = User.objects.create_user('maria@example.com', email='maria@example.com')
+        ResponsibleProfile.objects.filter(pk=enrollment.responsible_id).update(user=responsible)
+        StudentProfile.objects.filter(pk=enrollment.student_id).update(user=student)
+        staff = User.objects.create_user('secretaria', is_staff=True)
+        other = User.objects.create_user('outro', email='outro@example.com')
 
-# Create your tests here.
+        out = io.StringIO()
+        call_command('backfill_profiles', stdout=out)
+        self.assertEqual(
+            dict(UserProfile.objects.values_list('user_id', 'tipo_usuario')),
+            {responsible.pk: 'responsavel', student.pk: 'aluno', staff.pk: 'admin'},
+        )
+        self.assertIn('1 usuários sem tipo identificável', out.getvalue())
+        self.assertIn(other.username, out.getvalue())
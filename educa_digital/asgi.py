@@ -7,10 +7,10 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 """
 
-import os
+from educa_digital.boot import setup_environment
 
-from django.core.asgi import get_asgi_application
+setup_environment()
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'educa_digital.settings')
+from django.core.asgi import get_asgi_application
 
 application = get_asgi_application()
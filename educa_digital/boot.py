@@ -0,0 +1,12 @@
+"""
+Ambiente dos processos (manage.py, WSGI e ASGI), definido antes de importar
+o Django.
+"""
+import os
+
+
+def setup_environment(environ=os.environ):
+    environ.setdefault('DJANGO_SETTINGS_MODULE', 'educa_digital.settings')
+    # O Django 3.2 importa distutils no boot; usar o da stdlib evita carregar
+    # setuptools/pkg_resources (~150 ms a menos por processo).
+    environ.setdefault('SETUPTOOLS_USE_DISTUTILS', 'stdlib')
@@ -0,0 +1,12 @@
+# core/admin.py
+from django.contrib import admin
+from .models import Tenant
+
+
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'slug', 'hostname', 'ativo')
+    list_filter = ('ativo',)
+    search_fields = ('nome', 'slug', 'hostname')
+    prepopulated_fields = {'slug': ('nome',)}
+
+admin.site.register(Tenant, TenantAdmin)
@@ -0,0 +1,168 @@
+# core/db/postgresql/base.py
+"""
+Backend PostgreSQL com health check de conexões persistentes e pool
+opcional de conexões por processo (worker).
+
+Configuração em settings.DATABASES['<alias>']:
+
+    'CONN_HEALTH_CHECKS': True,   # testa a conexão reaproveitada no 1º uso da requisição
+    'POOL': {
+        'ENABLED': True,
+        'MIN_SIZE': 1,            # conexões mantidas abertas no pool
+        'MAX_SIZE': 10,           # limite de conexões simultâneas do worker
+        'TIMEOUT': 10,            # segundos aguardando uma conexão livre
+    },
+
+Com o pool ativo, fechar a conexão (fim da requisição com CONN_MAX_AGE=0)
+apenas a devolve ao pool.
+"""
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from psycopg2 import OperationalError, pool as psycopg2_pool
+
+Database = base.Database
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """
+    Pool de conexões psycopg2 limitado a MAX_SIZE, com espera de até
+    TIMEOUT segundos por uma conexão livre.
+    """
+
+    def __init__(self, conn_params, min_size=1, max_size=10, timeout=10):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._pool = psycopg2_pool.ThreadedConnectionPool(min_size, max_size, **conn_params)
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                'Nenhuma conexão livre no pool após %s segundos.' % self.timeout
+            )
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close=False):
+        try:
+            self._pool.putconn(connection, close=close or bool(connection.closed))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+
+def get_pool(alias, conn_params, options):
+    """
+    Retorna o pool do alias para o processo atual. O pool é recriado após
+    um fork (ex.: workers do gunicorn com --preload).
+    """
+    key = (alias, os.getpid())
+    connection_pool = _pools.get(key)
+    if connection_pool is None:
+        with _pools_lock:
+            connection_pool = _pools.get(key)
+            if connection_pool is None:
+                connection_pool = ConnectionPool(
+                    conn_params,
+                    min_size=options.get('MIN_SIZE', 1),
+                    max_size=options.get('MAX_SIZE', 10),
+                    timeout=options.get('TIMEOUT', 10),
+                )
+                _pools[key] = connection_pool
+    return connection_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    connection_pool = None
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_options(self):
+        options = self.settings_dict.get('POOL') or {}
+        return options if options.get('ENABLED') else None
+
+    def get_new_connection(self, conn_params):
+        options = self.pool_options
+        if options is None:
+            return super().get_new_connection(conn_params)
+
+        connection_pool = self.connection_pool = get_pool(self.alias, conn_params, options)
+        connection = connection_pool.getconn()
+        if self.health_check_enabled:
+            # Conexões ociosas do pool podem ter caído juntas (ex.: restart do
+            # servidor): descarta até achar uma viva, dentro do TIMEOUT do pool.
+            deadline = time.monotonic() + connection_pool.timeout
+            while not self._is_alive(connection):
+                connection_pool.putconn(connection, close=True)
+                if time.monotonic() >= deadline:
+                    raise OperationalError(
+                        'Nenhuma conexão válida no pool após %s segundos.' % connection_pool.timeout
+                    )
+                connection = connection_pool.getconn()
+
+        # Mesmo ajuste de isolamento/jsonb do backend padrão.
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        if isolation_level is None:
+            self.isolation_level = connection.isolation_level
+        else:
+            self.isolation_level = isolation_level
+            if connection.isolation_level != isolation_level:
+                connection.set_session(isolation_level=isolation_level)
+        base.psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+        return connection
+
+    def _close(self):
+        if self.connection_pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.connection_pool.putconn(self.connection, close=self.errors_occurred)
+
+    @staticmethod
+    def _is_alive(connection):
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Database.Error:
+            return False
+        if not connection.autocommit:
+            connection.rollback()
+        return True
+
+    # Health checks (equivalente ao CONN_HEALTH_CHECKS do Django 4.1+)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Nova requisição: a conexão reaproveitada será testada no primeiro uso.
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (self.connection is None or not self.health_check_enabled
+                or self.health_check_done or self.in_atomic_block):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
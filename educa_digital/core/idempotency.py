@@ -0,0 +1,135 @@
+# core/idempotency.py
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .renderers import ORJSONRenderer
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def _sha256(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _error(detail, status_code, **headers):
+    response = Response({'detail': detail}, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def idempotent(view_method):
+    """
+    Decorator para métodos `create`/`post` de views DRF que aceita o cabeçalho
+    `Idempotency-Key`.
+
+    A primeira requisição com uma chave é executada normalmente e, se bem
+    sucedida (2xx), sua resposta fica registrada por
+    settings.IDEMPOTENCY_KEY_TTL. Repetições com a mesma chave e o mesmo corpo
+    recebem a resposta registrada sem executar a view; com um corpo diferente
+    recebem 422. Enquanto a original não termina, repetições recebem 409; se
+    ela não terminar em settings.IDEMPOTENCY_LOCK_TIMEOUT (ex.: worker morto),
+    a próxima repetição com o mesmo corpo é executada.
+    Sem o cabeçalho, a view é executada normalmente.
+    """
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        client_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if client_key is None:
+            return view_method(self, request, *args, **kwargs)
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            return _error('Cabeçalho Idempotency-Key inválido.', status.HTTP_400_BAD_REQUEST)
+
+        user_id = request.user.pk if request.user.is_authenticated else ''
+        key = _sha256(user_id, request.method, request.path, client_key)
+        fingerprint = _sha256(request.body)
+
+        record = _claim(key, fingerprint)
+        if record is not None:
+            return _replay(record, fingerprint)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(key=key).delete()
+            raise
+
+        if status.is_success(response.status_code):
+            IdempotencyKey.objects.filter(key=key).update(
+                status_code=response.status_code, locked_until=None,
+                response_body=ORJSONRenderer().render(response.data),
+                location=response.get('Location', ''),
+            )
+        else:
+            # Erros não são registrados: o cliente pode corrigir e repetir.
+            IdempotencyKey.objects.filter(key=key).delete()
+        return response
+
+    return wrapper
+
+
+def _claim(key, fingerprint):
+    """
+    Registra a chave como "em andamento". Retorna o registro existente se a
+    chave já foi usada (e não expirou) ou None se esta requisição a obteve,
+    inclusive ao assumir a de uma requisição original abandonada.
+    """
+    for _ in range(2):
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(key=key).first()
+        if record is not None:
+            if record.is_expired():
+                IdempotencyKey.objects.filter(pk=record.pk).delete()
+            elif record.is_abandoned() and record.fingerprint == fingerprint:
+                # Só uma das repetições assume a chave
+                taken = IdempotencyKey.objects.filter(
+                    pk=record.pk, status_code__isnull=True, locked_until=record.locked_until,
+                ).update(locked_until=now + settings.IDEMPOTENCY_LOCK_TIMEOUT)
+                if taken:
+                    return None
+                continue
+            else:
+                return record
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    key=key, fingerprint=fingerprint,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                    locked_until=now + settings.IDEMPOTENCY_LOCK_TIMEOUT,
+                )
+            return None
+        except IntegrityError:
+            # Outra requisição com a mesma chave chegou primeiro.
+            continue
+    raise IntegrityError('Não foi possível registrar a Idempotency-Key.')
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return _error(
+            'Idempotency-Key já utilizada com outro conteúdo.', status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return _error(
+            'Requisição com esta Idempotency-Key ainda em processamento.', status.HTTP_409_CONFLICT,
+            **{'Retry-After': '1'}
+        )
+    response = Response(json.loads(bytes(record.response_body)), status=record.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    if record.location:
+        response['Location'] = record.location
+    return response
@@ -0,0 +1,104 @@
+# core/log.py
+"""
+Logs estruturados (uma linha JSON por evento) gravados fora da thread da
+requisição.
+
+O AsyncHandler só enfileira o registro; uma thread própria (QueueListener)
+formata e grava no stream ou arquivo, então uma saída lenta (stdout
+bloqueado, disco) não atrasa a requisição. O RequestIdFilter, aplicado antes
+de enfileirar, anexa o ID da requisição e o span ativo (core/tracing.py).
+"""
+import json
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.local import Local
+
+_state = Local()
+
+# Atributos padrão de LogRecord; os demais vieram de `extra=` e entram no JSON.
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+
+def set_request_id(request_id):
+    _state.request_id = request_id
+
+
+def get_request_id():
+    return getattr(_state, 'request_id', None)
+
+
+class RequestIdFilter(logging.Filter):
+
+    def filter(self, record):
+        from . import tracing
+
+        record.request_id = get_request_id()
+        record.span_id = tracing.current_span_id()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+
+    def format(self, record):
+        data = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                         + '.%03dZ' % record.msecs,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class AsyncHandler(QueueHandler):
+    """
+    Handler assíncrono: grava em `filename` (se informado) ou em `stream`
+    (padrão: stderr), no formato JSON, a partir de uma thread própria.
+    """
+
+    def __init__(self, filename=None, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.FileHandler(filename, encoding='utf-8') if filename else logging.StreamHandler(stream)
+        self.target.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self._running = True
+
+    def setFormatter(self, fmt):
+        # O formatter configurado (LOGGING) é aplicado na thread do listener
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # A mensagem é montada aqui (os args podem ser objetos mutáveis ou não
+        # serializáveis), mas a formatação JSON fica para a thread do listener.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def flush(self):
+        # Espera a fila esvaziar (logging.shutdown chama flush e close ao sair)
+        if self._running:
+            self.listener.stop()
+            self.listener.start()
+        self.target.flush()
+
+    def close(self):
+        if self._running:
+            self.listener.stop()
+            self._running = False
+        self.target.close()
+        super().close()
@@ -0,0 +1,140 @@
+# core/management/commands/bench_json.py
+import datetime
+import decimal
+import io
+import timeit
+import uuid
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from educa_digital.core.parsers import ORJSONParser
+from educa_digital.core.renderers import ORJSONRenderer, orjson
+
+
+def build_enrollment_payload(index):
+    """
+    Payload no formato de saída do EnrollmentSerializer (dicts aninhados),
+    incluindo tipos que passam pelo encoder: datas, Decimal e UUID.
+    """
+    now = timezone.now()
+    return OrderedDict([
+        ('id', index),
+        ('student', OrderedDict([
+            ('id', index),
+            ('cpf', '123.456.789-%02d' % (index % 100)),
+            ('nome', 'Aluno de Teste Número %d' % index),
+            ('rg', '12.345.678-9'),
+            ('orgao_emissor', 'SSP'),
+            ('estado_emissao', 'SP'),
+            ('cartao_sus', '898 0010 1234 5678'),
+            ('email', 'aluno%d@example.com' % index),
+            ('data_nascimento', datetime.date(2012, 5, 17)),
+            ('telefone_whatsapp', '(11) 98888-7777'),
+            ('genero', 'feminino'),
+            ('pcd', False),
+            ('bolsa_familia', True),
+        ])),
+        ('responsible', OrderedDict([
+            ('id', index),
+            ('cpf', '987.654.321-%02d' % (index % 100)),
+            ('nome', 'Responsável de Teste Número %d' % index),
+            ('email', 'responsavel%d@example.com' % index),
+            ('data_nascimento', datetime.date(1985, 1, 30)),
+            ('telefone_whatsapp', '(11) 97777-6666'),
+            ('vinculo', 'mae'),
+            ('genero', 'feminino'),
+        ])),
+        ('address', OrderedDict([
+            ('id', index),
+            ('cep', '01001-000'),
+            ('estado', 'SP'),
+            ('cidade', 'São Paulo'),
+            ('bairro', 'Sé'),
+            ('complemento', 'Apto %d' % index),
+            ('ponto_referencia', None),
+        ])),
+        ('school_unit', OrderedDict([
+            ('id', 1),
+            ('nome', 'E.M. João Batista'),
+            ('cnpj', '12.345.678/0001-90'),
+            ('endereco', 'Rua das Flores, 100'),
+            ('telefone', None),
+            ('email', 'escola@example.com'),
+            ('ativo', True),
+        ])),
+        ('etapa', index % 9 + 1),
+        ('situacao', 'pendente'),
+        ('mensalidade', decimal.Decimal('150.75')),
+        ('protocolo', uuid.uuid4()),
+        ('created_at', now),
+        ('updated_at', now),
+    ])
+
+
+def build_user_payload(index):
+    """
+    Payload no formato do UserSerializer, como retornado pelo login.
+    """
+    return OrderedDict([
+        ('id', index),
+        ('username', 'usuario%d' % index),
+        ('email', 'usuario%d@example.com' % index),
+        ('first_name', 'José'),
+        ('last_name', 'Silva'),
+        ('is_active', True),
+        ('is_staff', False),
+        ('permissions', ['add_enrollment', 'change_enrollment', 'view_enrollment']),
+    ])
+
+
+class Command(BaseCommand):
+    help = 'Compara o JSONRenderer/JSONParser do DRF com as versões baseadas em orjson.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--size', type=int, default=50,
+                            help='Quantidade de itens nas listas de matrículas/usuários.')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        size = options['size']
+
+        if orjson is None:
+            self.stdout.write(self.style.WARNING(
+                'orjson não está instalado; o renderer usará o módulo json padrão.'
+            ))
+
+        payloads = [
+            ('matricula (detalhe)', build_enrollment_payload(1)),
+            ('matriculas (lista %d)' % size, [build_enrollment_payload(i) for i in range(size)]),
+            ('usuario (login)', {'refresh': 'x' * 200, 'access': 'y' * 200, 'user': build_user_payload(1)}),
+            ('usuarios (lista %d)' % size, [build_user_payload(i) for i in range(size)]),
+        ]
+
+        stdlib_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+        stdlib_parser, fast_parser = JSONParser(), ORJSONParser()
+
+        for name, data in payloads:
+            body = stdlib_renderer.render(data)
+            if fast_renderer.render(data) != body:
+                self.stdout.write(self.style.ERROR('%s: saída diferente do JSONRenderer!' % name))
+
+            results = [
+                ('render json', lambda: stdlib_renderer.render(data)),
+                ('render orjson', lambda: fast_renderer.render(data)),
+                ('parse json', lambda: stdlib_parser.parse(io.BytesIO(body))),
+                ('parse orjson', lambda: fast_parser.parse(io.BytesIO(body))),
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING('%s (%d bytes)' % (name, len(body))))
+            timings = {}
+            for label, func in results:
+                timings[label] = min(timeit.repeat(func, number=iterations, repeat=3)) / iterations
+                self.stdout.write('  %-14s %9.2f µs' % (label, timings[label] * 1e6))
+            self.stdout.write('  speedup render %.1fx, parse %.1fx' % (
+                timings['render json'] / timings['render orjson'],
+                timings['parse json'] / timings['parse orjson'],
+            ))
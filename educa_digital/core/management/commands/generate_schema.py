@@ -0,0 +1,39 @@
+# core/management/commands/generate_schema.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from educa_digital.core.schema import render_schema
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera o schema OpenAPI (JSON e YAML) em settings.SCHEMA_ARTIFACT_DIR. '
+        'Com --check, apenas compara o arquivo existente com o código e falha '
+        'se estiverem diferentes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Não grava; sai com erro se o schema versionado estiver desatualizado.')
+
+    def handle(self, *args, **options):
+        directory = settings.SCHEMA_ARTIFACT_DIR
+        artifacts = render_schema()
+
+        if options['check']:
+            stale = [
+                filename for filename, content in artifacts.items()
+                if not (directory / filename).is_file() or (directory / filename).read_bytes() != content
+            ]
+            if stale:
+                raise CommandError(
+                    'Schema OpenAPI desatualizado em %s: %s. Rode "manage.py generate_schema".'
+                    % (directory, ', '.join(stale))
+                )
+            self.stdout.write(self.style.SUCCESS('Schema OpenAPI em dia.'))
+            return
+
+        directory.mkdir(parents=True, exist_ok=True)
+        for filename, content in artifacts.items():
+            (directory / filename).write_bytes(content)
+            self.stdout.write('%s (%d bytes)' % (directory / filename, len(content)))
@@ -0,0 +1,73 @@
+# core/management/commands/profile_imports.py
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from educa_digital.boot import setup_environment
+
+TARGETS = {
+    # Boot de um comando de gerenciamento: settings + apps + models.
+    'setup': 'import django; django.setup()',
+    # Boot de um worker web até estar pronto para atender (urlconf carregado).
+    'wsgi': 'import educa_digital.wsgi; import importlib; importlib.import_module(%r)',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o tempo de inicialização (cold start) em processos novos e lista '
+        'os módulos mais caros de importar (python -X importtime).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), default='wsgi')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Execuções para medir o tempo total (usa a menor).')
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--self', action='store_true', dest='by_self',
+                            help='Ordena pelo tempo do próprio módulo em vez do acumulado.')
+
+    def handle(self, *args, **options):
+        code = TARGETS[options['target']]
+        if '%r' in code:
+            code = code % settings.ROOT_URLCONF
+
+        timings = []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            self.run_python(code)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Cold start (%s): %.0f ms (menor de %d execuções)'
+            % (options['target'], min(timings) * 1e3, options['runs'])
+        ))
+
+        modules = self.parse_importtime(self.run_python(code, importtime=True))
+        index = 0 if options['by_self'] else 1
+        modules.sort(key=lambda module: module[index], reverse=True)
+        self.stdout.write('%10s %10s  módulo' % ('próprio', 'acumulado'))
+        for self_us, cumulative_us, name in modules[:options['top']]:
+            self.stdout.write('%8.1fms %8.1fms  %s' % (self_us / 1e3, cumulative_us / 1e3, name))
+
+    def run_python(self, code, importtime=False):
+        command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+        env = dict(os.environ)
+        setup_environment(env)
+        result = subprocess.run(command, env=env, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        return result.stderr
+
+    @staticmethod
+    def parse_importtime(output):
+        modules = []
+        for line in output.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            modules.append((int(self_us), int(cumulative_us), name.strip()))
+        return modules
@@ -0,0 +1,12 @@
+# core/management/commands/purge_idempotency_keys.py
+from django.core.management.base import BaseCommand
+
+from educa_digital.core.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Remove os registros de Idempotency-Key expirados.'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.expired().delete()
+        self.stdout.write(self.style.SUCCESS('%d chaves expiradas removidas.' % deleted))
@@ -0,0 +1,30 @@
+# core/metrics.py
+"""
+Contadores simples por processo (worker) para monitoramento, expostos em
+/metrics/ (somente staff).
+"""
+import os
+import threading
+from collections import Counter
+
+_counters = Counter()
+_gauges = {}
+_lock = threading.Lock()
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name, value):
+    _gauges[name] = value
+
+
+def snapshot():
+    with _lock:
+        return {
+            'pid': os.getpid(),
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+        }
@@ -0,0 +1,157 @@
+# core/middleware.py
+import logging
+import re
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.functional import SimpleLazyObject
+
+from . import log, metrics, routers, tenancy, tracing
+
+request_logger = logging.getLogger('educa_digital.request')
+
+
+class RequestIdMiddleware:
+    """
+    Identifica cada requisição: usa o X-Request-ID recebido (ex.: do proxy)
+    se for um ID válido, ou gera um. O ID vai em todos os logs da requisição,
+    é o trace_id dos spans (core/tracing.py) e volta no cabeçalho X-Request-ID.
+    Ao final, registra método, rota, status e duração.
+    """
+    header = 'X-Request-ID'
+    valid_id = re.compile(r'^[0-9A-Za-z._-]{8,64}$')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(self.header, '')
+        if not self.valid_id.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        log.set_request_id(request_id)
+
+        started = time.perf_counter()
+        try:
+            with tracing.span('http.request', method=request.method, path=request.path) as attributes:
+                response = self.get_response(request)
+                attributes['status_code'] = response.status_code
+            response[self.header] = request_id
+            request_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1e3, 2),
+            })
+            return response
+        finally:
+            log.set_request_id(None)
+
+
+class TenantMiddleware:
+    """
+    Ativa a rede de ensino da requisição (core/tenancy.py): a do cabeçalho
+    X-Tenant (slug), a do hostname ou, sem nenhuma das duas, a padrão
+    (settings.DEFAULT_TENANT). Rede informada no cabeçalho e desconhecida
+    (ou inativa) responde 404.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slug = request.headers.get(tenancy.TENANT_HEADER)
+        if slug:
+            tenant = tenancy.lookup(slug=slug)
+            if tenant is None:
+                return JsonResponse({'detail': 'Rede de ensino não encontrada.'}, status=404)
+        else:
+            # Resolvida só no primeiro uso: rotas que não consultam dados das
+            # redes (schema, arquivos) não pagam a busca.
+            hostname = request.get_host().split(':')[0].lower()
+            tenant = SimpleLazyObject(lambda: tenancy.lookup(hostname=hostname) or tenancy.default_tenant())
+
+        request.tenant = tenant
+        tenancy.activate(tenant)
+        try:
+            return self.get_response(request)
+        finally:
+            tenancy.deactivate()
+
+
+class ReplicaPinMiddleware:
+    """
+    Mantém o cliente no banco primário por settings.REPLICA_PIN_SECONDS após
+    uma escrita, evitando ler dados antigos de uma réplica atrasada.
+
+    O pin vale para o navegador (cookie) e para o usuário autenticado (cache),
+    já que clientes JWT nem sempre guardam cookies.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.start_request(request, pinned=routers.PIN_COOKIE_NAME in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            if routers.wrote_to_primary():
+                response.set_cookie(
+                    routers.PIN_COOKIE_NAME, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+                )
+                user = getattr(request, 'user', None)
+                if user is not None and user.is_authenticated:
+                    routers.pin_user(user)
+        finally:
+            routers.end_request()
+        return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Limita o número de requisições simultâneas por rota em cada worker
+    (settings.LOAD_SHEDDING_LIMITS = {'/users/login/': 4, ...}).
+
+    Acima do limite a requisição é recusada na hora com 503 e Retry-After,
+    em vez de ocupar threads até esgotar o worker (ex.: rajadas de login, em
+    que cada tentativa calcula o hash da senha).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limits = {
+            path: threading.BoundedSemaphore(limit)
+            for path, limit in settings.LOAD_SHEDDING_LIMITS.items()
+        }
+        self.in_flight = dict.fromkeys(self.limits, 0)
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        semaphore = self.limits.get(request.path_info)
+        if semaphore is None:
+            return self.get_response(request)
+
+        path = request.path_info
+        if not semaphore.acquire(blocking=False):
+            metrics.incr('load_shedding.rejected %s' % path)
+            response = JsonResponse(
+                {'detail': 'Servidor ocupado. Tente novamente em instantes.'}, status=503
+            )
+            response['Retry-After'] = str(settings.LOAD_SHEDDING_RETRY_AFTER)
+            return response
+
+        self._update_in_flight(path, 1)
+        try:
+            return self.get_response(request)
+        finally:
+            self._update_in_flight(path, -1)
+            semaphore.release()
+
+    def _update_in_flight(self, path, delta):
+        with self._lock:
+            self.in_flight[path] += delta
+            metrics.set_gauge('in_flight %s' % path, self.in_flight[path])
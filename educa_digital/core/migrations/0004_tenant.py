@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_default_tenant(apps, schema_editor):
+    # Os dados existentes passam a pertencer à rede padrão.
+    Tenant = apps.get_model('core', 'Tenant')
+    Tenant.objects.using(schema_editor.connection.alias).get_or_create(
+        slug=settings.DEFAULT_TENANT, defaults={'nome': settings.DEFAULT_TENANT},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_storedblob_last_referenced_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=255)),
+                ('slug', models.SlugField(unique=True)),
+                ('hostname', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('ativo', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+    ]
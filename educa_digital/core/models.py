@@ -0,0 +1,123 @@
+# core/models.py
+from django.db import models
+from django.utils import timezone
+
+from . import tenancy
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def expired(self):
+        return self.filter(expires_at__lt=timezone.now())
+
+
+class IdempotencyKey(models.Model):
+    """
+    Resposta registrada para um cabeçalho `Idempotency-Key`.
+
+    `key` é o hash do escopo (usuário, método, rota) com a chave enviada pelo
+    cliente; `fingerprint` é o hash do corpo da requisição original. Enquanto
+    `status_code` estiver vazio a requisição original ainda está em andamento,
+    até `locked_until`; depois disso é considerada perdida.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.BinaryField(null=True, blank=True)
+    location = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    def is_expired(self):
+        return self.expires_at < timezone.now()
+
+    def is_abandoned(self):
+        return self.status_code is None and self.locked_until is not None and self.locked_until < timezone.now()
+
+    def __str__(self):
+        return self.key
+
+
+class StoredBlob(models.Model):
+    """
+    Arquivo gravado pelo ContentAddressedStorage (core/storage.py).
+
+    Cada conteúdo distinto (sha256) é gravado uma única vez; `ref_count` é o
+    número de campos que apontam para ele. O objeto só é removido do
+    armazenamento quando a última referência é liberada.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Última vez que um upload apontou para o arquivo. A limpeza de arquivos
+    # órfãos (purge_stale_data) ignora os referenciados recentemente, cujo
+    # documento pode ainda não ter sido gravado.
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} ref.)"
+
+
+class Tenant(models.Model):
+    """
+    Rede de ensino (ex.: uma rede municipal) hospedada nesta instalação.
+    Ver core/tenancy.py.
+    """
+    nome = models.CharField(max_length=255)
+    slug = models.SlugField(unique=True)
+    # Domínio próprio da rede (ex.: matricula.cidade.sp.gov.br), opcional
+    hostname = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    ativo = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nome
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        tenancy.forget(self)
+
+
+class TenantQuerySet(models.QuerySet):
+    """
+    Consultas restritas à rede ativa (core/tenancy.py).
+
+    O filtro é aplicado pelo manager e também em `all()`: os querysets
+    declarados nas views (`queryset = Model.objects...`) são montados na
+    importação, sem rede ativa, e o DRF chama `all()` a cada requisição.
+    """
+
+    def scoped(self):
+        tenant_id = tenancy.get_current_tenant_id()
+        return self if tenant_id is None else self.filter(tenant_id=tenant_id)
+
+    def all(self):
+        return super().all().scoped()
+
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+
+    def get_queryset(self):
+        return super().get_queryset().scoped()
+
+
+class TenantScopedModel(models.Model):
+    """
+    Modelo pertencente a uma rede de ensino: `objects` só enxerga a rede
+    ativa e os registros novos são gravados nela.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.PROTECT, related_name='+', editable=False)
+
+    objects = TenantManager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None:
+            self.tenant_id = tenancy.tenant_id_for_new_rows()
+        super().save(*args, **kwargs)
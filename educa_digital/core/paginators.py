@@ -0,0 +1,56 @@
+# core/paginators.py
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator para changelists do admin em tabelas grandes.
+
+    Sem filtros, usa a estimativa de linhas do planejador do PostgreSQL
+    (estatísticas do autovacuum/ANALYZE) em vez de um COUNT(*) completo. O
+    filtro da rede ativa (core/tenancy.py), aplicado pelo manager, não conta
+    como filtro: a estimativa é a das linhas da rede. Abaixo de
+    `estimate_threshold` linhas, ou com filtros/busca, conta normalmente.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if getattr(queryset, 'query', None) is not None and self.unfiltered(queryset):
+            connection = connections[queryset.db]
+            if connection.vendor == 'postgresql':
+                estimate = self.estimate(queryset, connection)
+                if estimate >= self.estimate_threshold:
+                    return estimate
+        return super().count
+
+    @staticmethod
+    def unfiltered(queryset):
+        """
+        Sem outro filtro além do aplicado pelo manager padrão (ex.: a rede ativa).
+        """
+        where = queryset.query.where
+        if not where:
+            return True
+        base = queryset.model._default_manager.all().query.where
+        compiler = queryset.query.get_compiler(queryset.db)
+        return bool(base) and compiler.compile(where) == compiler.compile(base)
+
+    @staticmethod
+    def estimate(queryset, connection):
+        # Linhas estimadas pelo planejador (pg_class.reltuples e, com o filtro
+        # da rede, a frequência do tenant_id em pg_stats), sem ler a tabela.
+        query = queryset.query.clone()
+        query.clear_ordering(force_empty=True)
+        sql, params = query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
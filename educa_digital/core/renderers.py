@@ -0,0 +1,49 @@
+# core/renderers.py
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson é opcional
+    orjson = None
+
+
+_drf_encoder = encoders.JSONEncoder()
+
+if orjson is not None:
+    # Datas passam pelo encoder do DRF para manter o formato ('Z', milissegundos);
+    # UUID é serializado nativamente pelo orjson como str(uuid), igual ao DRF.
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer JSON baseado em orjson.
+
+    Produz a mesma saída do JSONRenderer do DRF (compacto, UTF-8, sem
+    escapar caracteres não-ASCII). Datas, decimais, UUIDs e lazy strings
+    são tratados pelo encoder padrão do DRF.
+
+    Se o orjson não estiver instalado, ou se a resposta pedir indentação
+    (ex.: API navegável ou 'application/json; indent=4'), delega para o
+    JSONRenderer padrão baseado no módulo json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_drf_encoder.default, option=ORJSON_OPTIONS)
+
+        # Assim como o DRF, escapamos \u2028 e \u2029 para que o JSON
+        # continue sendo um subconjunto válido de javascript.
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
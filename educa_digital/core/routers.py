@@ -0,0 +1,91 @@
+# core/routers.py
+import random
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE_NAME = 'db_primary_pin'
+
+_state = Local()
+
+
+def _pin_cache_key(user_id):
+    return 'db-primary-pin:%s' % user_id
+
+
+def start_request(request, pinned=False):
+    _state.request = request
+    _state.pinned = pinned
+    _state.wrote = False
+
+
+def end_request():
+    _state.request = None
+    _state.pinned = False
+    _state.wrote = False
+
+
+def pin_to_primary():
+    """
+    Força as leituras seguintes (nesta requisição/thread) para o primário.
+    """
+    _state.pinned = True
+    _state.wrote = True
+
+
+def wrote_to_primary():
+    return getattr(_state, 'wrote', False)
+
+
+def pin_user(user):
+    cache.set(_pin_cache_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned():
+    if getattr(_state, 'pinned', False):
+        return True
+    request = getattr(_state, 'request', None)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        # Só consulta o cache uma vez por requisição, após a autenticação.
+        _state.pinned = bool(cache.get(_pin_cache_key(user.pk)))
+        _state.request = None
+        return _state.pinned
+    return False
+
+
+class PrimaryReplicaRouter:
+    """
+    Envia as leituras dos apps em settings.REPLICA_APPS para uma das réplicas
+    (settings.DATABASE_REPLICAS) e todas as escritas para o primário.
+
+    Após uma escrita, as leituras da mesma requisição continuam no primário
+    (read-after-write) e o ReplicaPinMiddleware mantém o usuário no primário
+    por settings.REPLICA_PIN_SECONDS.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            return None
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todos os bancos configurados têm os mesmos dados (primário e réplicas)
+        if obj1._state.db in settings.DATABASES and obj2._state.db in settings.DATABASES:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o schema via replicação do primário.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
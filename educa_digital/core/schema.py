@@ -0,0 +1,198 @@
+# core/schema.py
+"""
+Views da documentação (Swagger/ReDoc) carregadas sob demanda.
+
+O schema OpenAPI é gerado no build/deploy (manage.py generate_schema) em
+settings.SCHEMA_ARTIFACT_DIR e servido direto do arquivo, com ETag, sem
+introspectar views e serializers a cada requisição. As páginas do Swagger e
+do ReDoc buscam o schema em ?format=openapi, que também sai do arquivo.
+
+Sem o arquivo (ex.: desenvolvimento), o drf_yasg gera o schema na hora; ele
+só é importado no primeiro acesso e a resposta fica em cache por
+settings.SCHEMA_CACHE_TIMEOUT segundos.
+
+As views documentam as operações com `auto_schema` e `Parameter` (abaixo), no
+lugar de `swagger_auto_schema` e `openapi.Parameter`, para não importar o
+drf_yasg na carga das URLs.
+"""
+import copy
+import functools
+import hashlib
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+# format -> (arquivo, content type); os mesmos formats dos renderers do drf_yasg
+ARTIFACT_FORMATS = {
+    'openapi': ('openapi.json', 'application/openapi+json'),
+    'json': ('openapi.json', 'application/json'),
+    'yaml': ('openapi.yaml', 'application/yaml'),
+}
+
+
+# Valores de drf_yasg.openapi usados nas views
+IN_QUERY, IN_HEADER, IN_FORM = 'query', 'header', 'formData'
+TYPE_STRING, TYPE_INTEGER, TYPE_ARRAY = 'string', 'integer', 'array'
+
+
+class Parameter:
+    """
+    openapi.Parameter criado só na geração do schema. `items` é um dict com
+    os argumentos de openapi.Items.
+    """
+
+    def __init__(self, name, in_, **kwargs):
+        self.name, self.in_, self.kwargs = name, in_, kwargs
+
+    def resolve(self, openapi):
+        kwargs = dict(self.kwargs)
+        if 'items' in kwargs:
+            kwargs['items'] = openapi.Items(**kwargs['items'])
+        return openapi.Parameter(self.name, self.in_, **kwargs)
+
+
+def auto_schema(**overrides):
+    """
+    Equivalente ao `swagger_auto_schema` do drf_yasg (mesmos argumentos) para
+    métodos de views, aplicado só quando o schema é gerado.
+    """
+    def decorator(view_method):
+        view_method._auto_schema = overrides
+        return view_method
+    return decorator
+
+
+def _generator_class():
+    from drf_yasg import openapi
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from drf_yasg.utils import swagger_auto_schema
+
+    class Generator(OpenAPISchemaGenerator):
+
+        def get_overrides(self, view, method):
+            action_method = getattr(view, getattr(view, 'action', method.lower()), None)
+            overrides = getattr(action_method, '_auto_schema', None)
+            if overrides is None:
+                return super().get_overrides(view, method)
+            overrides = copy.deepcopy(overrides)
+            if 'manual_parameters' in overrides:
+                overrides['manual_parameters'] = [
+                    parameter.resolve(openapi) if isinstance(parameter, Parameter) else parameter
+                    for parameter in overrides['manual_parameters']
+                ]
+            # O decorator do drf_yasg normaliza os argumentos como em uso direto
+            target = swagger_auto_schema(**overrides)(lambda: None)
+            return target._swagger_auto_schema
+
+    return Generator
+
+
+def get_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Back Sistema Escolar API",
+        default_version='v1',
+        description="Documentação da API para o projeto Back Sistema Escolar Digital",
+        terms_of_service="www.prodosdigital.com.br",
+        contact=openapi.Contact(email="agencia.prodosdigital@gmail.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema_view():
+    from drf_yasg.views import get_schema_view as yasg_get_schema_view
+    from rest_framework import permissions
+
+    return yasg_get_schema_view(
+        get_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+        generator_class=_generator_class(),
+    )
+
+
+def render_schema():
+    """
+    Gera o schema a partir do código e retorna {arquivo: bytes}.
+
+    Sem request, o documento não inclui host/scheme e é o mesmo em qualquer
+    ambiente, o que permite comparar o arquivo versionado com o código.
+    """
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+    generator = get_schema_view().generator_class(get_info())
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        'openapi.json': OpenAPICodecJson(validators=[], pretty=True).encode(schema) + b'\n',
+        'openapi.yaml': OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def load_artifact(filename):
+    """
+    Retorna (conteúdo, etag) do arquivo pré-gerado, ou None se não existir.
+    Lido uma vez por processo; um novo deploy sobe workers novos.
+    """
+    try:
+        content = (settings.SCHEMA_ARTIFACT_DIR / filename).read_bytes()
+    except FileNotFoundError:
+        return None
+    return content, '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+def artifact_response(request, format):
+    filename, content_type = ARTIFACT_FORMATS[format]
+    artifact = load_artifact(filename)
+    if artifact is None:
+        return None
+    content, etag = artifact
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    # O cliente sempre revalida; sem mudança no schema a resposta é um 304.
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@functools.lru_cache(maxsize=None)
+def _ui_view(renderer):
+    return get_schema_view().with_ui(renderer, cache_timeout=settings.SCHEMA_CACHE_TIMEOUT)
+
+
+@functools.lru_cache(maxsize=None)
+def _spec_view():
+    return get_schema_view().without_ui(cache_timeout=settings.SCHEMA_CACHE_TIMEOUT)
+
+
+def lazy_schema_ui(renderer):
+    """
+    Retorna uma view que delega para `schema_view.with_ui(renderer)`,
+    construída no primeiro request. Pedidos do schema (?format=openapi)
+    são atendidos pelo arquivo pré-gerado, quando existir.
+    """
+    def view(request, *args, **kwargs):
+        format = request.GET.get('format')
+        if format in ARTIFACT_FORMATS:
+            response = artifact_response(request, format)
+            if response is not None:
+                return response
+        return _ui_view(renderer)(request, *args, **kwargs)
+    return view
+
+
+@require_safe
+def schema_file_view(request, format):
+    """
+    /swagger.json e /swagger.yaml: o schema sem a interface web.
+    """
+    response = artifact_response(request, format)
+    if response is not None:
+        return response
+    return _spec_view()(request, format=format)
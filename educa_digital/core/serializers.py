@@ -0,0 +1,200 @@
+# core/serializers.py
+import copy
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+VALUE, NESTED, METHOD = 'value', 'nested', 'method'
+
+
+def _to_str(value):
+    return value if type(value) is str else str(value)
+
+
+def _choice_converter(field):
+    choices = field.choice_strings_to_values
+
+    def convert(value):
+        if value == '':
+            return value
+        return choices.get(str(value), value)
+    return convert
+
+
+class _Plan:
+    """
+    Plano pré-compilado de leitura de um serializer DRF.
+
+    Cada entrada é (chave, tipo, atributos, coluna, extra): `atributos` é o
+    caminho relativo usado em instâncias, `coluna` é a chave da linha de
+    `values()` e `extra` é o conversor, o sub-plano ou o nome do método.
+    """
+
+    def __init__(self, serializer, prefix=()):
+        model = serializer.Meta.model
+        self.entries = []
+        self.value_fields = []
+        self.pk_column = '__'.join(prefix + (model._meta.pk.attname,))
+
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.SerializerMethodField):
+                if prefix:
+                    raise ImproperlyConfigured(
+                        "SerializerMethodField '%s' só é suportado no serializer raiz."
+                        % field.field_name
+                    )
+                self.entries.append((field.field_name, METHOD, None, None, field.method_name))
+                if self.pk_column not in self.value_fields:
+                    self.value_fields.append(self.pk_column)
+                continue
+            if field.source == '*':
+                raise ImproperlyConfigured(
+                    "Campo '%s' com source='*' não é suportado." % field.field_name
+                )
+            attrs = tuple(field.source.split('.'))
+            column = '__'.join(prefix + attrs)
+
+            if isinstance(field, serializers.ModelSerializer):
+                nested = _Plan(field, prefix + attrs)
+                self.entries.append((field.field_name, NESTED, attrs, column, nested))
+                self.value_fields.extend(nested.value_fields)
+            else:
+                if isinstance(field, PrimaryKeyRelatedField) and len(attrs) == 1:
+                    # Lê a coluna `<fk>_id` direto, sem buscar o objeto relacionado.
+                    attrs = (model._meta.get_field(attrs[0]).attname,)
+                self.entries.append((field.field_name, VALUE, attrs, column, self._converter(field)))
+                self.value_fields.append(column)
+
+    @staticmethod
+    def _converter(field):
+        if isinstance(field, serializers.ChoiceField):
+            return _choice_converter(field)
+        if isinstance(field, serializers.CharField):
+            return _to_str
+        if isinstance(field, serializers.BooleanField):
+            return bool
+        if isinstance(field, serializers.IntegerField):
+            return int
+        if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+            return None
+        if isinstance(field, (serializers.DateField, serializers.DateTimeField)):
+            # Reutiliza o campo do DRF já instanciado: mesmo formato e timezone.
+            return field.to_representation
+        raise ImproperlyConfigured(
+            "Campo '%s' (%s) não é suportado pelo CompiledSerializer."
+            % (field.field_name, type(field).__name__)
+        )
+
+
+class CachedFieldsMixin:
+    """
+    ModelSerializer que monta os campos a partir do model uma única vez por
+    classe. Cada instância recebe cópias dos campos prontos em vez de
+    repetir a introspecção do model (a maior parte do custo de `is_valid`).
+
+    Campos simples são copiados rasamente; serializers aninhados e campos com
+    `child` são copiados por inteiro, como o DRF faz com os campos declarados.
+    """
+
+    def get_fields(self):
+        cls = type(self)
+        templates = cls.__dict__.get('_field_templates')
+        if templates is None:
+            templates = super().get_fields()
+            cls._field_templates = templates
+        return {
+            name: copy.deepcopy(field)
+            if isinstance(field, serializers.BaseSerializer) or hasattr(field, 'child')
+            else copy.copy(field)
+            for name, field in templates.items()
+        }
+
+
+class CompiledSerializer:
+    """
+    Serializer somente-leitura que reproduz a saída de um serializer DRF
+    (`serializer_class`) sem instanciar os campos a cada requisição.
+
+    O plano de leitura (campos, ordem, conversões) é calculado uma única vez
+    por classe a partir do serializer DRF e reaproveitado em seguida. Aceita
+    instâncias (carregadas com `select_related`) ou linhas de `values()`,
+    usando `value_fields()` como lista de colunas.
+
+    Campos `SerializerMethodField` são resolvidos por um método de mesmo nome
+    nesta classe, que recebe a instância ou a linha.
+    """
+    serializer_class = None
+
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @classmethod
+    def get_plan(cls):
+        plan = cls.__dict__.get('_plan')
+        if plan is None:
+            if cls.serializer_class is None:
+                raise ImproperlyConfigured(
+                    '%s precisa definir `serializer_class`.' % cls.__name__
+                )
+            plan = _Plan(cls.serializer_class())
+            cls._plan = plan
+        return plan
+
+    @classmethod
+    def value_fields(cls):
+        """
+        Colunas a serem passadas para `QuerySet.values()`.
+        """
+        return cls.get_plan().value_fields
+
+    def to_representation(self, instance):
+        """
+        Instância do model -> dict.
+        """
+        return self._from_instance(instance, self.get_plan())
+
+    def from_row(self, row):
+        """
+        Linha de `values(*value_fields())` -> dict.
+        """
+        return self._from_row(row, self.get_plan())
+
+    def serialize_queryset(self, queryset):
+        plan = self.get_plan()
+        return [self._from_row(row, plan) for row in queryset.values(*plan.value_fields)]
+
+    def _from_instance(self, instance, plan):
+        ret = {}
+        for key, kind, attrs, _, extra in plan.entries:
+            if kind == METHOD:
+                ret[key] = getattr(self, extra)(instance)
+                continue
+            value = instance
+            for attr in attrs:
+                value = getattr(value, attr)
+                if value is None:
+                    break
+            if value is None:
+                ret[key] = None
+            elif kind == NESTED:
+                ret[key] = self._from_instance(value, extra)
+            else:
+                ret[key] = value if extra is None else extra(value)
+        return ret
+
+    def _from_row(self, row, plan):
+        if row[plan.pk_column] is None:
+            return None
+        ret = {}
+        for key, kind, _, column, extra in plan.entries:
+            if kind == METHOD:
+                ret[key] = getattr(self, extra)(row)
+            elif kind == NESTED:
+                ret[key] = self._from_row(row, extra)
+            else:
+                value = row[column]
+                ret[key] = value if value is None or extra is None else extra(value)
+        return ret
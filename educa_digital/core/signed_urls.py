@@ -0,0 +1,46 @@
+# core/signed_urls.py
+"""
+Cache das URLs assinadas de download.
+
+Gerar a URL pré-assinada do S3 custa CPU a cada chamada (e os revisores
+reabrem as mesmas páginas de documentos o tempo todo). As URLs ficam no cache
+até settings.SIGNED_URL_REFRESH_MARGIN segundos antes de expirarem; como os
+documentos são endereçados por conteúdo, uma URL em cache nunca aponta para
+um arquivo diferente.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _cache_key(name):
+    return 'signed-url:%s' % hashlib.sha1(name.encode()).hexdigest()
+
+
+def _timeout(storage):
+    # Validade da assinatura do S3/CloudFront; backends sem assinatura usam a padrão.
+    expire = getattr(storage, 'querystring_expire', None) or settings.AWS_QUERYSTRING_EXPIRE
+    return max(expire - settings.SIGNED_URL_REFRESH_MARGIN, 0)
+
+
+def url_for(storage, name):
+    return urls_for(storage, [name])[name]
+
+
+def urls_for(storage, names):
+    """
+    URLs de `names` em lote: uma leitura do cache para todos e uma escrita
+    para os que precisaram ser assinados. Retorna {nome: url}.
+    """
+    keys = {_cache_key(name): name for name in set(names)}
+    urls = {keys[key]: url for key, url in cache.get_many(keys).items()}
+
+    signed = {}
+    for key, name in keys.items():
+        if name not in urls:
+            urls[name] = signed[key] = storage.url(name)
+    timeout = _timeout(storage)
+    if signed and timeout:
+        cache.set_many(signed, timeout)
+    return urls
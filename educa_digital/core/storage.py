@@ -0,0 +1,133 @@
+# core/storage.py
+"""
+Armazenamento endereçado por conteúdo para os documentos das matrículas.
+
+O arquivo é gravado em `<upload_to>/<ab>/<cd>/<sha256><ext>`. Se o mesmo
+conteúdo já existe (ex.: o comprovante de residência de irmãos, ou o reenvio
+de um documento), o upload é pulado e o objeto existente é reaproveitado;
+StoredBlob conta as referências para que excluir um documento não apague o
+arquivo de outro.
+
+As URLs de download (assinadas) ficam em cache; ver core/signed_urls.py.
+
+O hash normalmente já vem calculado durante o recebimento do upload
+(core/uploadhandlers.py); arquivos de outras origens são lidos uma vez para
+calcular o hash.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import Storage, default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import signed_urls, tracing
+from .models import StoredBlob
+
+
+def sha256_of(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(Storage):
+    """
+    Storage que deduplica por sha256 e delega a gravação a `backend`
+    (por padrão, o DEFAULT_FILE_STORAGE).
+    """
+
+    def __init__(self, backend=None):
+        self._backend = backend
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else default_storage
+
+    def blob_name(self, name, digest):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return '/'.join(filter(None, [directory, digest[:2], digest[2:4], digest + extension]))
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = getattr(content, 'sha256', None) or sha256_of(content)
+
+        with tracing.span('storage.save', size=content.size) as attributes, transaction.atomic():
+            # O lock na linha serializa uploads simultâneos do mesmo conteúdo:
+            # só o primeiro envia o arquivo; os demais apenas somam a referência.
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                sha256=digest,
+                defaults={'name': self.blob_name(name, digest), 'size': content.size},
+            )
+            attributes['dedup'] = not created
+            if created:
+                self.backend.save(blob.name, content, max_length=max_length)
+            StoredBlob.objects.filter(pk=blob.pk).update(
+                ref_count=F('ref_count') + 1, last_referenced_at=timezone.now(),
+            )
+        return blob.name
+
+    def delete(self, name):
+        """
+        Libera uma referência; o objeto só é apagado sem outras referências,
+        e só depois do commit: se a transação for desfeita, o documento
+        continua apontando para um arquivo que existe.
+        """
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is not None and blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            if blob is not None:
+                blob.delete()
+            # Arquivos anteriores à deduplicação não têm StoredBlob.
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        # Um upload do mesmo conteúdo depois do commit recria o StoredBlob e
+        # volta a usar o arquivo.
+        if not StoredBlob.objects.filter(name=name).exists():
+            self.backend.delete(name)
+
+    def _open(self, name, mode='rb'):
+        return self.backend.open(name, mode)
+
+    def exists(self, name):
+        return self.backend.exists(name)
+
+    def url(self, name):
+        return signed_urls.url_for(self.backend, name)
+
+    def urls(self, names):
+        """
+        URLs de vários arquivos de uma vez (ex.: uma página de matrículas).
+        """
+        return signed_urls.urls_for(self.backend, names)
+
+    def size(self, name):
+        return self.backend.size(name)
+
+    def listdir(self, path):
+        return self.backend.listdir(path)
+
+    def path(self, name):
+        return self.backend.path(name)
+
+    def get_modified_time(self, name):
+        return self.backend.get_modified_time(name)
+
+
+_document_storage = ContentAddressedStorage()
+
+
+def document_storage():
+    """
+    Storage dos FileFields de documentos (callable, avaliado sob demanda).
+    """
+    return _document_storage
@@ -0,0 +1,124 @@
+# core/tenancy.py
+"""
+Redes de ensino (Tenant) hospedadas na mesma instalação.
+
+A TenantMiddleware identifica a rede da requisição (cabeçalho X-Tenant com o
+slug, ou o hostname) e a ativa até o fim da requisição. Com uma rede ativa,
+os managers dos modelos com `tenant` (TenantScopedModel) filtram as consultas
+por ela e os registros novos são gravados nela. Fora de uma requisição
+(shell, comandos, testes) nada é filtrado e os registros novos vão para a
+rede padrão (settings.DEFAULT_TENANT).
+
+Cada usuário pertence a uma rede (UserProfile.tenant); a permissão padrão
+das APIs (accounts/permissions.py) recusa, com 403, a rede da requisição que
+não for a do usuário, exceto para a equipe (is_staff).
+
+Os dados em cache de cada rede ficam em um cache próprio (tenant_cache), com
+limite de entradas independente: uma rede grande não expulsa do cache os
+dados das pequenas.
+"""
+import threading
+
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+_state = Local()
+
+TENANT_HEADER = 'X-Tenant'
+
+
+def activate(tenant):
+    _state.tenant = tenant
+
+
+def deactivate():
+    _state.tenant = None
+
+
+def get_current_tenant():
+    return getattr(_state, 'tenant', None)
+
+
+def get_current_tenant_id():
+    tenant = get_current_tenant()
+    return tenant.pk if tenant is not None else None
+
+
+def tenant_id_for_new_rows():
+    """
+    Rede dos registros criados agora: a ativa ou, fora de uma requisição, a padrão.
+    """
+    tenant_id = get_current_tenant_id()
+    return tenant_id if tenant_id is not None else default_tenant().pk
+
+
+def _lookup_cache_key(field, value):
+    return 'tenant:%s:%s' % (field, value)
+
+
+def lookup(slug=None, hostname=None):
+    """
+    Rede ativa pelo slug ou pelo hostname (em cache por TENANT_CACHE_TIMEOUT).
+    """
+    from .models import Tenant
+
+    field, value = ('slug', slug) if slug is not None else ('hostname', hostname)
+    key = _lookup_cache_key(field, value)
+    tenant = cache.get(key)
+    if tenant is None:
+        # Hostnames sem rede própria (o caso comum) também ficam em cache, como False
+        tenant = Tenant.objects.filter(ativo=True, **{field: value}).first() or False
+        cache.set(key, tenant, settings.TENANT_CACHE_TIMEOUT)
+    return tenant or None
+
+
+def default_tenant():
+    """
+    Rede padrão (settings.DEFAULT_TENANT), criada se ainda não existir.
+    """
+    from .models import Tenant
+
+    tenant = lookup(slug=settings.DEFAULT_TENANT)
+    if tenant is None:
+        tenant, _ = Tenant.objects.get_or_create(
+            slug=settings.DEFAULT_TENANT, defaults={'nome': settings.DEFAULT_TENANT},
+        )
+    return tenant
+
+
+def forget(tenant):
+    cache.delete_many([_lookup_cache_key('slug', tenant.slug), _lookup_cache_key('hostname', tenant.hostname)])
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def tenant_cache(tenant_id):
+    """
+    Cache da rede `tenant_id`: o mesmo backend do cache padrão, com prefixo
+    de chave próprio e, no LocMemCache, área e MAX_ENTRIES
+    (settings.TENANT_CACHE_MAX_ENTRIES) próprios.
+    """
+    tenant_cache = _caches.get(tenant_id)
+    if tenant_cache is None:
+        with _caches_lock:
+            tenant_cache = _caches.get(tenant_id)
+            if tenant_cache is None:
+                config = settings.CACHES['default']
+                options = {**config.get('OPTIONS', {}), 'MAX_ENTRIES': settings.TENANT_CACHE_MAX_ENTRIES}
+                params = {**config, 'KEY_PREFIX': 'tenant-%s' % tenant_id, 'OPTIONS': options}
+                location = config.get('LOCATION', '')
+                if config['BACKEND'].endswith('LocMemCache'):
+                    location = '%s:tenant-%s' % (location, tenant_id)
+                tenant_cache = _caches[tenant_id] = import_string(config['BACKEND'])(location, params)
+    return tenant_cache
+
+
+def clear_caches():
+    # Para os testes: com um cache compartilhado (Redis, Memcached), clear()
+    # apaga o servidor inteiro.
+    for tenant_cache in list(_caches.values()):
+        tenant_cache.clear()
@@ -0,0 +1,711 @@
+import datetime
+import decimal
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from educa_digital.escolas.models import CepCentroid, SchoolUnit
+from educa_digital.matricula.models import Enrollment, EnrollmentDocuments
+from educa_digital.matricula.tests import create_enrollment, enrollment_payload
+from . import (
+    log, metrics, paginators, parsers, renderers, routers, schema, signed_urls, tenancy, throttling, tracing,
+)
+from .db.postgresql import base as pg_base
+from .models import StoredBlob
+from .storage import ContentAddressedStorage, document_storage
+from .storage_backends import InMemoryStorage, ShardedFileSystemStorage
+from .middleware import LoadSheddingMiddleware, ReplicaPinMiddleware
+
+
+class ORJSONTests(SimpleTestCase):
+    data = {
+        'criado_em': datetime.datetime(2025, 2, 10, 14, 3, 11, 512345, tzinfo=timezone.utc),
+        'local': datetime.datetime(2025, 2, 10, 14, 3, 11, tzinfo=datetime.timezone(datetime.timedelta(hours=-3))),
+        'data': datetime.date(2012, 5, 17),
+        'hora': datetime.time(7, 30, 0, 250000),
+        'duracao': datetime.timedelta(minutes=90),
+        'valor': decimal.Decimal('1234.50'),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'rotulo': gettext_lazy('Matrícula'),
+        'texto': 'São Paulo \u2028 \u2029 😀',
+        'lista': [1, 2.5, None, True, {'aninhado': 'ç'}],
+        1: 'chave numérica',
+    }
+
+    def test_render_matches_drf_json_renderer(self):
+        self.assertIsNotNone(renderers.orjson)
+        self.assertEqual(renderers.ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+        self.assertEqual(renderers.ORJSONRenderer().render(None), b'')
+
+    def test_indented_and_fallback_output_matches_drf(self):
+        context = {'indent': 4}
+        self.assertEqual(
+            renderers.ORJSONRenderer().render(self.data, 'application/json; indent=4', context),
+            JSONRenderer().render(self.data, 'application/json; indent=4', context),
+        )
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.ORJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_parse_matches_drf_json_parser(self):
+        body = JSONRenderer().render(self.data)
+        expected = JSONParser().parse(io.BytesIO(body))
+        self.assertEqual(parsers.ORJSONParser().parse(io.BytesIO(body)), expected)
+        with mock.patch.object(parsers, 'orjson', None):
+            self.assertEqual(parsers.ORJSONParser().parse(io.BytesIO(body)), expected)
+
+        latin1 = '{"cidade": "São Paulo"}'.encode('latin-1')
+        self.assertEqual(
+            parsers.ORJSONParser().parse(io.BytesIO(latin1), parser_context={'encoding': 'latin-1'}),
+            {'cidade': 'São Paulo'},
+        )
+        with self.assertRaises(ParseError):
+            parsers.ORJSONParser().parse(io.BytesIO(b'{"cidade": '))
+
+
+class FakeConnection:
+    isolation_level = 1
+    autocommit = False
+
+    def __init__(self, alive=True):
+        self.closed = 0
+        self.alive = alive
+        self.rollbacks = 0
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql):
+                if not connection.alive:
+                    raise pg_base.Database.OperationalError('server closed the connection unexpectedly')
+
+        return Cursor()
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakePsycopgPool:
+    """
+    Substituto do ThreadedConnectionPool: entrega as conexões de `idle` e
+    depois conexões novas (vivas).
+    """
+
+    def __init__(self, minconn, maxconn, **conn_params):
+        self.idle = []
+        self.returned = []
+
+    def getconn(self):
+        return self.idle.pop(0) if self.idle else FakeConnection()
+
+    def putconn(self, connection, close=False):
+        self.returned.append((connection, close))
+
+    def closeall(self):
+        pass
+
+
+@mock.patch.object(pg_base.psycopg2_pool, 'ThreadedConnectionPool', FakePsycopgPool)
+class PostgresPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(pg_base._pools.clear)
+
+    def wrapper(self, timeout=1, health_checks=True):
+        settings_dict = {
+            'NAME': 'educa', 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '', 'OPTIONS': {},
+            'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': health_checks, 'AUTOCOMMIT': True,
+            'TIME_ZONE': None, 'ATOMIC_REQUESTS': False,
+            'POOL': {'ENABLED': True, 'MIN_SIZE': 1, 'MAX_SIZE': 2, 'TIMEOUT': timeout},
+        }
+        return pg_base.DatabaseWrapper(settings_dict, alias='pooled')
+
+    def new_connection(self, wrapper):
+        with mock.patch.object(pg_base.base.psycopg2.extras, 'register_default_jsonb'):
+            return wrapper.get_new_connection({'dbname': 'educa'})
+
+    def test_pool_is_bounded_and_waits_up_to_timeout(self):
+        connection_pool = pg_base.ConnectionPool({}, min_size=1, max_size=1, timeout=0.05)
+        connection = connection_pool.getconn()
+        started = time.monotonic()
+        with self.assertRaises(pg_base.OperationalError):
+            connection_pool.getconn()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+        connection_pool.putconn(connection)
+        self.assertIs(connection_pool._pool.returned[-1][0], connection)
+        self.assertIsNotNone(connection_pool.getconn())
+
+    def test_failed_getconn_and_closed_connections_release_the_slot(self):
+        connection_pool = pg_base.ConnectionPool({}, min_size=1, max_size=1, timeout=0.01)
+        with mock.patch.object(connection_pool._pool, 'getconn', side_effect=pg_base.OperationalError):
+            with self.assertRaises(pg_base.OperationalError):
+                connection_pool.getconn()
+        connection = connection_pool.getconn()
+        connection.closed = 2
+        connection_pool.putconn(connection)
+        self.assertEqual(connection_pool._pool.returned, [(connection, True)])
+        connection_pool.getconn()
+
+    def test_pool_is_per_alias_and_recreated_after_fork(self):
+        options = {'ENABLED': True}
+        first = pg_base.get_pool('default', {}, options)
+        self.assertIs(pg_base.get_pool('default', {}, options), first)
+        self.assertIsNot(pg_base.get_pool('replica_1', {}, options), first)
+        with mock.patch.object(pg_base.os, 'getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(pg_base.get_pool('default', {}, options), first)
+
+    def test_dead_pooled_connections_are_replaced_by_a_live_one(self):
+        wrapper = self.wrapper()
+        dead = [FakeConnection(alive=False), FakeConnection(alive=False)]
+        pg_base.get_pool('pooled', {'dbname': 'educa'}, wrapper.pool_options)._pool.idle.extend(dead)
+
+        connection = self.new_connection(wrapper)
+        self.assertTrue(connection.alive)
+        self.assertEqual(connection.rollbacks, 1)
+        self.assertEqual(wrapper.connection_pool._pool.returned, [(dead[0], True), (dead[1], True)])
+
+    def test_gives_up_when_no_live_connection_before_timeout(self):
+        wrapper = self.wrapper(timeout=0.05)
+        fake_pool = pg_base.get_pool('pooled', {'dbname': 'educa'}, wrapper.pool_options)._pool
+        with mock.patch.object(fake_pool, 'getconn', side_effect=lambda: FakeConnection(alive=False)):
+            with self.assertRaises(pg_base.OperationalError):
+                self.new_connection(wrapper)
+        self.assertTrue(all(close for _, close in fake_pool.returned))
+
+    def test_close_returns_connection_to_the_pool(self):
+        wrapper = self.wrapper(health_checks=False)
+        wrapper.connection = self.new_connection(wrapper)
+        fake_pool = wrapper.connection_pool._pool
+        wrapper._close()
+        self.assertEqual(fake_pool.returned, [(wrapper.connection, False)])
+
+        wrapper.connection = self.new_connection(wrapper)
+        wrapper.errors_occurred = True
+        wrapper._close()
+        self.assertEqual(fake_pool.returned[-1], (wrapper.connection, True))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_APPS=['matricula', 'escolas', 'accounts'])
+class PrimaryReplicaRouterTests(TestCase):
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.addCleanup(routers.end_request)
+
+    def run_request(self, view, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        return ReplicaPinMiddleware(view)(request)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(Enrollment), 'replica_1')
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertEqual(self.router.db_for_write(SchoolUnit), 'default')
+
+    def test_read_after_write_stays_on_primary(self):
+        def view(request):
+            before = self.router.db_for_read(Enrollment)
+            self.router.db_for_write(SchoolUnit)
+            return HttpResponse('%s,%s' % (before, self.router.db_for_read(Enrollment)))
+
+        response = self.run_request(view)
+        self.assertEqual(response.content, b'replica_1,default')
+        self.assertIn(routers.PIN_COOKIE_NAME, response.cookies)
+
+    def test_pin_cookie_keeps_next_request_on_primary(self):
+        view = lambda request: HttpResponse(self.router.db_for_read(Enrollment))
+        self.assertEqual(self.run_request(view).content, b'replica_1')
+        self.assertEqual(self.run_request(view, **{routers.PIN_COOKIE_NAME: '1'}).content, b'default')
+
+    def test_pinned_user_reads_from_primary(self):
+        user = User.objects.create_user('jose', password='x')
+        routers.pin_user(user)
+
+        def view(request):
+            request.user = user
+            return HttpResponse(self.router.db_for_read(Enrollment))
+
+        self.assertEqual(self.run_request(view).content, b'default')
+
+
+@skipUnless('replica_test' in settings.DATABASES, 'requer educa_digital.settings_test')
+@override_settings(DATABASE_REPLICAS=['replica_test'], REPLICA_APPS=['matricula', 'escolas', 'accounts'])
+class ReplicaDatabaseRouterTests(TransactionTestCase):
+    """
+    Roteador com dois bancos reais: o primário e 'replica_test', que não
+    replica o primário. Cada leitura mostra de qual banco veio.
+    """
+    databases = {'default', 'replica_test'}
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        CepCentroid.objects.using('default').create(cep='01001000', latitude=-23.55, longitude=-46.63)
+        CepCentroid.objects.using('replica_test').create(cep='99999999', latitude=0, longitude=0)
+        # O flush do fim do teste pula a réplica (allow_migrate é False para ela)
+        self.addCleanup(CepCentroid.objects.using('replica_test').all().delete)
+        routers.end_request()
+        self.addCleanup(routers.end_request)
+
+    def run_request(self, view, user=None, **cookies):
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies)
+        if user is not None:
+            request.user = user
+        return ReplicaPinMiddleware(view)(request)
+
+    def read(self):
+        return ','.join(CepCentroid.objects.order_by('cep').values_list('cep', flat=True))
+
+    def test_reads_come_from_the_replica(self):
+        response = self.run_request(lambda request: HttpResponse(self.read()))
+        self.assertEqual(response.content, b'99999999')
+        self.assertNotIn(routers.PIN_COOKIE_NAME, response.cookies)
+
+    def test_read_after_write_uses_the_primary(self):
+        def view(request):
+            before = self.read()
+            CepCentroid.objects.create(cep='02012000', latitude=-23.5, longitude=-46.62)
+            return HttpResponse('%s|%s' % (before, self.read()))
+
+        response = self.run_request(view)
+        self.assertEqual(response.content, b'99999999|01001000,02012000')
+        self.assertIn(routers.PIN_COOKIE_NAME, response.cookies)
+        self.assertFalse(CepCentroid.objects.using('replica_test').filter(cep='02012000').exists())
+
+    def test_pinned_clients_read_from_the_primary(self):
+        view = lambda request: HttpResponse(self.read())
+        self.assertEqual(self.run_request(view, **{routers.PIN_COOKIE_NAME: '1'}).content, b'01001000')
+
+        user = User.objects.create_user('jose', password='x')
+        self.assertEqual(self.run_request(view, user=user).content, b'99999999')
+        routers.pin_user(user)
+        self.assertEqual(self.run_request(view, user=user).content, b'01001000')
+
+
+class SchemaArtifactTests(SimpleTestCase):
+
+    def setUp(self):
+        schema.load_artifact.cache_clear()
+        self.addCleanup(schema.load_artifact.cache_clear)
+
+    def test_stored_schema_matches_code(self):
+        # Falha quando uma view/serializer muda sem rodar generate_schema.
+        call_command('generate_schema', '--check', stdout=io.StringIO())
+
+    def test_schema_served_from_artifact_with_etag(self):
+        response = self.client.get('/swagger/?format=openapi')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/openapi+json')
+        self.assertEqual(response.content, (settings.SCHEMA_ARTIFACT_DIR / 'openapi.json').read_bytes())
+
+        response = self.client.get('/swagger.yaml', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get('/swagger.yaml', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_worker_boot_does_not_import_drf_yasg(self):
+        code = (
+            'import importlib, sys, educa_digital.wsgi; importlib.import_module(%r); '
+            'print(sorted(m for m in sys.modules if m.startswith("drf_yasg.")))' % settings.ROOT_URLCONF
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = FileSystemStorage(location=directory.name)
+        self.storage = ContentAddressedStorage(self.backend)
+
+    def stored_files(self):
+        return [os.path.join(root, name) for root, _, names in os.walk(self.backend.location) for name in names]
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('documents/comprovante.PDF', ContentFile(b'conta de luz'))
+        second = self.storage.save('documents/outro-nome.pdf', ContentFile(b'conta de luz'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^documents/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(StoredBlob.objects.get().ref_count, 2)
+
+        self.storage.delete(first)
+        self.assertTrue(self.backend.exists(first))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+            self.assertTrue(self.backend.exists(first))
+        self.assertFalse(self.backend.exists(first))
+        self.assertFalse(StoredBlob.objects.exists())
+
+    def test_rolled_back_release_keeps_the_file(self):
+        name = self.storage.save('documents/comprovante.pdf', ContentFile(b'conta de luz'))
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.storage.delete(name)
+                raise RuntimeError
+        self.assertTrue(self.backend.exists(name))
+        self.assertEqual(StoredBlob.objects.get().ref_count, 1)
+
+    def test_enrollment_documents_share_and_release_files(self):
+        def upload(content):
+            return SimpleUploadedFile('doc.pdf', content, content_type='application/pdf')
+
+        with mock.patch.object(document_storage(), '_backend', self.backend):
+            first = EnrollmentDocuments.objects.create(
+                enrollment=create_enrollment(), comprovante_residencia=upload(b'comprovante'),
+                historico_escolar=upload(b'historico 1'),
+            )
+            second = EnrollmentDocuments.objects.create(
+                enrollment=create_enrollment(cpf='222.222.222-22'), comprovante_residencia=upload(b'comprovante'),
+                historico_escolar=upload(b'historico 2'),
+            )
+            self.assertEqual(first.comprovante_residencia.name, second.comprovante_residencia.name)
+            self.assertEqual(len(self.stored_files()), 3)
+
+            # Reenvio: o arquivo anterior é liberado.
+            second = EnrollmentDocuments.objects.get(pk=second.pk)
+            second.historico_escolar = upload(b'historico 2 corrigido')
+            with self.captureOnCommitCallbacks(execute=True):
+                second.save()
+            self.assertEqual(len(self.stored_files()), 3)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                first.delete()
+            self.assertEqual(
+                dict(StoredBlob.objects.values_list('name', 'ref_count')),
+                {second.comprovante_residencia.name: 1, second.historico_escolar.name: 1},
+            )
+            self.assertEqual(len(self.stored_files()), 2)
+
+
+class CountingStorage(FileSystemStorage):
+    querystring_expire = 600
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.signed = []
+
+    def url(self, name):
+        self.signed.append(name)
+        return '/signed/%s?exp=%d' % (name, len(self.signed))
+
+
+@override_settings(SIGNED_URL_REFRESH_MARGIN=60)
+class SignedUrlTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CountingStorage(location=tempfile.gettempdir())
+
+    def test_urls_are_signed_once_in_batch_and_cached(self):
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            urls = signed_urls.urls_for(self.backend, ['a.pdf', 'b.pdf', 'a.pdf'])
+        self.assertEqual(sorted(self.backend.signed), ['a.pdf', 'b.pdf'])
+        set_many.assert_called_once_with(mock.ANY, 540)  # validade - margem
+
+        self.assertEqual(signed_urls.urls_for(self.backend, ['a.pdf', 'b.pdf']), urls)
+        self.assertEqual(signed_urls.url_for(self.backend, 'b.pdf'), urls['b.pdf'])
+        self.assertEqual(len(self.backend.signed), 2)
+
+    def test_document_list_signs_page_in_one_batch(self):
+        for cpf in ('111.111.111-11', '222.222.222-22'):
+            EnrollmentDocuments.objects.create(
+                enrollment=create_enrollment(cpf=cpf), comprovante_residencia='documents/%s-c.pdf' % cpf[:3],
+                historico_escolar='documents/%s-h.pdf' % cpf[:3],
+            )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('revisor', is_staff=True))
+        query = '?' + '&'.join('enrollment=%d' % pk for pk in Enrollment.objects.values_list('pk', flat=True))
+
+        with mock.patch.object(document_storage(), '_backend', self.backend):
+            response = client.get('/matricula/enrollment/documents/' + query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), 2)
+            self.assertEqual(len(self.backend.signed), 4)
+            self.assertTrue(response.data[0]['historico_escolar'].startswith('http://testserver/signed/documents/'))
+            self.assertIsNone(response.data[0]['cartao_sus'])
+
+            client.get('/matricula/enrollment/documents/' + query)
+            self.assertEqual(len(self.backend.signed), 4)
+
+
+class StorageBackendTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backends = [InMemoryStorage(), ShardedFileSystemStorage(location=directory.name)]
+
+    def test_backends_round_trip_through_content_addressed_storage(self):
+        for backend in self.backends:
+            with self.subTest(backend=type(backend).__name__):
+                storage = ContentAddressedStorage(backend)
+                name = storage.save('documents/rg.pdf', ContentFile(b'rg do aluno'))
+                self.assertTrue(storage.exists(name))
+                self.assertEqual(storage.size(name), 11)
+                with storage.open(name) as f:
+                    self.assertEqual(f.read(), b'rg do aluno')
+                self.assertEqual(backend.listdir('documents')[0], [name.split('/')[1]])
+                with self.captureOnCommitCallbacks(execute=True):
+                    storage.delete(name)
+                self.assertFalse(storage.exists(name))
+
+    def test_local_backend_shards_generated_names(self):
+        name = self.backends[1].generate_filename('documents/historico.pdf')
+        self.assertRegex(name, r'^documents/[0-9a-f]{2}/[0-9a-f]{2}/historico\.pdf$')
+
+    def test_signed_url_serves_file_until_it_expires(self):
+        backend = self.backends[0]
+        backend.save('documents/ab/cd/certidao.pdf', ContentFile(b'certidao'))
+        url = backend.url('documents/ab/cd/certidao.pdf')
+        self.assertTrue(url.startswith('/files/documents/ab/cd/certidao.pdf?expires='))
+
+        with mock.patch('educa_digital.core.views.default_storage', backend):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'certidao')
+
+            self.assertEqual(self.client.get(url.replace('certidao.pdf', 'outro.pdf')).status_code, 404)
+            self.assertEqual(self.client.get(url[:-1]).status_code, 404)
+            with mock.patch('time.time', return_value=time.time() + settings.AWS_QUERYSTRING_EXPIRE + 1):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CapturingHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def burst(self, attempts=20):
+        with ThreadPoolExecutor(max_workers=attempts) as executor:
+            results = list(executor.map(lambda _: throttling.consume('burst', 5, 5 / 60), range(attempts)))
+        return [allowed for allowed, _ in results].count(True)
+
+    def test_concurrent_burst_never_exceeds_the_limit(self):
+        self.assertEqual(self.burst(), 5)
+        allowed, wait = throttling.consume('burst', 5, 5 / 60)
+        self.assertFalse(allowed)
+        self.assertTrue(0 < wait <= 60)
+
+    def test_local_fallback_is_atomic_too(self):
+        with mock.patch.object(throttling.cache, 'add', side_effect=ConnectionError), \
+                mock.patch.object(throttling.cache, 'get', side_effect=ConnectionError):
+            self.assertEqual(self.burst(), 5)
+
+    def test_bucket_refills_at_the_rate_up_to_its_capacity(self):
+        def consume(now):
+            with mock.patch.object(throttling.time, 'time', return_value=now):
+                return throttling.consume('bucket', 5, 5 / 60)
+
+        self.assertEqual([consume(600.0)[0] for _ in range(5)], [True] * 5)
+        allowed, wait = consume(600.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 12)
+        # Uma ficha a cada 12 s; a tentativa recusada não gastou nada
+        self.assertEqual([consume(612.0)[0] for _ in range(2)], [True, False])
+        allowed, wait = consume(618.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(wait, 6)
+        # Parado por muito tempo, o balde enche só até a capacidade
+        self.assertEqual([consume(6000.0)[0] for _ in range(6)], [True] * 5 + [False])
+
+    def test_client_ip_ignores_forged_forwarded_for(self):
+        request = self.factory.post('/users/login/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.2.3.4')
+        self.assertEqual(throttling.LoginIPThrottle().get_ident_key(request, None), '10.0.0.1')
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            request = self.factory.post(
+                '/users/login/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='6.6.6.6, 1.2.3.4',
+            )
+            self.assertEqual(throttling.LoginIPThrottle().get_ident_key(request, None), '1.2.3.4')
+
+    @override_settings(LOAD_SHEDDING_LIMITS={'/users/login/': 1}, LOAD_SHEDDING_RETRY_AFTER=3)
+    def test_load_shedding_rejects_requests_over_the_limit(self):
+        entered, release = threading.Event(), threading.Event()
+
+        def slow_view(request):
+            entered.set()
+            release.wait(5)
+            return HttpResponse('ok')
+
+        middleware = LoadSheddingMiddleware(slow_view)
+        rejected = metrics.snapshot()['counters'].get('load_shedding.rejected /users/login/', 0)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first = executor.submit(middleware, self.factory.post('/users/login/'))
+            self.assertTrue(entered.wait(5))
+            self.assertEqual(metrics.snapshot()['gauges']['in_flight /users/login/'], 1)
+
+            response = middleware(self.factory.post('/users/login/'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '3')
+            release.set()
+            self.assertEqual(first.result().status_code, 200)
+
+        counters = metrics.snapshot()
+        self.assertEqual(counters['counters']['load_shedding.rejected /users/login/'], rejected + 1)
+        self.assertEqual(counters['gauges']['in_flight /users/login/'], 0)
+        self.assertEqual(middleware(self.factory.post('/users/login/')).status_code, 200)
+        self.assertNotIn('in_flight /matricula/events/', counters['gauges'])  # outras rotas não são limitadas
+
+    def test_metrics_are_staff_only(self):
+        client = APIClient()
+        self.assertIn(client.get('/metrics/').status_code, (401, 403))
+        client.force_authenticate(User.objects.create_user('jose', password='x'))
+        self.assertEqual(client.get('/metrics/').status_code, 403)
+
+        metrics.incr('throttle.login_ip')
+        client.force_authenticate(User.objects.create_user('admin', password='x', is_staff=True))
+        response = client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pid'], os.getpid())
+        self.assertGreaterEqual(response.data['counters']['throttle.login_ip'], 1)
+
+
+class ObservabilityTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+        self.spans = CapturingHandler()
+        tracing.logger.addHandler(self.spans)
+        level = tracing.logger.level
+        tracing.logger.setLevel(logging.DEBUG)
+        self.addCleanup(tracing.logger.setLevel, level)
+        self.addCleanup(tracing.logger.removeHandler, self.spans)
+
+    def span_records(self):
+        return {record.span['name']: record.span for record in self.spans.records}
+
+    def test_request_id_is_echoed_or_generated(self):
+        response = self.client.get('/matricula/enrollment/', HTTP_X_REQUEST_ID='req-12345678')
+        self.assertEqual(response['X-Request-ID'], 'req-12345678')
+
+        response = self.client.get('/matricula/enrollment/', HTTP_X_REQUEST_ID='inválido\n')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+        self.assertIsNone(log.get_request_id())
+
+    def test_enrollment_stages_are_exported_as_child_spans(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json',
+                                        HTTP_X_REQUEST_ID='trace-0001')
+        self.assertEqual(response.status_code, 201)
+
+        spans = self.span_records()
+        root = spans['http.request']
+        self.assertIsNone(root['parent_span_id'])
+        self.assertEqual(root['attributes']['status_code'], 201)
+        for name in ['enrollment.validate', 'enrollment.profiles', 'enrollment.address', 'enrollment.users']:
+            self.assertEqual(spans[name]['trace_id'], 'trace-0001')
+            self.assertEqual(spans[name]['parent_span_id'], root['span_id'])
+            self.assertEqual(spans[name]['status'], 'OK')
+        self.assertEqual(spans['enrollment.users']['attributes']['criados'], 2)
+        self.assertIn('whatsapp.send', spans)
+
+    def test_failed_span_records_the_exception(self):
+        with self.assertRaises(ValueError), tracing.span('falha'):
+            raise ValueError
+        span = self.span_records()['falha']
+        self.assertEqual(span['status'], 'ERROR')
+        self.assertEqual(span['attributes']['exception.type'], 'ValueError')
+
+    def test_async_handler_writes_json_lines_with_request_id(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'app.log')
+            handler = log.AsyncHandler(filename=path)
+            handler.addFilter(log.RequestIdFilter())
+            logger = logging.getLogger('educa_digital.tests.async')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            self.addCleanup(logger.removeHandler, handler)
+
+            log.set_request_id('req-abcdef12')
+            try:
+                logger.warning('Matrícula %s recebida', 42, extra={'etapa': 3})
+            finally:
+                log.set_request_id(None)
+            handler.close()
+
+            with open(path, encoding='utf-8') as f:
+                line = json.loads(f.readline())
+        self.assertEqual(line['message'], 'Matrícula 42 recebida')
+        self.assertEqual(line['level'], 'WARNING')
+        self.assertEqual(line['request_id'], 'req-abcdef12')
+        self.assertEqual(line['etapa'], 3)
+
+
+class EstimatedCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        create_enrollment()
+        create_enrollment(cpf='222.222.222-22', situacao='aprovado')
+        tenancy.activate(tenancy.default_tenant())
+        self.addCleanup(tenancy.deactivate)
+
+    def count(self, queryset):
+        postgresql = mock.MagicMock(vendor='postgresql')
+        with mock.patch.object(paginators, 'connections', {'default': postgresql}), \
+                mock.patch.object(paginators.EstimatedCountPaginator, 'estimate', return_value=50000):
+            return paginators.EstimatedCountPaginator(queryset, 100).count
+
+    def test_tenant_filter_alone_uses_the_estimate(self):
+        queryset = Enrollment.objects.order_by('-pk')
+        self.assertTrue(paginators.EstimatedCountPaginator.unfiltered(queryset))
+        self.assertEqual(self.count(queryset), 50000)
+
+    def test_other_filters_count_normally(self):
+        queryset = Enrollment.objects.filter(situacao='aprovado').order_by('-pk')
+        self.assertFalse(paginators.EstimatedCountPaginator.unfiltered(queryset))
+        self.assertEqual(self.count(queryset), 1)
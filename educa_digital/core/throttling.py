@@ -0,0 +1,174 @@
+# core/throttling.py
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from . import metrics
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+# Tentativas de pegar a trava do balde no cache antes de desistir
+LOCK_ATTEMPTS = 50
+LOCK_DELAY = 0.002
+
+
+def _take(state, capacity, refill_rate, now):
+    """
+    Reabastece o balde desde a última leitura e tenta tirar uma ficha.
+
+    Retorna (permitido, espera em segundos, novo estado (fichas, instante)).
+    """
+    tokens, stamp = state or (capacity, now)
+    tokens = min(capacity, tokens + max(now - stamp, 0) * refill_rate)
+    if tokens >= 1:
+        return True, 0, (tokens - 1, now)
+    return False, (1 - tokens) / refill_rate, (tokens, now)
+
+
+class LocalBucketStore:
+    """
+    Baldes em memória do processo, usados quando o cache está fora do ar.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate, now):
+        with self._lock:
+            if len(self._data) > 10000:
+                # Baldes que já teriam enchido de novo equivalem a não existir
+                self._data = {
+                    k: v for k, v in self._data.items() if v[1] + capacity / refill_rate > now
+                }
+            allowed, wait, self._data[key] = _take(self._data.get(key), capacity, refill_rate, now)
+            return allowed, wait
+
+
+local_store = LocalBucketStore()
+
+
+def _cache_take(key, capacity, refill_rate, now):
+    """
+    Tira uma ficha do balde guardado no cache. O cache do Django não tem
+    compare-and-set, então a leitura e a escrita do estado ficam sob uma trava
+    (cache.add, atômico em todos os backends) com validade curta.
+    """
+    lock = '%s:lock' % key
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, 1):
+            break
+        time.sleep(LOCK_DELAY)
+    else:
+        # Disputa pela mesma chave: só acontece numa rajada, que é recusada
+        metrics.incr('throttle.lock_contention')
+        return False, 1 / refill_rate
+    try:
+        allowed, wait, state = _take(cache.get(key), capacity, refill_rate, now)
+        # Depois de capacity/refill_rate segundos parado o balde está cheio,
+        # o mesmo que não ter estado guardado
+        cache.set(key, state, int(capacity / refill_rate) + 1)
+        return allowed, wait
+    finally:
+        cache.delete(lock)
+
+
+def consume(key, capacity, refill_rate):
+    """
+    Tira uma ficha do balde `key` e retorna (permitido, espera em segundos).
+
+    Token bucket: o balde comporta até `capacity` fichas (a rajada permitida)
+    e recebe `refill_rate` fichas por segundo. Cada tentativa gasta uma ficha;
+    sem ficha, é recusada e não gasta nada. O estado fica no cache,
+    compartilhado entre os workers; se o cache falhar, em memória do processo.
+    """
+    now = time.time()
+    try:
+        return _cache_take(key, capacity, refill_rate, now)
+    except Exception:
+        metrics.incr('throttle.cache_errors')
+        return local_store.take(key, capacity, refill_rate, now)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle do DRF com token bucket (consume), guardado no cache.
+
+    A taxa vem de REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'][scope] no formato
+    do DRF ('5/min'): rajada de até 5 tentativas, com uma ficha nova a cada
+    12 s.
+    """
+    scope = None
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def __init__(self):
+        self.capacity, self.refill_rate = self.parse_rate(self.get_rate())
+        self._wait = None
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured("Nenhuma taxa definida para o escopo '%s'." % self.scope)
+
+    @staticmethod
+    def parse_rate(rate):
+        num, period = rate.split('/')
+        num = int(num)
+        return num, num / PERIODS[period[0]]
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        key = self.cache_format % {'scope': self.scope, 'ident': ident}
+        allowed, self._wait = consume(key, self.capacity, self.refill_rate)
+        if not allowed:
+            metrics.incr('throttle.%s' % self.scope)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    """
+    Limita pelo IP do cliente. Atrás de proxies, REST_FRAMEWORK['NUM_PROXIES']
+    indica quantos endereços do X-Forwarded-For são dos proxies confiáveis; o
+    cliente é o anterior a eles. Com 0 (padrão), vale o REMOTE_ADDR e o
+    X-Forwarded-For, que o cliente pode forjar, é ignorado.
+    """
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register_ip'
+
+
+class LoginUsernameThrottle(TokenBucketThrottle):
+    """
+    Limita tentativas por username, independente do IP (ataques distribuídos).
+    """
+    scope = 'login_username'
+
+    def get_ident_key(self, request, view):
+        username = request.data.get('username')
+        if not isinstance(username, str) or not username:
+            return None
+        # Hash para manter a chave do cache curta e sem caracteres inválidos.
+        return hashlib.sha256(username.strip().lower().encode()).hexdigest()[:32]
@@ -0,0 +1,86 @@
+# core/tracing.py
+"""
+Spans no estilo OpenTelemetry para medir as etapas de uma requisição.
+
+    with tracing.span('enrollment.validate', campos=12):
+        ...
+
+Cada span encerrado é exportado como uma linha JSON (trace_id, span_id,
+parent_span_id, nome, início/fim em ns, duração, status e atributos) pelo
+logger 'educa_digital.trace', que grava de forma assíncrona no arquivo
+settings.TRACE_EXPORT_FILE (ou em um coletor, trocando o handler). Sem o
+arquivo configurado o logger fica desligado e os spans não custam nada além
+da medição do tempo.
+
+O trace de uma requisição usa o ID da requisição (RequestIdMiddleware) como
+trace_id; os spans abertos dentro de outro viram filhos dele.
+"""
+import contextlib
+import json
+import logging
+import secrets
+import time
+
+from asgiref.local import Local
+
+from . import log
+
+logger = logging.getLogger('educa_digital.trace')
+
+_state = Local()
+
+
+def _stack():
+    stack = getattr(_state, 'stack', None)
+    if stack is None:
+        stack = _state.stack = []
+    return stack
+
+
+def current_span_id():
+    stack = getattr(_state, 'stack', None)
+    return stack[-1]['span_id'] if stack else None
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """
+    Mede o bloco como um span. Yield do dicionário de atributos, que pode
+    ser completado dentro do bloco (ex.: se o upload foi deduplicado).
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    record = {
+        'trace_id': parent['trace_id'] if parent else (log.get_request_id() or secrets.token_hex(16)),
+        'span_id': secrets.token_hex(8),
+        'parent_span_id': parent['span_id'] if parent else None,
+        'name': name,
+        'attributes': attributes,
+    }
+    stack.append(record)
+    start = time.time_ns()
+    status = 'OK'
+    try:
+        yield attributes
+    except BaseException as exc:
+        status = 'ERROR'
+        attributes['exception.type'] = type(exc).__name__
+        raise
+    finally:
+        end = time.time_ns()
+        stack.pop()
+        if logger.isEnabledFor(logging.DEBUG):
+            record.update(
+                start_time_unix_nano=start, end_time_unix_nano=end,
+                duration_ms=round((end - start) / 1e6, 3), status=status,
+            )
+            logger.debug(name, extra={'span': record})
+
+
+class SpanFormatter(logging.Formatter):
+    """
+    Formato de exportação: só o span, uma linha JSON por span.
+    """
+
+    def format(self, record):
+        return json.dumps(record.span, ensure_ascii=False, default=str)
@@ -0,0 +1,37 @@
+# core/uploadhandlers.py
+"""
+Upload handlers que calculam o sha256 do arquivo enquanto ele é recebido,
+disponível em `arquivo.sha256` (usado pelo ContentAddressedStorage para não
+ler o arquivo uma segunda vez).
+"""
+import hashlib
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class HashingMixin:
+
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # O handler em memória só repassa os dados quando não está ativo
+        # (arquivo grande); quem calcula o hash é o handler seguinte.
+        if getattr(self, 'activated', True):
+            self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin, TemporaryFileUploadHandler):
+    pass
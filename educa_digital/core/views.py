@@ -0,0 +1,37 @@
+# core/views.py
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.views.decorators.http import require_safe
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import metrics
+from .storage_backends import verify_signature
+
+
+class MetricsView(APIView):
+    """
+    Contadores do worker que atendeu a requisição (throttling, load shedding
+    e requisições em andamento), para coleta pelo monitoramento.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
+@require_safe
+def signed_file_view(request, name):
+    """
+    Download pelas URLs assinadas dos backends local e em memória (o papel da
+    URL pré-assinada do S3). Assinatura inválida ou expirada responde 404,
+    como o S3 faria com 403, sem revelar se o arquivo existe.
+    """
+    if not verify_signature(name, request.GET.get('expires'), request.GET.get('signature')):
+        raise Http404
+    try:
+        content = default_storage.open(name)
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(content, as_attachment=False, filename=name.rsplit('/', 1)[-1])
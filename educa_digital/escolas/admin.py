@@ -1,13 +1,10 @@
 from django.contrib import admin
 from .models import SchoolUnit
 
-try:
-    admin.site.unregister(SchoolUnit)
-except admin.sites.NotRegistered:
-    pass
 
 class SchoolUnitAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'cnpj', 'email', 'ativo')
+    list_display = ('nome', 'cnpj', 'cep', 'vagas', 'ativo')
+    list_filter = ('ativo',)
     search_fields = ('nome', 'cnpj')
 
 admin.site.register(SchoolUnit, SchoolUnitAdmin)
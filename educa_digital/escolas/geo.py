@@ -0,0 +1,138 @@
+# escolas/geo.py
+"""
+Geolocalização offline pelo CEP e busca dos vizinhos mais próximos.
+
+As coordenadas vêm da base de centroides de CEP (CepCentroid, carregada por
+`manage.py load_cep_centroids`): o CEP exato ou, na falta dele, o centroide
+do setor (5 primeiros dígitos). Nenhum serviço externo é consultado.
+
+Para a busca, cada ponto vira um vetor unitário 3D (posição na esfera): a
+distância em linha reta entre vetores cresce com a distância sobre a
+superfície, então a k-d tree em 3D encontra os vizinhos exatos, sem as
+distorções de projetar latitude/longitude no plano.
+"""
+import heapq
+import math
+import re
+
+from django.core.cache import cache
+
+from .models import CepCentroid
+
+EARTH_RADIUS_KM = 6371.0088
+GEOCODE_CACHE_TIMEOUT = 24 * 3600
+
+# Só dígitos ASCII: \d também aceita dígitos Unicode
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def normalize_cep(value):
+    """
+    CEP com 8 dígitos (sem hífen), ou None se inválido.
+    """
+    digits = _NON_DIGITS.sub('', value or '')
+    return digits if len(digits) == 8 else None
+
+
+def _candidates(cep):
+    return [cep, cep[:5]]
+
+
+def geocode_many(ceps):
+    """
+    {cep: (latitude, longitude)} dos CEPs encontrados, com uma consulta.
+    As chaves são os valores recebidos; CEPs inválidos ou fora da base ficam
+    de fora.
+    """
+    normalized = {value: normalize_cep(value) for value in ceps}
+    keys = {key for cep in normalized.values() if cep for key in _candidates(cep)}
+    rows = CepCentroid.objects.filter(cep__in=keys).values_list('cep', 'latitude', 'longitude')
+    found = {cep: (latitude, longitude) for cep, latitude, longitude in rows.iterator(chunk_size=2000)}
+    result = {}
+    for value, cep in normalized.items():
+        if cep:
+            point = next((found[key] for key in _candidates(cep) if key in found), None)
+            if point is not None:
+                result[value] = point
+    return result
+
+
+def geocode(cep):
+    """
+    (latitude, longitude) do CEP, ou None. Em cache, inclusive CEPs não
+    encontrados, até a próxima carga da base (forget_cached).
+    """
+    cep = normalize_cep(cep)
+    if cep is None:
+        return None
+    version = cache.get_or_set('geocode:version', 1, None)
+    point = cache.get('geocode:%s' % cep, version=version)
+    if point is None:
+        point = geocode_many([cep]).get(cep, False)
+        cache.set('geocode:%s' % cep, point, GEOCODE_CACHE_TIMEOUT, version=version)
+    return point or None
+
+
+def forget_cached():
+    """
+    Descarta o cache de geocode (após carregar a base de centroides).
+    """
+    try:
+        cache.incr('geocode:version')
+    except ValueError:
+        pass
+
+
+def to_vector(latitude, longitude):
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def chord_to_km(squared_chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(squared_chord) / 2))
+
+
+class KDTree:
+    """
+    k-d tree estática sobre vetores 3D. `points` é uma lista de
+    (vetor, item); `nearest` retorna os k itens mais próximos aceitos por
+    `accept(item)`, com o quadrado da distância.
+    """
+
+    def __init__(self, points):
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda point: point[0][axis])
+        median = len(points) // 2
+        vector, item = points[median]
+        return (vector, item, axis,
+                self._build(points[:median], depth + 1), self._build(points[median + 1:], depth + 1))
+
+    def nearest(self, vector, k, accept=None):
+        heap = []  # max-heap pela distância: (-d², desempate, item)
+        x, y, z = vector
+
+        def visit(node):
+            point, item, axis, left, right = node
+            squared = (x - point[0]) ** 2 + (y - point[1]) ** 2 + (z - point[2]) ** 2
+            if accept is None or accept(item):
+                if len(heap) < k:
+                    heapq.heappush(heap, (-squared, id(node), item))
+                elif squared < -heap[0][0]:
+                    heapq.heapreplace(heap, (-squared, id(node), item))
+            diff = vector[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            if near is not None:
+                visit(near)
+            # O outro lado só pode ter pontos mais próximos se o plano de
+            # corte estiver mais perto que o k-ésimo vizinho atual
+            if far is not None and (len(heap) < k or diff * diff < -heap[0][0]):
+                visit(far)
+
+        if self.root is not None and k > 0:
+            visit(self.root)
+        return [(item, -negative) for negative, _, item in sorted(heap, reverse=True)]
@@ -0,0 +1,78 @@
+# escolas/management/commands/load_cep_centroids.py
+import csv
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from educa_digital.escolas import geo
+from educa_digital.escolas.models import CepCentroid, SchoolUnit
+
+
+class Command(BaseCommand):
+    help = (
+        'Carrega a base offline de centroides de CEP a partir de um CSV com as colunas '
+        'cep, latitude e longitude (separadas por "," ou ";") e geolocaliza as escolas '
+        'com CEP e sem coordenadas. CEPs já carregados são mantidos, salvo com --replace.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', help='Arquivo CSV com cabeçalho cep,latitude,longitude.')
+        parser.add_argument('--replace', action='store_true',
+                            help='Apaga a base atual antes de carregar.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Linhas por INSERT (padrão: 5000).')
+
+    def read(self, path):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+            except csv.Error:
+                dialect = csv.excel
+            reader = csv.DictReader(f, dialect=dialect)
+            missing = {'cep', 'latitude', 'longitude'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError('Colunas ausentes no CSV: %s' % ', '.join(sorted(missing)))
+            for line, row in enumerate(reader, start=2):
+                cep = geo.normalize_cep(row['cep'])
+                # CEP de setor (5 dígitos) também é aceito
+                if cep is None and re.fullmatch(r'[0-9]{5}', row['cep'].strip()):
+                    cep = row['cep'].strip()
+                try:
+                    latitude = float(row['latitude'].replace(',', '.'))
+                    longitude = float(row['longitude'].replace(',', '.'))
+                except (TypeError, ValueError):
+                    latitude = longitude = None
+                if cep is None or latitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    self.stderr.write('Linha %d ignorada: %r' % (line, row))
+                    continue
+                yield CepCentroid(cep=cep, latitude=latitude, longitude=longitude)
+
+    def handle(self, *args, **options):
+        try:
+            rows = self.read(options['csv_path'])
+            with transaction.atomic():
+                if options['replace']:
+                    CepCentroid.objects.all().delete()
+                total = 0
+                batch = []
+                for centroid in rows:
+                    batch.append(centroid)
+                    if len(batch) >= options['batch_size']:
+                        total += len(CepCentroid.objects.bulk_create(batch, ignore_conflicts=True))
+                        batch = []
+                total += len(CepCentroid.objects.bulk_create(batch, ignore_conflicts=True))
+        except OSError as exc:
+            raise CommandError('Não foi possível ler o CSV: %s' % exc)
+        self.stdout.write(self.style.SUCCESS('%d centroides de CEP lidos.' % total))
+
+        geo.forget_cached()
+        schools = list(SchoolUnit.objects.exclude(cep='').filter(latitude__isnull=True))
+        points = geo.geocode_many({school.cep for school in schools})
+        located = [school for school in schools if school.cep in points]
+        for school in located:
+            school.latitude, school.longitude = points[school.cep]
+        SchoolUnit.objects.bulk_update(located, ['latitude', 'longitude'], batch_size=options['batch_size'])
+        self.stdout.write('%d escolas geolocalizadas.' % len(located))
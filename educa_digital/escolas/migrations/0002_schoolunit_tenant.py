@@ -0,0 +1,28 @@
+# Generated by Django 3.2 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def assign_default_tenant(apps, schema_editor):
+    db = schema_editor.connection.alias
+    tenant = apps.get_model('core', 'Tenant').objects.using(db).get(slug=settings.DEFAULT_TENANT)
+    apps.get_model('escolas', 'SchoolUnit').objects.using(db).update(tenant=tenant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_tenant'),
+        ('escolas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolunit',
+            name='tenant',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+    ]
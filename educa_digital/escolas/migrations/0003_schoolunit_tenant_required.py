@@ -0,0 +1,25 @@
+# Generated by Django 3.2 on 2026-10-19 13:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    # Separada da 0002: no PostgreSQL, o ALTER TABLE não pode ocorrer na mesma
+    # transação do UPDATE que preencheu a chave estrangeira.
+
+    dependencies = [
+        ('escolas', '0002_schoolunit_tenant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schoolunit',
+            name='tenant',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='schoolunit',
+            index=models.Index(fields=['tenant', 'ativo'], name='schoolunit_tenant_ativo_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escolas', '0003_schoolunit_tenant_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CepCentroid',
+            fields=[
+                ('cep', models.CharField(max_length=8, primary_key=True, serialize=False)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='schoolunit',
+            name='cep',
+            field=models.CharField(blank=True, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='schoolunit',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schoolunit',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='schoolunit',
+            name='vagas',
+            field=models.PositiveIntegerField(blank=True, help_text='Vagas por ano letivo (vazio: sem limite)', null=True),
+        ),
+    ]
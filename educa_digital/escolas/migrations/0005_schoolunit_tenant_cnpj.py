@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escolas', '0004_geolocation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='schoolunit',
+            name='cnpj',
+            field=models.CharField(max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='schoolunit',
+            constraint=models.UniqueConstraint(fields=('tenant', 'cnpj'), name='schoolunit_tenant_cnpj_uniq'),
+        ),
+    ]
@@ -1,14 +1,51 @@
 # escolas/models.py
 from django.db import models
 
-class SchoolUnit(models.Model):
+from educa_digital.core.models import TenantScopedModel
+
+
+class SchoolUnit(TenantScopedModel):
     nome = models.CharField(max_length=255)
-    cnpj = models.CharField(max_length=20, unique=True)
+    cnpj = models.CharField(max_length=20)
     endereco = models.CharField(max_length=255)
+    cep = models.CharField(max_length=9, blank=True)
+    # Preenchidas pelo CEP (geo.py) quando vazias
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    vagas = models.PositiveIntegerField(null=True, blank=True, help_text='Vagas por ano letivo (vazio: sem limite)')
     telefone = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     ativo = models.BooleanField(default=True)
     # Outros campos legais...
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'ativo'], name='schoolunit_tenant_ativo_idx'),
+        ]
+        constraints = [
+            # O CNPJ é único dentro de cada rede (redes diferentes podem cadastrar a mesma escola)
+            models.UniqueConstraint(fields=['tenant', 'cnpj'], name='schoolunit_tenant_cnpj_uniq'),
+        ]
+
     def __str__(self):
         return self.nome
+
+    def save(self, *args, **kwargs):
+        if self.cep and (self.latitude is None or self.longitude is None):
+            from .geo import geocode
+
+            self.latitude, self.longitude = geocode(self.cep) or (None, None)
+        super().save(*args, **kwargs)
+
+
+class CepCentroid(models.Model):
+    """
+    Ponto central de um CEP (8 dígitos) ou de um setor de CEP (5 dígitos),
+    importado de uma base offline pelo comando load_cep_centroids.
+    """
+    cep = models.CharField(max_length=8, primary_key=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    def __str__(self):
+        return self.cep
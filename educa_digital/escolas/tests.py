@@ -1,3 +1,73 @@
-from django.test import TestCase
+import io
+import math
+import os
+import random
+import tempfile
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from . import geo
+from .models import CepCentroid, SchoolUnit
+
+
+class KDTreeTests(SimpleTestCase):
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(7)
+        points = [(geo.to_vector(rng.uniform(-34, 5), rng.uniform(-74, -34)), i) for i in range(500)]
+        tree = geo.KDTree(points)
+        for _ in range(50):
+            query = geo.to_vector(rng.uniform(-34, 5), rng.uniform(-74, -34))
+            expected = sorted(
+                (sum((a - b) ** 2 for a, b in zip(query, vector)), item)
+                for vector, item in points if item % 3
+            )[:5]
+            found = tree.nearest(query, 5, accept=lambda item: item % 3)
+            self.assertEqual([item for item, _ in found], [item for _, item in expected])
+        self.assertEqual(geo.KDTree([]).nearest(query, 3), [])
+
+    def test_chord_to_km(self):
+        # Sé (São Paulo) até a Praça dos Três Poderes (Brasília): ~873 km
+        a, b = geo.to_vector(-23.5503, -46.6339), geo.to_vector(-15.7998, -47.8645)
+        squared = sum((x - y) ** 2 for x, y in zip(a, b))
+        self.assertAlmostEqual(geo.chord_to_km(squared), 873, delta=5)
+        self.assertEqual(geo.chord_to_km(0), 0)
+        self.assertAlmostEqual(geo.chord_to_km(4), math.pi * geo.EARTH_RADIUS_KM)
+
+
+class GeocodeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_exact_cep_then_sector(self):
+        CepCentroid.objects.bulk_create([
+            CepCentroid(cep='01001000', latitude=-23.5503, longitude=-46.6339),
+            CepCentroid(cep='01001', latitude=-23.55, longitude=-46.63),
+        ])
+        self.assertEqual(geo.geocode('01001-000'), (-23.5503, -46.6339))
+        self.assertEqual(geo.geocode('01001-999'), (-23.55, -46.63))
+        self.assertIsNone(geo.geocode('02000-000'))
+        self.assertIsNone(geo.geocode('0100'))
+        self.assertIsNone(geo.normalize_cep('０１００１-０００'))
+        self.assertEqual(geo.geocode_many(['01001-000', '01001999', 'x']), {
+            '01001-000': (-23.5503, -46.6339), '01001999': (-23.55, -46.63),
+        })
+
+    def test_load_cep_centroids_locates_schools(self):
+        school = SchoolUnit.objects.create(nome='EMEF Sé', cnpj='1', endereco='Praça da Sé', cep='01001-000')
+        self.assertIsNone(school.latitude)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('cep;latitude;longitude\n01001-000;-23,5503;-46,6339\n02012;-23.5015;-46.6249\nxx;1;2\n')
+        self.addCleanup(os.unlink, f.name)
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('load_cep_centroids', f.name, stdout=out, stderr=err)
+        self.assertIn('2 centroides', out.getvalue())
+        self.assertIn('1 escolas geolocalizadas', out.getvalue())
+        self.assertIn('Linha 4 ignorada', err.getvalue())
+        school.refresh_from_db()
+        self.assertEqual((school.latitude, school.longitude), (-23.5503, -46.6339))
+        self.assertEqual(geo.geocode('02012-000'), (-23.5015, -46.6249))
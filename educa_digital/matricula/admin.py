@@ -1,46 +1,113 @@
 # matricula/admin.py
 from django.contrib import admin
+from django.db import router, transaction
+from educa_digital.core.paginators import EstimatedCountPaginator
 from .models import (
     StudentProfile, 
     ResponsibleProfile, 
     Address, 
-    SchoolUnit, 
     Enrollment, 
-    EnrollmentDocuments
+    EnrollmentDocuments,
+    EnrollmentArchive,
+    EnrollmentAuditLog,
+    EnrollmentEvent,
+    WebhookSubscription,
 )
+from . import audit, events
 
-class StudentProfileAdmin(admin.ModelAdmin):
+# SchoolUnit é registrado em escolas/admin.py.
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist para tabelas grandes: contagem estimada sem filtros e sem o
+    COUNT(*) extra do total quando há filtros/busca.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StudentProfileAdmin(LargeTableAdmin):
     list_display = ('nome', 'cpf', 'email')
     search_fields = ('cpf', 'nome')
 
 
-class ResponsibleProfileAdmin(admin.ModelAdmin):
+class ResponsibleProfileAdmin(LargeTableAdmin):
     list_display = ('nome', 'cpf', 'email')
     search_fields = ('cpf', 'nome')
 
 
-class AddressAdmin(admin.ModelAdmin):
+class AddressAdmin(LargeTableAdmin):
     list_display = ('cep', 'cidade', 'estado')
-
-
-class SchoolUnitAdmin(admin.ModelAdmin):
-    list_display = ('nome', 'endereco')
+    search_fields = ('cep',)
 
 
 class EnrollmentDocumentsInline(admin.StackedInline):
     model = EnrollmentDocuments
     extra = 0
+    max_num = 1
 
 
-class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('student', 'etapa', 'situacao', 'created_at')
-    list_filter = ('situacao', 'etapa')
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ('student', 'etapa', 'ano_letivo', 'situacao', 'school_unit', 'created_at')
+    list_filter = ('ano_letivo', 'situacao', 'etapa')
+    list_select_related = ('student', 'school_unit')
     search_fields = ('student__cpf', 'student__nome')
+    autocomplete_fields = ('student', 'responsible', 'school_unit')
+    raw_id_fields = ('address',)
+    date_hierarchy = 'created_at'
     inlines = [EnrollmentDocumentsInline]
 
+    # Alterações feitas pelo admin também entram no histórico (ver audit.py)
+    # e geram os eventos para os sistemas externos (ver events.py); o admin
+    # já grava cada alteração em uma transação.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            changes = {
+                field: [audit.plain_value(form.initial.get(field)), audit.plain_value(form.cleaned_data.get(field))]
+                for field in form.changed_data
+            }
+            audit.record(obj, EnrollmentAuditLog.UPDATE, changes, request.user)
+            events.publish(obj, EnrollmentAuditLog.UPDATE, changes)
+        else:
+            audit.record(obj, EnrollmentAuditLog.CREATE, actor=request.user)
+            events.publish(obj, EnrollmentAuditLog.CREATE)
+
+    def delete_model(self, request, obj):
+        audit.record(obj, EnrollmentAuditLog.DELETE, actor=request.user)
+        events.publish(obj, EnrollmentAuditLog.DELETE)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        # Ação "excluir selecionados": o mesmo histórico e os mesmos eventos
+        # de delete_model, com os eventos em um único INSERT. Ao contrário da
+        # exclusão individual, o admin não abre a transação.
+        with transaction.atomic(using=router.db_for_write(Enrollment)):
+            enrollments = list(queryset)
+            outbox = []
+            for enrollment in enrollments:
+                audit.record(enrollment, EnrollmentAuditLog.DELETE, actor=request.user)
+                outbox.extend(events.build(enrollment, EnrollmentAuditLog.DELETE))
+            EnrollmentEvent.objects.bulk_create(outbox)
+            super().delete_queryset(request, queryset)
+
+
+class EnrollmentArchiveAdmin(LargeTableAdmin):
+    list_display = ('enrollment_id', 'ano_letivo', 'student_cpf', 'situacao', 'archived_at')
+    list_filter = ('ano_letivo', 'situacao')
+    search_fields = ('student_cpf', 'responsible_cpf')
+    exclude = ('payload',)
+
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('nome', 'url', 'ativo', 'cursor', 'failures', 'next_attempt_at')
+    list_filter = ('ativo',)
+    readonly_fields = ('failures', 'next_attempt_at', 'last_error')
+
 # Registra os modelos no admin
 admin.site.register(StudentProfile, StudentProfileAdmin)
 admin.site.register(ResponsibleProfile, ResponsibleProfileAdmin)
 admin.site.register(Address, AddressAdmin)
-admin.site.register(SchoolUnit, SchoolUnitAdmin)
 admin.site.register(Enrollment, EnrollmentAdmin)
+admin.site.register(EnrollmentArchive, EnrollmentArchiveAdmin)
+admin.site.register(WebhookSubscription, WebhookSubscriptionAdmin)
@@ -0,0 +1,195 @@
+# matricula/assignment.py
+"""
+Sugestão de escola pela proximidade do endereço (CEP) e distribuição da
+lista de espera.
+
+O índice de cada rede (SchoolIndex) fica na memória do processo: as escolas
+ativas com coordenadas, em uma k-d tree (escolas/geo.py), e as vagas livres
+de cada uma no ano letivo. Ele é reconstruído a cada SCHOOL_INDEX_TTL
+segundos; entre uma reconstrução e outra, as sugestões usam as vagas do
+momento da construção. A distribuição da lista de espera (assign_waiting_list)
+recalcula as vagas antes de começar.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from educa_digital.core import tenancy
+from educa_digital.escolas import geo
+from educa_digital.escolas.models import SchoolUnit
+from . import audit, events
+from .models import Enrollment, EnrollmentAuditLog, EnrollmentEvent, current_school_year, invalidate_portal
+
+# Matrículas que ocupam vaga na escola
+OCCUPYING = ('pendente', 'aprovado')
+
+
+def free_seats(tenant_id, ano_letivo):
+    """
+    {escola: vagas livres no ano letivo} das escolas ativas da rede; None
+    para escolas sem limite de vagas.
+    """
+    occupied = dict(
+        Enrollment.objects
+        .filter(tenant_id=tenant_id, ano_letivo=ano_letivo, situacao__in=OCCUPYING, school_unit__isnull=False)
+        .values_list('school_unit').annotate(total=Count('pk')).order_by()
+    )
+    schools = SchoolUnit.objects.filter(tenant_id=tenant_id, ativo=True).values_list('pk', 'vagas')
+    return {pk: None if vagas is None else max(vagas - occupied.get(pk, 0), 0) for pk, vagas in schools}
+
+
+class SchoolIndex:
+    """
+    Escolas ativas de uma rede indexadas pela localização.
+    """
+
+    def __init__(self, schools, free):
+        # schools: [(pk, nome, endereco, latitude, longitude)]
+        self.schools = {pk: (nome, endereco) for pk, nome, endereco, _, _ in schools}
+        self.free = free
+        self.tree = geo.KDTree(
+            (geo.to_vector(latitude, longitude), pk) for pk, _, _, latitude, longitude in schools
+        )
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, tenant_id, ano_letivo):
+        schools = SchoolUnit.objects.filter(
+            tenant_id=tenant_id, ativo=True, latitude__isnull=False, longitude__isnull=False,
+        ).values_list('pk', 'nome', 'endereco', 'latitude', 'longitude')
+        return cls(list(schools), free_seats(tenant_id, ano_letivo))
+
+    def nearest(self, latitude, longitude, k, free=None):
+        """
+        As k escolas com vaga mais próximas do ponto, da mais próxima à mais
+        distante: [(escola, distância em km, vagas livres)]. `free`
+        substitui as vagas livres do índice.
+        """
+        free = self.free if free is None else free
+        found = self.tree.nearest(geo.to_vector(latitude, longitude), k, accept=lambda pk: free.get(pk) != 0)
+        return [(pk, geo.chord_to_km(squared), free.get(pk)) for pk, squared in found]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def school_index(tenant_id=None):
+    """
+    Índice da rede (padrão: a ativa) no ano letivo atual, reconstruído após
+    SCHOOL_INDEX_TTL segundos.
+    """
+    key = (tenant_id or tenancy.tenant_id_for_new_rows(), current_school_year())
+    index = _indexes.get(key)
+    if index is None or time.monotonic() - index.built_at > settings.SCHOOL_INDEX_TTL:
+        with _indexes_lock:
+            # Uma reconstrução por vez; as demais threads usam o resultado
+            index = _indexes.get(key)
+            if index is None or time.monotonic() - index.built_at > settings.SCHOOL_INDEX_TTL:
+                index = _indexes[key] = SchoolIndex.build(*key)
+    return index
+
+
+def clear_indexes():
+    _indexes.clear()
+
+
+def suggest(cep, k):
+    """
+    As k escolas ativas com vaga mais próximas do CEP:
+    [{'id', 'nome', 'endereco', 'distancia_km', 'vagas_livres'}], ou None se
+    o CEP não estiver na base de geolocalização.
+    """
+    point = geo.geocode(cep)
+    if point is None:
+        return None
+    index = school_index()
+    return [
+        {'id': pk, 'nome': index.schools[pk][0], 'endereco': index.schools[pk][1],
+         'distancia_km': round(distance, 2), 'vagas_livres': free}
+        for pk, distance, free in index.nearest(*point, k)
+    ]
+
+
+def waiting_list(ano_letivo):
+    """
+    Matrículas pendentes sem escola, por ordem de chegada.
+    """
+    return (
+        Enrollment.objects
+        .filter(ano_letivo=ano_letivo, situacao='pendente', school_unit__isnull=True)
+        .order_by('created_at', 'pk')
+    )
+
+
+def _save_assignments(assignments):
+    """
+    Grava {matrícula: escola} das matrículas que continuam na lista de espera
+    (uma escola atribuída manualmente neste meio tempo é mantida), com
+    histórico e eventos gravados em lote. Retorna quantas foram gravadas.
+    """
+    with transaction.atomic():
+        enrollments = list(
+            Enrollment.objects.select_for_update()
+            .filter(pk__in=assignments, situacao='pendente', school_unit__isnull=True)
+        )
+        now = timezone.now()
+        history, outbox = [], []
+        for enrollment in enrollments:
+            enrollment.school_unit_id = assignments[enrollment.pk]
+            enrollment.updated_at = now
+            changes = {'school_unit': [None, enrollment.school_unit_id]}
+            history.append(audit.build(enrollment, EnrollmentAuditLog.UPDATE, changes))
+            outbox.extend(events.build(enrollment, EnrollmentAuditLog.UPDATE, changes))
+        Enrollment.objects.bulk_update(enrollments, ['school_unit', 'updated_at'])
+        EnrollmentAuditLog.objects.bulk_create(history)
+        EnrollmentEvent.objects.bulk_create(outbox)
+        invalidate_portal({enrollment.responsible_id for enrollment in enrollments})
+    return len(enrollments)
+
+
+def assign_waiting_list(ano_letivo=None, batch_size=500, dry_run=False):
+    """
+    Atribui a cada matrícula da lista de espera a escola ativa com vaga mais
+    próxima do endereço, por ordem de chegada, rede a rede. As vagas são
+    recalculadas no início e descontadas a cada atribuição. Matrículas com
+    CEP fora da base ou sem escola com vaga continuam na lista. Grava em
+    lotes de `batch_size`, cada um em uma transação.
+    Retorna o relatório {resultado: quantidade}.
+    """
+    ano_letivo = ano_letivo or current_school_year()
+    report = Counter()
+    tenant_ids = list(waiting_list(ano_letivo).order_by().values_list('tenant_id', flat=True).distinct())
+    for tenant_id in tenant_ids:
+        index = SchoolIndex.build(tenant_id, ano_letivo)
+        free = dict(index.free)
+        pending = list(waiting_list(ano_letivo).filter(tenant_id=tenant_id).values_list('pk', 'address__cep'))
+        points = geo.geocode_many({cep for _, cep in pending})
+
+        assignments = {}
+        for pk, cep in pending:
+            point = points.get(cep)
+            if point is None:
+                report['sem localização pelo CEP'] += 1
+                continue
+            nearest = index.nearest(*point, k=1, free=free)
+            if not nearest:
+                report['sem escola com vaga'] += 1
+                continue
+            school_id = nearest[0][0]
+            if free[school_id] is not None:
+                free[school_id] -= 1
+            assignments[pk] = school_id
+
+        if dry_run:
+            report['atribuídas'] += len(assignments)
+            continue
+        items = list(assignments.items())
+        for start in range(0, len(items), batch_size):
+            report['atribuídas'] += _save_assignments(dict(items[start:start + batch_size]))
+    return report
@@ -0,0 +1,85 @@
+# matricula/audit.py
+"""
+Histórico de alterações das matrículas (EnrollmentAuditLog).
+
+Um evento só vale se a alteração for confirmada: `record` o registra no
+commit da transação em andamento (na hora, fora de transação) e o descarta
+se ela for desfeita. Durante uma requisição os eventos confirmados ficam em
+um buffer (AuditBufferMiddleware) e são gravados ao final com um único
+bulk_create, sem INSERTs no meio da view. Fora de uma requisição (shell,
+comandos) cada evento é gravado no commit.
+
+Cada evento guarda só os campos alterados: {"campo": [antes, depois]}, com
+os campos aninhados prefixados ("student.nome", "address.cep").
+"""
+from asgiref.local import Local
+from django.db import transaction
+
+from .models import EnrollmentAuditLog
+
+_state = Local()
+
+
+def start_buffer():
+    _state.events = []
+
+
+def flush():
+    """
+    Grava os eventos acumulados e encerra o buffer.
+    """
+    events = getattr(_state, 'events', None)
+    _state.events = None
+    if events:
+        EnrollmentAuditLog.objects.bulk_create(events)
+
+
+def build(enrollment, action, changes=None, actor=None):
+    """
+    Evento do histórico (não gravado) sobre `enrollment`, na rede dela, ou
+    None se não houver o que registrar. Na exclusão, deve ser chamada antes
+    do DELETE, ainda com o pk.
+    """
+    if action == EnrollmentAuditLog.UPDATE and not changes:
+        return None
+    return EnrollmentAuditLog(
+        tenant_id=enrollment.tenant_id,
+        enrollment_id=enrollment.pk,
+        action=action,
+        actor_id=actor.pk if actor is not None and actor.is_authenticated else None,
+        changes=changes or {},
+    )
+
+
+def record(enrollment, action, changes=None, actor=None):
+    event = build(enrollment, action, changes, actor)
+    if event is not None:
+        transaction.on_commit(lambda: _store(event))
+
+
+def _store(event):
+    events = getattr(_state, 'events', None)
+    if events is None:
+        EnrollmentAuditLog.objects.bulk_create([event])
+    else:
+        events.append(event)
+
+
+def plain_value(value):
+    # Relacionamentos entram pelo pk; o restante é serializado pelo encoder do JSONField.
+    return getattr(value, 'pk', value)
+
+
+def apply_changes(instance, data, changes, prefix=''):
+    """
+    Atribui `data` em `instance` e registra em `changes` os campos cujo valor
+    mudou. Retorna True se algum campo mudou.
+    """
+    changed = False
+    for attr, value in data.items():
+        old = getattr(instance, attr)
+        if plain_value(old) != plain_value(value):
+            changes[prefix + attr] = [plain_value(old), plain_value(value)]
+            changed = True
+        setattr(instance, attr, value)
+    return changed
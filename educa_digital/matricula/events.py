@@ -0,0 +1,98 @@
+# matricula/events.py
+"""
+Eventos de alteração das matrículas para sistemas externos (outbox).
+
+Cada criação, alteração ou exclusão (inclusive o arquivamento, comando
+archive_enrollments) grava um EnrollmentEvent na mesma transação da
+matrícula: se a alteração for desfeita, o evento também é. Os eventos são
+entregues por webhook (webhooks.py, comando dispatch_webhooks) e lidos pelo
+feed /matricula/events/?since=<cursor>, sem que os consumidores consultem as
+tabelas de matrícula.
+
+O evento traz o estado resumido da matrícula (IDs, situação, etapa) e os
+nomes dos campos alterados; os dados pessoais continuam na API.
+
+Os IDs são reservados no INSERT, mas as transações confirmam em qualquer
+ordem: um evento de ID menor pode aparecer depois que o consumidor já
+avançou além dele. Por isso o cursor não é o ID e sim a `position`, que
+sequence() atribui, antes de cada leitura, apenas aos eventos já
+confirmados, sempre depois das posições já entregues.
+"""
+from django.db import router, transaction
+
+from .models import EnrollmentAuditLog, EnrollmentEvent, EnrollmentEventSequence
+
+SEQUENCE_BATCH_SIZE = 1000
+
+ACTION_TYPES = {
+    EnrollmentAuditLog.CREATE: EnrollmentEvent.CREATED,
+    EnrollmentAuditLog.UPDATE: EnrollmentEvent.UPDATED,
+    EnrollmentAuditLog.DELETE: EnrollmentEvent.DELETED,
+}
+
+
+def snapshot(enrollment):
+    return {
+        'id': enrollment.pk,
+        'situacao': enrollment.situacao,
+        'etapa': enrollment.etapa,
+        'ano_letivo': enrollment.ano_letivo,
+        'school_unit': enrollment.school_unit_id,
+        'student': enrollment.student_id,
+        'responsible': enrollment.responsible_id,
+    }
+
+
+def build(enrollment, action, changes=None):
+    """
+    Eventos (não gravados) de `action` (EnrollmentAuditLog.CREATE/UPDATE/DELETE)
+    sobre `enrollment`; `changes` é o {campo: [antes, depois]} do histórico.
+    Uma mudança de situação gera também um `enrollment.situacao_changed`.
+    """
+    if action == EnrollmentAuditLog.UPDATE and not changes:
+        return []
+    data = snapshot(enrollment)
+    if changes:
+        data['campos'] = sorted(changes)
+    events = [EnrollmentEvent(
+        tenant_id=enrollment.tenant_id, event_type=ACTION_TYPES[action], enrollment_id=enrollment.pk, data=data,
+    )]
+    if changes and 'situacao' in changes:
+        events.append(EnrollmentEvent(
+            tenant_id=enrollment.tenant_id, event_type=EnrollmentEvent.SITUACAO_CHANGED,
+            enrollment_id=enrollment.pk, data={**data, 'situacao_anterior': changes['situacao'][0]},
+        ))
+    return events
+
+
+def publish(enrollment, action, changes=None):
+    """
+    Grava os eventos de `action` sobre `enrollment` (ver build). Na exclusão,
+    deve ser chamada antes do DELETE, ainda com o pk.
+    """
+    events = build(enrollment, action, changes)
+    if events:
+        EnrollmentEvent.objects.bulk_create(events)
+
+
+def sequence(tenant_id, batch_size=SEQUENCE_BATCH_SIZE):
+    """
+    Atribui posições aos eventos confirmados da rede que ainda não têm uma,
+    na ordem dos IDs e depois da última posição atribuída. Os leitores da
+    mesma rede (feed e webhooks) se revezam na trava do contador; quem
+    publica eventos não espera por ela. Retorna quantos eventos numerou.
+    """
+    db = router.db_for_write(EnrollmentEvent)
+    events = EnrollmentEvent.objects.db_manager(db).filter(tenant_id=tenant_id, position__isnull=True)
+    if not events.exists():
+        return 0
+    with transaction.atomic(using=db):
+        counter, _ = EnrollmentEventSequence.objects.using(db).select_for_update().get_or_create(tenant_id=tenant_id)
+        # Relido após a trava: outro leitor pode ter acabado de numerar
+        pending = list(events.order_by('pk')[:batch_size])
+        for event in pending:
+            counter.last_position += 1
+            event.position = counter.last_position
+        EnrollmentEvent.objects.db_manager(db).bulk_update(pending, ['position'])
+        counter.save(update_fields=['last_position'])
+    return len(pending)
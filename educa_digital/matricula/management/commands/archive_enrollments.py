@@ -0,0 +1,91 @@
+# matricula/management/commands/archive_enrollments.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from educa_digital.core.routers import pin_to_primary
+from educa_digital.matricula import events
+from educa_digital.matricula.models import (
+    DOCUMENT_FIELDS, Address, Enrollment, EnrollmentArchive, EnrollmentAuditLog, EnrollmentDocuments,
+    EnrollmentEvent, current_school_year, invalidate_portal,
+)
+from educa_digital.matricula.serializers import EnrollmentReadSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Move as matrículas de um ano letivo encerrado para a tabela de arquivo '
+        '(JSON comprimido), mantendo a tabela de matrículas só com os anos ativos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ano_letivo', type=int)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Apenas informa quantas matrículas seriam arquivadas.')
+
+    def handle(self, *args, **options):
+        ano_letivo = options['ano_letivo']
+        batch_size = options['batch_size']
+        if ano_letivo >= current_school_year():
+            raise CommandError('Só é possível arquivar anos letivos encerrados (anteriores a %d).'
+                               % current_school_year())
+
+        # Leitura e escrita no primário: o arquivo não pode partir de uma réplica atrasada.
+        pin_to_primary()
+        queryset = Enrollment.objects.filter(ano_letivo=ano_letivo).order_by('pk')
+
+        if options['dry_run']:
+            self.stdout.write('%d matrículas de %d seriam arquivadas.' % (queryset.count(), ano_letivo))
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(queryset.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+                if not ids:
+                    break
+                total += self.archive_batch(ids)
+            self.stdout.write('%d matrículas arquivadas...' % total)
+
+        self.stdout.write(self.style.SUCCESS('%d matrículas de %d arquivadas.' % (total, ano_letivo)))
+
+    def archive_batch(self, ids):
+        serializer = EnrollmentReadSerializer()
+        documents = {
+            row['enrollment_id']: row
+            for row in EnrollmentDocuments.objects.filter(enrollment_id__in=ids).values('enrollment_id', *DOCUMENT_FIELDS)
+        }
+        rows = Enrollment.objects.filter(pk__in=ids).values(*serializer.value_fields())
+        enrollments = list(Enrollment.objects.filter(pk__in=ids))
+        tenant_ids = {enrollment.pk: enrollment.tenant_id for enrollment in enrollments}
+
+        archives, address_ids, responsible_ids = [], [], set()
+        for row in rows:
+            data = serializer.from_row(row)
+            # Os arquivos continuam no S3; guardamos apenas as chaves.
+            document_row = documents.get(data['id'])
+            data['documents'] = (
+                {field: document_row[field] or None for field in DOCUMENT_FIELDS} if document_row else None
+            )
+            archives.append(EnrollmentArchive(
+                tenant_id=tenant_ids[data['id']],
+                enrollment_id=data['id'],
+                ano_letivo=data['ano_letivo'],
+                student_cpf=data['student']['cpf'],
+                responsible_cpf=data['responsible']['cpf'],
+                situacao=data['situacao'],
+                payload=EnrollmentArchive.compress(data),
+            ))
+            address_ids.append(data['address']['id'])
+            responsible_ids.add(data['responsible']['id'])
+
+        EnrollmentArchive.objects.bulk_create(archives, ignore_conflicts=True)
+        # Para o feed e os webhooks, a matrícula arquivada foi excluída.
+        EnrollmentEvent.objects.bulk_create([
+            event for enrollment in enrollments for event in events.build(enrollment, EnrollmentAuditLog.DELETE)
+        ])
+        Enrollment.objects.filter(pk__in=ids).delete()
+        # Cada matrícula cria o próprio endereço; removemos os que ficaram sem uso.
+        Address.objects.filter(pk__in=address_ids, enrollment__isnull=True).delete()
+        invalidate_portal(responsible_ids)
+        return len(archives)
@@ -0,0 +1,34 @@
+# matricula/management/commands/assign_waiting_list.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from educa_digital.core.routers import pin_to_primary
+from educa_digital.matricula import assignment
+
+
+class Command(BaseCommand):
+    help = (
+        'Atribui às matrículas pendentes sem escola, por ordem de chegada, a escola '
+        'ativa com vaga mais próxima do endereço (pelo CEP), respeitando as vagas '
+        'de cada escola no ano letivo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano-letivo', type=int, default=None,
+                            help='Ano letivo da lista de espera (padrão: o atual).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Matrículas gravadas por transação (padrão: 500).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Só calcula as atribuições, sem gravar.')
+
+    def handle(self, *args, **options):
+        pin_to_primary()
+        started = time.perf_counter()
+        report = assignment.assign_waiting_list(
+            options['ano_letivo'], batch_size=options['batch_size'], dry_run=options['dry_run'],
+        )
+        title = 'Simulação concluída' if options['dry_run'] else 'Lista de espera processada'
+        self.stdout.write(self.style.SUCCESS('%s em %.1fs:' % (title, time.perf_counter() - started)))
+        for name in ('atribuídas', 'sem localização pelo CEP', 'sem escola com vaga'):
+            self.stdout.write('  %-26s %d' % (name, report[name]))
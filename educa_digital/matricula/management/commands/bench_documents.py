@@ -0,0 +1,85 @@
+# matricula/management/commands/bench_documents.py
+import os
+import random
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from educa_digital.core.storage import document_storage
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o pipeline de documentos (gravação com deduplicação, leitura e '
+        'URLs assinadas em lote) no backend de DOCUMENT_STORAGE. Com '
+        'DOCUMENT_STORAGE=memory ou local roda sem rede nem credenciais da AWS. '
+        'Os StoredBlob são criados numa transação desfeita ao final e os '
+        'arquivos gravados são apagados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=200)
+        parser.add_argument('--size', type=int, default=256 * 1024, help='Tamanho de cada documento (bytes).')
+        parser.add_argument('--duplicate-ratio', type=float, default=0.3,
+                            help='Fração de uploads com conteúdo já enviado.')
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        storage = document_storage()
+        names = set()
+        try:
+            with transaction.atomic():
+                self.run(storage, names, options)
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            for name in names:
+                storage.backend.delete(name)
+
+    def run(self, storage, names, options):
+        timings = defaultdict(list)
+        contents = []
+
+        started = time.perf_counter()
+        for _ in range(options['documents']):
+            if contents and random.random() < options['duplicate_ratio']:
+                data = random.choice(contents)
+            else:
+                data = os.urandom(options['size'])
+                contents.append(data)
+
+            t0 = time.perf_counter()
+            names.add(storage.save('documents/bench.pdf', ContentFile(data)))
+            timings['gravação'].append(time.perf_counter() - t0)
+
+        for name in names:
+            t0 = time.perf_counter()
+            with storage.open(name) as f:
+                f.read()
+            timings['leitura'].append(time.perf_counter() - t0)
+
+        ordered = sorted(names)
+        for start in range(0, len(ordered), options['page_size']):
+            t0 = time.perf_counter()
+            storage.urls(ordered[start:start + options['page_size']])
+            timings['urls (página)'].append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            '%d uploads (%d arquivos distintos) no backend %s em %.2fs' % (
+                options['documents'], len(names), settings.DOCUMENT_STORAGE, elapsed)
+        ))
+        for name, values in timings.items():
+            values.sort()
+            self.stdout.write('  %-14s n=%-4d mediana %7.2f ms  p95 %7.2f ms' % (
+                name, len(values), values[len(values) // 2] * 1e3, values[int(len(values) * 0.95)] * 1e3,
+            ))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from educa_digital.core.routers import pin_to_primary
+from educa_digital.matricula import webhooks
+
+
+class Command(BaseCommand):
+    help = (
+        'Entrega aos webhooks cadastrados os eventos de matrícula pendentes, em lotes '
+        'assinados (HMAC-SHA256), retomando do cursor de cada assinatura. Para '
+        'entregas contínuas, rode como worker com --every.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Eventos por requisição (padrão: WEBHOOK_BATCH_SIZE).')
+        parser.add_argument('--every', type=int, default=None, metavar='SEGUNDOS',
+                            help='Repete a entrega neste intervalo, sem encerrar (worker).')
+
+    def handle(self, *args, **options):
+        pin_to_primary()
+        while True:
+            report = webhooks.dispatch(options['batch_size'])
+            if options['verbosity'] > 1 or not options['every']:
+                for name, delivered in report.items():
+                    self.stdout.write('  %-40s %d' % (name, delivered))
+                self.stdout.write(self.style.SUCCESS('%d eventos entregues.' % sum(report.values())))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
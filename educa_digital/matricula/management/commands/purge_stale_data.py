@@ -0,0 +1,35 @@
+# matricula/management/commands/purge_stale_data.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from educa_digital.core.routers import pin_to_primary
+from educa_digital.matricula import purge
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove contas nunca ativadas após PURGE_INACTIVE_USER_TTL, endereços sem '
+        'matrícula, arquivos de documentos sem referência, chaves de idempotência '
+        'e eventos de matrícula expirados, em lotes. Para agendar, rode pelo cron ou '
+        'como worker com --every.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Linhas por transação (padrão: PURGE_BATCH_SIZE).')
+        parser.add_argument('--every', type=int, default=None, metavar='SEGUNDOS',
+                            help='Repete a limpeza neste intervalo, sem encerrar (worker).')
+
+    def handle(self, *args, **options):
+        pin_to_primary()
+        while True:
+            started = time.perf_counter()
+            report = purge.run(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('Limpeza concluída em %.1fs:' % (time.perf_counter() - started)))
+            for name, value in report.items():
+                self.stdout.write('  %-34s %d' % (name, value))
+
+            if not options['every']:
+                break
+            time.sleep(options['every'])
@@ -0,0 +1,21 @@
+# matricula/middleware.py
+from . import audit
+
+
+class AuditBufferMiddleware:
+    """
+    Acumula os eventos do histórico de matrículas durante a requisição e os
+    grava de uma vez ao final (ver audit.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        audit.start_buffer()
+        try:
+            return self.get_response(request)
+        finally:
+            # Também após erros: as alterações já confirmadas precisam constar
+            # (as desfeitas nem chegam ao buffer).
+            audit.flush()
@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-19 12:43
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+import educa_digital.matricula.models
+
+
+def backfill_ano_letivo(apps, schema_editor):
+    # Matrículas existentes pertencem ao ano em que foram criadas.
+    Enrollment = apps.get_model('matricula', 'Enrollment')
+    Enrollment.objects.using(schema_editor.connection.alias).update(ano_letivo=ExtractYear('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matricula', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('enrollment_id', models.BigIntegerField(unique=True)),
+                ('ano_letivo', models.PositiveSmallIntegerField()),
+                ('student_cpf', models.CharField(max_length=14)),
+                ('responsible_cpf', models.CharField(db_index=True, max_length=14)),
+                ('situacao', models.CharField(choices=[('pendente', 'Pendente'), ('aprovado', 'Aprovado'), ('reprovado', 'Reprovado')], max_length=20)),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='ano_letivo',
+            field=models.PositiveSmallIntegerField(default=educa_digital.matricula.models.current_school_year),
+        ),
+        migrations.RunPython(backfill_ano_letivo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['ano_letivo', 'situacao'], name='enrollment_ano_situacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollmentarchive',
+            index=models.Index(fields=['ano_letivo', 'student_cpf'], name='archive_ano_student_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matricula', '0002_ano_letivo_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['created_at'], name='enrollment_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2 on 2026-10-19 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_profiles_to_users(apps, schema_editor):
+    # Os usuários criados na matrícula usam o e-mail do perfil como username/email.
+    db = schema_editor.connection.alias
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    users = {}
+    for pk, email in User.objects.using(db).exclude(email='').order_by('pk').values_list('pk', 'email').iterator():
+        users.setdefault(email.strip().lower(), pk)
+
+    for model_name in ('StudentProfile', 'ResponsibleProfile'):
+        Profile = apps.get_model('matricula', model_name)
+        linked = []
+        for profile in Profile.objects.using(db).only('pk', 'email').iterator():
+            profile.user_id = users.get(profile.email.strip().lower())
+            if profile.user_id:
+                linked.append(profile)
+        Profile.objects.using(db).bulk_update(linked, ['user'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('matricula', '0003_enrollment_created_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsibleprofile',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='responsible_profiles', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='student_profiles', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_profiles_to_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-19 13:03
+
+from django.db import migrations, models
+import educa_digital.core.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matricula', '0005_enrollment_audit_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enrollmentdocuments',
+            name='cartao_sus',
+            field=models.FileField(blank=True, null=True, storage=educa_digital.core.storage.document_storage, upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='enrollmentdocuments',
+            name='comprovante_residencia',
+            field=models.FileField(storage=educa_digital.core.storage.document_storage, upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='enrollmentdocuments',
+            name='historico_escolar',
+            field=models.FileField(storage=educa_digital.core.storage.document_storage, upload_to='documents/'),
+        ),
+        migrations.AlterField(
+            model_name='enrollmentdocuments',
+            name='laudo_pcd',
+            field=models.FileField(blank=True, null=True, storage=educa_digital.core.storage.document_storage, upload_to='documents/'),
+        ),
+    ]
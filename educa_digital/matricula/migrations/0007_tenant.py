@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-19 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+TENANT_MODELS = ('studentprofile', 'responsibleprofile', 'enrollment')
+
+
+def assign_default_tenant(apps, schema_editor):
+    db = schema_editor.connection.alias
+    tenant = apps.get_model('core', 'Tenant').objects.using(db).get(slug=settings.DEFAULT_TENANT)
+    for model_name in TENANT_MODELS:
+        apps.get_model('matricula', model_name).objects.using(db).update(tenant=tenant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_tenant'),
+        ('escolas', '0002_schoolunit_tenant'),
+        ('matricula', '0006_document_storage'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name='tenant',
+                field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+            )
+            for model_name in TENANT_MODELS
+        ],
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+    ]
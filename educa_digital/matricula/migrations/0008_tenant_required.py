@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-19 13:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TENANT_MODELS = ('studentprofile', 'responsibleprofile', 'enrollment')
+
+
+class Migration(migrations.Migration):
+    # Separada da 0007: no PostgreSQL, o ALTER TABLE não pode ocorrer na mesma
+    # transação do UPDATE que preencheu a chave estrangeira.
+
+    dependencies = [
+        ('matricula', '0007_tenant'),
+    ]
+
+    operations = [
+        *[
+            migrations.AlterField(
+                model_name=model_name,
+                name='tenant',
+                field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+            )
+            for model_name in TENANT_MODELS
+        ],
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='cpf',
+            field=models.CharField(max_length=14),
+        ),
+        migrations.AlterField(
+            model_name='responsibleprofile',
+            name='cpf',
+            field=models.CharField(max_length=14),
+        ),
+        migrations.AddConstraint(
+            model_name='studentprofile',
+            constraint=models.UniqueConstraint(fields=('tenant', 'cpf'), name='student_tenant_cpf_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='responsibleprofile',
+            constraint=models.UniqueConstraint(fields=('tenant', 'cpf'), name='responsible_tenant_cpf_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['tenant', 'school_unit', 'situacao', 'created_at'], name='enrollment_tenant_school_idx'),
+        ),
+    ]
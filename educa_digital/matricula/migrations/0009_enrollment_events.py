@@ -0,0 +1,57 @@
+# Generated by Django 3.2 on 2026-10-19 13:31
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import educa_digital.matricula.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_tenant'),
+        ('matricula', '0008_tenant_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nome', models.CharField(max_length=255)),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=educa_digital.matricula.models.generate_webhook_secret, help_text='Chave do HMAC-SHA256 do cabeçalho X-Educa-Signature', max_length=100)),
+                ('event_types', models.JSONField(blank=True, default=list)),
+                ('ativo', models.BooleanField(default=True)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tenant', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='EnrollmentEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(choices=[('enrollment.created', 'Matrícula criada'), ('enrollment.updated', 'Matrícula alterada'), ('enrollment.deleted', 'Matrícula excluída'), ('enrollment.situacao_changed', 'Situação alterada')], max_length=40)),
+                ('enrollment_id', models.BigIntegerField()),
+                ('data', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('tenant', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='enrollmentevent',
+            index=models.Index(fields=['tenant', 'id'], name='event_tenant_cursor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollmentevent',
+            index=models.Index(fields=['created_at'], name='event_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2 on 2026-10-19 14:05
+
+import logging
+import re
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODELS = ('studentprofile', 'responsibleprofile')
+FORMATTED = r'^[0-9]{3}\.[0-9]{3}\.[0-9]{3}-[0-9]{2}$'
+
+
+def format_cpf(value):
+    digits = re.sub(r'[^0-9]', '', value or '')
+    if len(digits) != 11:
+        return None
+    return '%s.%s.%s-%s' % (digits[:3], digits[3:6], digits[6:9], digits[9:])
+
+
+def normalize_cpfs(apps, schema_editor):
+    """
+    Grava os CPFs no formato `000.000.000-00`, o mesmo da validação
+    (validators.normalize_cpf), para que as buscas por CPF encontrem os
+    perfis cadastrados antes dela. Perfis cujo CPF normalizado já existe na
+    rede (duplicados) ou que não têm 11 dígitos ficam como estão e são
+    listados no log, para revisão manual.
+    """
+    db = schema_editor.connection.alias
+    for model_name in PROFILE_MODELS:
+        profiles = apps.get_model('matricula', model_name).objects.using(db)
+        pending = profiles.exclude(cpf__regex=FORMATTED).order_by('pk').values_list('pk', 'tenant_id', 'cpf')
+        for pk, tenant_id, cpf in list(pending):
+            formatted = format_cpf(cpf)
+            if formatted is None:
+                logger.warning('%s %s: CPF inválido %r não normalizado.', model_name, pk, cpf)
+                continue
+            duplicate = profiles.filter(tenant_id=tenant_id, cpf=formatted).values_list('pk', flat=True).first()
+            if duplicate is not None:
+                logger.warning(
+                    '%s %s: CPF %r duplica o de %s %s; não normalizado.', model_name, pk, cpf, model_name, duplicate,
+                )
+            else:
+                profiles.filter(pk=pk).update(cpf=formatted)
+
+    archives = apps.get_model('matricula', 'EnrollmentArchive').objects.using(db)
+    for field in ('student_cpf', 'responsible_cpf'):
+        pending = archives.exclude(**{'%s__regex' % field: FORMATTED}).values_list('pk', field)
+        for pk, cpf in list(pending):
+            formatted = format_cpf(cpf)
+            if formatted is not None:
+                archives.filter(pk=pk).update(**{field: formatted})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matricula', '0009_enrollment_events'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_cpfs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2 on 2026-10-19 14:08
+
+from django.db import migrations, models
+from django.db.models import F, Max
+import django.db.models.deletion
+
+
+def number_existing_events(apps, schema_editor):
+    """
+    Os eventos já gravados recebem o próprio ID como posição: os cursores
+    dos consumidores (IDs) continuam valendo.
+    """
+    db = schema_editor.connection.alias
+    events = apps.get_model('matricula', 'EnrollmentEvent').objects.using(db)
+    sequences = apps.get_model('matricula', 'EnrollmentEventSequence').objects.using(db)
+    events.update(position=F('id'))
+    last_positions = events.values('tenant_id').annotate(last=Max('id')).values_list('tenant_id', 'last')
+    sequences.bulk_create([
+        sequences.model(tenant_id=tenant_id, last_position=last) for tenant_id, last in last_positions
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_idempotencykey_locked_until'),
+        ('matricula', '0010_normalize_cpf'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentEventSequence',
+            fields=[
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.PROTECT, primary_key=True, related_name='+', serialize=False, to='core.tenant')),
+                ('last_position', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='enrollmentevent',
+            name='event_tenant_cursor_idx',
+        ),
+        migrations.AddField(
+            model_name='enrollmentevent',
+            name='position',
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(number_existing_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='enrollmentevent',
+            index=models.Index(fields=['tenant', 'position'], name='event_tenant_position_idx'),
+        ),
+    ]
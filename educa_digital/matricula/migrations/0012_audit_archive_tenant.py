@@ -0,0 +1,62 @@
+# Generated by Django 3.2 on 2026-10-19 15:20
+
+import json
+import zlib
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+TENANT_MODELS = ('enrollmentarchive', 'enrollmentauditlog')
+
+
+def assign_enrollment_tenant(apps, schema_editor):
+    """
+    Arquivos e históricos ficam na rede da matrícula. Arquivos: pela rede do
+    aluno do snapshot. Históricos: pela matrícula ativa, pelo arquivo ou pelo
+    outbox de eventos. O que não for encontrado vai para a rede padrão.
+    """
+    db = schema_editor.connection.alias
+
+    def model(name):
+        return apps.get_model('matricula', name).objects.using(db)
+
+    default_tenant = apps.get_model('core', 'Tenant').objects.using(db).get(slug=settings.DEFAULT_TENANT)
+
+    archives = model('EnrollmentArchive')
+    student_tenants = model('StudentProfile').values_list('pk', 'tenant_id')
+    by_student = {}
+    for pk, payload in archives.filter(tenant__isnull=True).values_list('pk', 'payload').iterator(chunk_size=500):
+        student_id = json.loads(zlib.decompress(payload))['student']['id']
+        by_student.setdefault(student_id, []).append(pk)
+    for student_id, tenant_id in student_tenants.filter(pk__in=list(by_student)):
+        archives.filter(pk__in=by_student[student_id]).update(tenant_id=tenant_id)
+    archives.filter(tenant__isnull=True).update(tenant=default_tenant)
+
+    logs = model('EnrollmentAuditLog')
+    for source in ('Enrollment', 'EnrollmentArchive', 'EnrollmentEvent'):
+        key = 'pk' if source == 'Enrollment' else 'enrollment_id'
+        owners = model(source).filter(**{key: OuterRef('enrollment_id')}).values('tenant_id')[:1]
+        logs.filter(tenant__isnull=True).update(tenant_id=Subquery(owners))
+    logs.filter(tenant__isnull=True).update(tenant=default_tenant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_idempotencykey_locked_until'),
+        ('matricula', '0011_event_position'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name=model_name,
+                name='tenant',
+                field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+            )
+            for model_name in TENANT_MODELS
+        ],
+        migrations.RunPython(assign_enrollment_tenant, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-19 15:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+TENANT_MODELS = ('enrollmentarchive', 'enrollmentauditlog')
+
+
+class Migration(migrations.Migration):
+    # Separada da 0012 pelo mesmo motivo da 0008.
+
+    dependencies = [
+        ('matricula', '0012_audit_archive_tenant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name=model_name,
+            name='tenant',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tenant'),
+        )
+        for model_name in TENANT_MODELS
+    ]
@@ -1,14 +1,31 @@
 # matricula/models.py
-from django.db import models
+import json
+import secrets
+import zlib
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from educa_digital.core.models import TenantManager, TenantQuerySet, TenantScopedModel
+from educa_digital.core.tenancy import tenant_cache
+from educa_digital.core.storage import document_storage
 from educa_digital.escolas.models import SchoolUnit
 
 
-class StudentProfile(models.Model):
+def current_school_year():
+    return timezone.localdate().year
+
+
+class StudentProfile(TenantScopedModel):
     GENERO_CHOICES = [
         ('masculino', 'Masculino'),
         ('feminino', 'Feminino'),
     ]
-    cpf = models.CharField(max_length=14, unique=True)
+    cpf = models.CharField(max_length=14)
     nome = models.CharField(max_length=255)
     rg = models.CharField(max_length=50)
     orgao_emissor = models.CharField(max_length=100)
@@ -20,12 +37,28 @@ class StudentProfile(models.Model):
     genero = models.CharField(max_length=20, choices=GENERO_CHOICES)
     pcd = models.BooleanField(default=False)
     bolsa_familia = models.BooleanField(default=False)
+    # Usuário criado na matrícula (irmãos podem compartilhar o e-mail e o usuário)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='student_profiles',
+    )
+
+    class Meta:
+        constraints = [
+            # O CPF é único dentro de cada rede; o índice também atende às buscas por CPF
+            models.UniqueConstraint(fields=['tenant', 'cpf'], name='student_tenant_cpf_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.cpf})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # O portal mostra o nome do aluno
+        invalidate_portal(Enrollment.objects.filter(student_id=self.pk).values('responsible_id'))
 
-class ResponsibleProfile(models.Model):
+
+class ResponsibleProfile(TenantScopedModel):
     VINCULO_CHOICES = [
         ('pai', 'Pai'),
         ('mae', 'Mãe'),
@@ -34,17 +67,82 @@ class ResponsibleProfile(models.Model):
         ('avo', 'Avô/Avó'),
         ('outro', 'Outro'),
     ]
-    cpf = models.CharField(max_length=14, unique=True)
+    cpf = models.CharField(max_length=14)
     nome = models.CharField(max_length=255)
     email = models.EmailField()
     data_nascimento = models.DateField()
     telefone_whatsapp = models.CharField(max_length=20)
     vinculo = models.CharField(max_length=50, choices=VINCULO_CHOICES)
     genero = models.CharField(max_length=20)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='responsible_profiles',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'cpf'], name='responsible_tenant_cpf_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.cpf})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_user_id = instance.__dict__.get('user_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # O vínculo com o usuário pode ter mudado (ex.: conta já existente):
+        # o portal do usuário anterior também deixa de valer.
+        user_ids = {self.user_id, getattr(self, '_stored_user_id', None)} - {None}
+        _delete_portals_on_commit({self.tenant_id: [portal_cache_key(user_id) for user_id in user_ids]})
+        self._stored_user_id = self.user_id
+
+
+def portal_cache_key(user_id):
+    return f"responsible-portal:{user_id}"
+
+
+def _delete_portals_on_commit(keys):
+    """
+    Apaga as chaves ({rede: [chave]}) quando a transação for confirmada; antes
+    disso, uma leitura concorrente guardaria de novo o estado anterior.
+    """
+    keys = {tenant_id: tenant_keys for tenant_id, tenant_keys in keys.items() if tenant_keys}
+    if not keys:
+        return
+
+    def delete():
+        for tenant_id, tenant_keys in keys.items():
+            tenant_cache(tenant_id).delete_many(tenant_keys)
+
+    transaction.on_commit(delete)
+
+
+def invalidate_portal(responsible_ids):
+    """
+    Descarta, ao fim da transação, o portal do responsável em cache (ver
+    views.ResponsiblePortalView) dos usuários vinculados a `responsible_ids`.
+    """
+    rows = (
+        ResponsibleProfile.objects.filter(pk__in=responsible_ids, user__isnull=False)
+        .values_list('tenant_id', 'user_id')
+    )
+    keys = defaultdict(list)
+    for tenant_id, user_id in rows:
+        keys[tenant_id].append(portal_cache_key(user_id))
+    _delete_portals_on_commit(keys)
+
+
+@receiver(post_save, sender=SchoolUnit, dispatch_uid='matricula.invalidate_school_portals')
+def invalidate_school_portals(sender, instance, created, **kwargs):
+    # O portal mostra os dados da escola; escolas/ não depende de matricula/
+    if not created:
+        invalidate_portal(Enrollment.objects.filter(school_unit_id=instance.pk).values('responsible_id'))
+
 
 class Address(models.Model):
     cep = models.CharField(max_length=10)
@@ -59,7 +157,7 @@ class Address(models.Model):
 
 
 
-class Enrollment(models.Model):
+class Enrollment(TenantScopedModel):
     SITUACAO_CHOICES = [
         ('pendente', 'Pendente'),
         ('aprovado', 'Aprovado'),
@@ -70,20 +168,223 @@ class Enrollment(models.Model):
     address = models.ForeignKey(Address, on_delete=models.CASCADE)
     school_unit = models.ForeignKey(SchoolUnit, on_delete=models.SET_NULL, null=True, blank=True)
     etapa = models.IntegerField(default=1)  # Série: 1, 2, 3, etc.
+    ano_letivo = models.PositiveSmallIntegerField(default=current_school_year)
     situacao = models.CharField(max_length=20, choices=SITUACAO_CHOICES, default='pendente')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['ano_letivo', 'situacao'], name='enrollment_ano_situacao_idx'),
+            # date_hierarchy do admin e ordenação por data de criação
+            models.Index(fields=['created_at'], name='enrollment_created_at_idx'),
+            # Listagens de cada rede (por escola e situação, mais recentes primeiro)
+            # percorrem só a fatia da rede
+            models.Index(
+                fields=['tenant', 'school_unit', 'situacao', 'created_at'], name='enrollment_tenant_school_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Matricula: {self.student.nome} - Etapa {self.etapa}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        invalidate_portal([self.responsible_id])
+
+    def delete(self, *args, **kwargs):
+        responsible_id = self.responsible_id
+        result = super().delete(*args, **kwargs)
+        invalidate_portal([responsible_id])
+        return result
+
+
+DOCUMENT_FIELDS = ('cartao_sus', 'laudo_pcd', 'comprovante_residencia', 'historico_escolar')
+
 
 class EnrollmentDocuments(models.Model):
+    # Arquivos deduplicados por conteúdo (ver core/storage.py)
     enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE)
-    cartao_sus = models.FileField(upload_to='documents/', blank=True, null=True)
-    laudo_pcd = models.FileField(upload_to='documents/', blank=True, null=True)
-    comprovante_residencia = models.FileField(upload_to='documents/')
-    historico_escolar = models.FileField(upload_to='documents/')
+    cartao_sus = models.FileField(upload_to='documents/', storage=document_storage, blank=True, null=True)
+    laudo_pcd = models.FileField(upload_to='documents/', storage=document_storage, blank=True, null=True)
+    comprovante_residencia = models.FileField(upload_to='documents/', storage=document_storage)
+    historico_escolar = models.FileField(upload_to='documents/', storage=document_storage)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Nomes carregados do banco, para liberar os arquivos substituídos no save().
+        instance._stored_names = {
+            field: getattr(instance, field).name for field in DOCUMENT_FIELDS if field in field_names
+        }
+        return instance
 
     def __str__(self):
         return f"Documentos de {self.enrollment.student.nome}"
+
+    def save(self, *args, **kwargs):
+        # Campos com um novo upload ganham uma referência no save; a do
+        # arquivo anterior é liberada (mesmo que o conteúdo seja o mesmo).
+        uploaded = {field for field in DOCUMENT_FIELDS if not getattr(self, field)._committed}
+        super().save(*args, **kwargs)
+        for field, name in getattr(self, '_stored_names', {}).items():
+            if name and (field in uploaded or name != getattr(self, field).name):
+                document_storage().delete(name)
+        self._stored_names = {field: getattr(self, field).name for field in DOCUMENT_FIELDS}
+        self._invalidate_portal()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        for field in DOCUMENT_FIELDS:
+            if getattr(self, field):
+                getattr(self, field).delete(save=False)
+        self._invalidate_portal()
+        return result
+
+    def _invalidate_portal(self):
+        invalidate_portal(Enrollment.objects.filter(pk=self.enrollment_id).values('responsible_id'))
+
+
+class EnrollmentArchive(TenantScopedModel):
+    """
+    Matrícula de um ano letivo encerrado, movida para fora da tabela ativa
+    pelo comando `archive_enrollments`. Os dados (aluno, responsável,
+    endereço, escola e nomes dos documentos no S3) ficam em JSON comprimido.
+    Fica na rede da matrícula.
+    """
+    enrollment_id = models.BigIntegerField(unique=True)
+    ano_letivo = models.PositiveSmallIntegerField()
+    student_cpf = models.CharField(max_length=14)
+    responsible_cpf = models.CharField(max_length=14, db_index=True)
+    situacao = models.CharField(max_length=20, choices=Enrollment.SITUACAO_CHOICES)
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ano_letivo', 'student_cpf'], name='archive_ano_student_idx'),
+        ]
+
+    @staticmethod
+    def compress(data):
+        return zlib.compress(json.dumps(data, separators=(',', ':')).encode(), 6)
+
+    def get_data(self):
+        return json.loads(zlib.decompress(self.payload))
+
+    def __str__(self):
+        return f"Matricula arquivada {self.enrollment_id} ({self.ano_letivo})"
+
+
+class EnrollmentAuditLog(TenantScopedModel):
+    """
+    Evento do histórico de uma matrícula (ver audit.py), na rede da
+    matrícula. Só recebe inserts.
+
+    `enrollment_id` não é FK: o histórico continua disponível depois que a
+    matrícula é excluída ou arquivada.
+    """
+    CREATE, UPDATE, DELETE = 'create', 'update', 'delete'
+    ACTION_CHOICES = [
+        (CREATE, 'Criação'),
+        (UPDATE, 'Alteração'),
+        (DELETE, 'Exclusão'),
+    ]
+    enrollment_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+    )
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['enrollment_id', 'created_at'], name='audit_enrollment_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"Matricula {self.enrollment_id}: {self.action} em {self.created_at:%d/%m/%Y %H:%M}"
+
+
+class EnrollmentEventQuerySet(TenantQuerySet):
+
+    def after(self, cursor):
+        # Eventos ainda sem posição (position nula) ficam de fora
+        return self.filter(position__gt=cursor).order_by('position')
+
+
+class EnrollmentEvent(TenantScopedModel):
+    """
+    Outbox das alterações de matrículas (ver events.py): gravado na mesma
+    transação da alteração e lido pelos webhooks e pelo feed de mudanças.
+    A `position`, atribuída após o commit (events.sequence), é o cursor dos
+    consumidores.
+    """
+    CREATED = 'enrollment.created'
+    UPDATED = 'enrollment.updated'
+    DELETED = 'enrollment.deleted'
+    SITUACAO_CHANGED = 'enrollment.situacao_changed'
+    TYPE_CHOICES = [
+        (CREATED, 'Matrícula criada'),
+        (UPDATED, 'Matrícula alterada'),
+        (DELETED, 'Matrícula excluída'),
+        (SITUACAO_CHANGED, 'Situação alterada'),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=40, choices=TYPE_CHOICES)
+    enrollment_id = models.BigIntegerField()
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    position = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = TenantManager.from_queryset(EnrollmentEventQuerySet)()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'position'], name='event_tenant_position_idx'),
+            models.Index(fields=['created_at'], name='event_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.id} (matrícula {self.enrollment_id})"
+
+
+class EnrollmentEventSequence(models.Model):
+    """
+    Última posição atribuída aos eventos de cada rede. A linha é travada
+    enquanto events.sequence numera os eventos, e o contador não recua com
+    a limpeza dos eventos antigos.
+    """
+    tenant = models.OneToOneField('core.Tenant', on_delete=models.PROTECT, primary_key=True, related_name='+')
+    last_position = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.tenant_id}: {self.last_position}"
+
+
+def generate_webhook_secret():
+    return secrets.token_urlsafe(32)
+
+
+class WebhookSubscription(TenantScopedModel):
+    """
+    Sistema externo que recebe os eventos de matrícula da rede por webhook
+    (ver webhooks.py). `cursor` é a posição do último evento entregue; após uma
+    falha, a entrega é retomada a partir dele em `next_attempt_at`.
+    """
+    nome = models.CharField(max_length=255)
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=100, default=generate_webhook_secret,
+                              help_text='Chave do HMAC-SHA256 do cabeçalho X-Educa-Signature')
+    # Vazio: todos os tipos
+    event_types = models.JSONField(default=list, blank=True)
+    ativo = models.BooleanField(default=True)
+    cursor = models.BigIntegerField(default=0)
+    failures = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nome
@@ -0,0 +1,167 @@
+# matricula/purge.py
+"""
+Limpeza periódica dos dados que sobram das matrículas (purge_stale_data).
+
+Cada etapa apaga em lotes de `batch_size`, um por transação curta, travando
+só as linhas do lote (select_for_update com skip_locked): linhas em uso por
+outra transação ficam para a próxima execução. Cada função retorna o que foi
+removido, para o relatório do comando.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from educa_digital.accounts.models import profile_cache_key
+from educa_digital.core.models import IdempotencyKey, StoredBlob
+from educa_digital.core.storage import document_storage
+from .models import DOCUMENT_FIELDS, Address, Enrollment, EnrollmentArchive, EnrollmentDocuments, EnrollmentEvent
+
+
+def _delete_in_batches(queryset, batch_size, delete=None):
+    """
+    Apaga as linhas de `queryset` em lotes. `delete(ids)` substitui o DELETE
+    padrão quando o lote precisa de tratamento extra. Retorna o total apagado.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            if delete is None:
+                queryset.model.objects.filter(pk__in=ids).delete()
+            else:
+                delete(ids)
+        total += len(ids)
+
+
+def stale_users():
+    """
+    Contas que nunca foram ativadas nem usadas após PURGE_INACTIVE_USER_TTL
+    (cadastros anônimos do UserCreateView e contas de matrículas excluídas).
+    Contas vinculadas a uma matrícula existente são mantidas: são o acesso da
+    família ao portal.
+    """
+    cutoff = timezone.now() - settings.PURGE_INACTIVE_USER_TTL
+    return (
+        get_user_model().objects
+        .filter(is_active=False, last_login__isnull=True, is_staff=False, is_superuser=False,
+                date_joined__lt=cutoff)
+        .exclude(Exists(Enrollment.objects.filter(student__user=OuterRef('pk'))))
+        .exclude(Exists(Enrollment.objects.filter(responsible__user=OuterRef('pk'))))
+        .order_by('pk')
+    )
+
+
+def purge_users(batch_size):
+    User = get_user_model()
+
+    def delete(ids):
+        User.objects.filter(pk__in=ids).delete()
+        cache.delete_many([profile_cache_key(pk) for pk in ids])
+
+    return _delete_in_batches(stale_users(), batch_size, delete)
+
+
+def purge_addresses(batch_size):
+    """
+    Endereços sem matrícula (cada matrícula cria o próprio; excluir a
+    matrícula não remove o endereço).
+    """
+    orphans = Address.objects.exclude(Exists(Enrollment.objects.filter(address=OuterRef('pk'))))
+    return _delete_in_batches(orphans.order_by('pk'), batch_size)
+
+
+def referenced_documents():
+    """
+    Quantas vezes cada arquivo é referenciado: pelos documentos das matrículas
+    e pelas matrículas arquivadas (archive_enrollments mantém os arquivos).
+    """
+    counts = Counter()
+    rows = EnrollmentDocuments.objects.values_list(*DOCUMENT_FIELDS).iterator(chunk_size=2000)
+    for row in rows:
+        counts.update(name for name in row if name)
+    archives = EnrollmentArchive.objects.only('payload').iterator(chunk_size=500)
+    for archive in archives:
+        documents = archive.get_data().get('documents') or {}
+        counts.update(name for name in documents.values() if name)
+    return counts
+
+
+def _delete_files(backend, names):
+    for name in names:
+        backend.delete(name)
+
+
+def purge_documents(batch_size):
+    """
+    Apaga do armazenamento os arquivos que nenhum documento referencia e
+    acerta o ref_count dos demais (exclusões em cascata não liberam as
+    referências). Arquivos referenciados há menos de PURGE_BLOB_GRACE não são
+    tocados: o upload pode ter terminado antes de o documento ser gravado.
+    Retorna (arquivos apagados, bytes liberados, ref_counts corrigidos).
+    """
+    cutoff = timezone.now() - settings.PURGE_BLOB_GRACE
+    references = referenced_documents()
+    settled = StoredBlob.objects.filter(last_referenced_at__lt=cutoff)
+
+    dangling, wrong_counts = [], {}
+    for pk, name, ref_count in settled.values_list('pk', 'name', 'ref_count').iterator(chunk_size=2000):
+        if name not in references:
+            dangling.append(pk)
+        elif references[name] != ref_count:
+            wrong_counts[pk] = references[name]
+    fixed = sum(settled.filter(pk=pk).update(ref_count=count) for pk, count in wrong_counts.items())
+
+    storage = document_storage()
+    deleted = reclaimed = 0
+    for start in range(0, len(dangling), batch_size):
+        with transaction.atomic():
+            # Um upload do mesmo conteúdo neste meio tempo renova
+            # last_referenced_at e tira o arquivo do lote.
+            batch = settled.select_for_update(skip_locked=True).filter(pk__in=dangling[start:start + batch_size])
+            rows = list(batch.values_list('name', 'size'))
+            names = [name for name, _ in rows]
+            StoredBlob.objects.filter(name__in=names).delete()
+            # Só apaga os arquivos se o lote for efetivado.
+            transaction.on_commit(lambda names=names: _delete_files(storage.backend, names))
+        deleted += len(names)
+        reclaimed += sum(size for _, size in rows)
+    return deleted, reclaimed, fixed
+
+
+def purge_idempotency_keys(batch_size):
+    return _delete_in_batches(IdempotencyKey.objects.expired().order_by('pk'), batch_size)
+
+
+def purge_events(batch_size):
+    """
+    Eventos de matrícula com mais de EVENT_RETENTION (o feed e os webhooks
+    só retomam a partir de cursores mais recentes).
+    """
+    expired = EnrollmentEvent.objects.filter(created_at__lt=timezone.now() - settings.EVENT_RETENTION)
+    return _delete_in_batches(expired.order_by('pk'), batch_size)
+
+
+def run(batch_size=None):
+    """
+    Executa todas as etapas e retorna o relatório {etapa: quantidade}.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    users = purge_users(batch_size)
+    addresses = purge_addresses(batch_size)
+    documents, reclaimed, fixed = purge_documents(batch_size)
+    return {
+        'contas nunca ativadas': users,
+        'endereços órfãos': addresses,
+        'arquivos órfãos': documents,
+        'bytes liberados': reclaimed,
+        'ref_counts corrigidos': fixed,
+        'chaves de idempotência expiradas': purge_idempotency_keys(batch_size),
+        'eventos de matrícula expirados': purge_events(batch_size),
+    }
@@ -1,63 +1,186 @@
 # matricula/serializers.py
+from django.db import models, transaction
 from rest_framework import serializers
+from educa_digital.core import tracing
+from educa_digital.core.serializers import CachedFieldsMixin, CompiledSerializer
+from educa_digital.core.storage import document_storage
 from .models import (
     StudentProfile, ResponsibleProfile, Address, SchoolUnit,
-    Enrollment, EnrollmentDocuments
+    Enrollment, EnrollmentDocuments, EnrollmentArchive, EnrollmentAuditLog, EnrollmentEvent, DOCUMENT_FIELDS
 )
+from . import audit, events
+from .validators import normalize_cpf
+
+
+class CPFField(serializers.CharField):
+    """
+    CPF validado pelos dígitos verificadores e normalizado para
+    `000.000.000-00`, sem consultas ao banco. Um CPF já cadastrado identifica
+    o perfil existente (upsert em EnrollmentSerializer.create), não é um erro
+    de validação.
+    """
+    default_error_messages = {'invalid': 'CPF inválido.'}
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_length', 14)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        cpf = normalize_cpf(super().to_internal_value(data))
+        if cpf is None:
+            self.fail('invalid')
+        return cpf
+
+
+class StudentProfileSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    cpf = CPFField()
 
-class StudentProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = StudentProfile
-        fields = '__all__'
+        exclude = ['tenant']
+        read_only_fields = ['user']
+
 
+class ResponsibleProfileSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    cpf = CPFField()
 
-class ResponsibleProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = ResponsibleProfile
-        fields = '__all__'
+        exclude = ['tenant']
+        read_only_fields = ['user']
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = '__all__'
 
 
-class SchoolUnitSerializer(serializers.ModelSerializer):
+class SchoolUnitSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SchoolUnit
-        fields = '__all__'
+        # Coordenadas vêm do CEP (escolas/geo.py)
+        exclude = ['tenant', 'latitude', 'longitude']
+
+
+class EnrollmentSchoolUnitSerializer(SchoolUnitSerializer):
+    """
+    Escola informada na matrícula: um CNPJ já cadastrado identifica a escola
+    existente, sem a consulta do UniqueValidator.
+    """
+
+    class Meta(SchoolUnitSerializer.Meta):
+        extra_kwargs = {'cnpj': {'validators': []}}
+
+
+class DocumentFileField(serializers.FileField):
+    """
+    FileField que usa as URLs assinadas em lote pelo
+    EnrollmentDocumentsListSerializer, quando disponíveis no contexto.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = self.context.get('document_urls', {}).get(value.name) or value.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class EnrollmentDocumentsListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        documents = list(data.all() if hasattr(data, 'all') else data)
+        names = [getattr(doc, field).name for doc in documents for field in DOCUMENT_FIELDS if getattr(doc, field)]
+        self.context['document_urls'] = document_storage().urls(names)
+        return super().to_representation(documents)
 
 
 class EnrollmentDocumentsSerializer(serializers.ModelSerializer):
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.FileField: DocumentFileField,
+    }
+
     class Meta:
         model = EnrollmentDocuments
         fields = '__all__'
+        list_serializer_class = EnrollmentDocumentsListSerializer
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+def upsert_school_unit(data):
+    school_unit, _ = SchoolUnit.objects.get_or_create(cnpj=data['cnpj'], defaults=data)
+    return school_unit
+
+
+class EnrollmentSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    """
+    A validação não consulta o banco: formato e dígitos verificadores são
+    conferidos em Python, e CPFs e CNPJs já cadastrados são resolvidos pelo
+    upsert em `create`/`update`.
+    """
     student = StudentProfileSerializer()
     responsible = ResponsibleProfileSerializer()
     address = AddressSerializer()
-    school_unit = SchoolUnitSerializer(required=False, allow_null=True)
+    school_unit = EnrollmentSchoolUnitSerializer(required=False, allow_null=True)
 
     class Meta:
         model = Enrollment
-        fields = '__all__'
+        # A rede vem da requisição (core/tenancy.py), não do corpo
+        exclude = ['tenant']
 
+    @transaction.atomic
     def create(self, validated_data):
+        """
+        Cria a matrícula, ou atualiza a existente se o aluno já estiver
+        matriculado (reenvio); `self.created` indica qual dos dois.
+
+        Os perfis são obtidos ou criados pelo CPF com a linha travada até o fim
+        da transação (SELECT ... FOR UPDATE; na colisão de INSERTs simultâneos,
+        o perdedor relê a linha do vencedor). Envios simultâneos com o mesmo
+        responsável ou aluno (ex.: irmãos) são assim serializados em vez de
+        colidir. O responsável é sempre travado antes do aluno, para que a ordem
+        dos locks seja a mesma em todas as requisições.
+
+        O reenvio só é aceito do mesmo responsável (CPF): outro responsável não
+        pode assumir a matrícula nem alterar seus dados.
+        """
         student_data = validated_data.pop('student')
         responsible_data = validated_data.pop('responsible')
         address_data = validated_data.pop('address')
         school_unit_data = validated_data.pop('school_unit', None)
 
-        # Se o aluno já existir (pelo CPF), atualiza; caso contrário, cria
-        student, _ = StudentProfile.objects.get_or_create(cpf=student_data['cpf'], defaults=student_data)
-        responsible, _ = ResponsibleProfile.objects.get_or_create(cpf=responsible_data['cpf'], defaults=responsible_data)
-        address = Address.objects.create(**address_data)
+        with tracing.span('enrollment.profiles'):
+            responsible, _ = ResponsibleProfile.objects.select_for_update().get_or_create(
+                cpf=responsible_data['cpf'], defaults=responsible_data,
+            )
+            student, student_created = StudentProfile.objects.select_for_update().get_or_create(
+                cpf=student_data['cpf'], defaults=student_data,
+            )
+
+        enrollment = None if student_created else Enrollment.objects.filter(student=student).first()
+        self.created = enrollment is None
+        if enrollment is not None:
+            if enrollment.responsible_id != responsible.pk:
+                raise serializers.ValidationError({
+                    'responsible': {'cpf': ['O aluno já está matriculado com outro responsável.']},
+                })
+            return self.update(enrollment, {
+                **validated_data, 'student': student_data, 'address': address_data,
+                'school_unit': school_unit_data,
+            })
+
+        if not student_created:
+            # Aluno de um ano letivo anterior: os dados são atualizados
+            with tracing.span('enrollment.profiles', update=True):
+                for attr, value in student_data.items():
+                    setattr(student, attr, value)
+                student.save()
+        with tracing.span('enrollment.address'):
+            address = Address.objects.create(**address_data)
         school_unit = None
         if school_unit_data:
-            school_unit, _ = SchoolUnit.objects.get_or_create(**school_unit_data)
+            school_unit = upsert_school_unit(school_unit_data)
 
         enrollment = Enrollment.objects.create(
             student=student,
@@ -66,36 +189,39 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             school_unit=school_unit,
             **validated_data
         )
+        events.publish(enrollment, EnrollmentAuditLog.CREATE)
         return enrollment
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         student_data = validated_data.pop('student', None)
         responsible_data = validated_data.pop('responsible', None)
         address_data = validated_data.pop('address', None)
         school_unit_data = validated_data.pop('school_unit', None)
+        changes = {}  # {campo: [antes, depois]} para o histórico
 
         if student_data:
-            for attr, value in student_data.items():
-                setattr(instance.student, attr, value)
-            instance.student.save()
+            if audit.apply_changes(instance.student, student_data, changes, 'student.'):
+                instance.student.save()
 
         if responsible_data:
-            for attr, value in responsible_data.items():
-                setattr(instance.responsible, attr, value)
-            instance.responsible.save()
+            if audit.apply_changes(instance.responsible, responsible_data, changes, 'responsible.'):
+                instance.responsible.save()
 
         if address_data:
-            for attr, value in address_data.items():
-                setattr(instance.address, attr, value)
-            instance.address.save()
+            if audit.apply_changes(instance.address, address_data, changes, 'address.'):
+                instance.address.save()
 
         if school_unit_data:
-            school_unit, _ = SchoolUnit.objects.get_or_create(**school_unit_data)
-            instance.school_unit = school_unit
+            school_unit = upsert_school_unit(school_unit_data)
+            validated_data['school_unit'] = school_unit
 
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        audit.apply_changes(instance, validated_data, changes)
         instance.save()
+
+        request = self.context.get('request')
+        audit.record(instance, EnrollmentAuditLog.UPDATE, changes, getattr(request, 'user', None))
+        events.publish(instance, EnrollmentAuditLog.UPDATE, changes)
         return instance
 
 
@@ -104,3 +230,93 @@ class EnrollmentDocumentsUploadSerializer(serializers.Serializer):
     laudo_pcd = serializers.FileField(required=False, allow_null=True)
     comprovante_residencia = serializers.FileField(required=True)
     historico_escolar = serializers.FileField(required=True)
+
+
+class ResponsiblePortalSerializer(serializers.ModelSerializer):
+    """
+    Matrícula vista pelo responsável no portal. Os indicadores `has_*`
+    informam quais documentos já foram enviados e vêm de anotações da
+    consulta (ver views.ResponsiblePortalView).
+    """
+    student = StudentProfileSerializer(read_only=True)
+    school_unit = SchoolUnitSerializer(read_only=True, allow_null=True)
+    has_cartao_sus = serializers.BooleanField(read_only=True)
+    has_laudo_pcd = serializers.BooleanField(read_only=True)
+    has_comprovante_residencia = serializers.BooleanField(read_only=True)
+    has_historico_escolar = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Enrollment
+        fields = [
+            'id', 'etapa', 'ano_letivo', 'situacao', 'created_at', 'updated_at', 'student', 'school_unit',
+            'has_cartao_sus', 'has_laudo_pcd', 'has_comprovante_residencia', 'has_historico_escolar',
+        ]
+
+
+class EnrollmentAuditLogSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EnrollmentAuditLog
+        fields = ['id', 'action', 'actor', 'changes', 'created_at']
+
+
+class EnrollmentEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = EnrollmentEvent
+        fields = ['id', 'position', 'event_type', 'enrollment_id', 'data', 'created_at']
+
+
+class EnrollmentEventFeedSerializer(serializers.Serializer):
+    events = EnrollmentEventSerializer(many=True)
+    cursor = serializers.IntegerField(help_text='Valor de `since` para a próxima consulta')
+    has_more = serializers.BooleanField()
+
+
+class SchoolSuggestionSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    nome = serializers.CharField()
+    endereco = serializers.CharField()
+    distancia_km = serializers.FloatField()
+    vagas_livres = serializers.IntegerField(allow_null=True, help_text='Vazio: escola sem limite de vagas')
+
+
+class EnrollmentArchiveSerializer(serializers.ModelSerializer):
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = EnrollmentArchive
+        fields = ['enrollment_id', 'ano_letivo', 'situacao', 'archived_at', 'data']
+
+    def get_data(self, obj):
+        return obj.get_data()
+
+
+# Serializers de leitura compilados: mesma saída dos serializers acima,
+# sem o custo de instanciar os campos do DRF a cada requisição.
+
+class StudentProfileReadSerializer(CompiledSerializer):
+    serializer_class = StudentProfileSerializer
+
+
+class ResponsibleProfileReadSerializer(CompiledSerializer):
+    serializer_class = ResponsibleProfileSerializer
+
+
+class AddressReadSerializer(CompiledSerializer):
+    serializer_class = AddressSerializer
+
+
+class SchoolUnitReadSerializer(CompiledSerializer):
+    serializer_class = SchoolUnitSerializer
+
+
+class EnrollmentReadSerializer(CompiledSerializer):
+    """
+    Leitura de matrícula com aluno, responsável, endereço e escola aninhados.
+    Use com `select_related` (ou `values(*value_fields())`) para evitar
+    consultas extras.
+    """
+    serializer_class = EnrollmentSerializer
+
+
+class ResponsiblePortalReadSerializer(CompiledSerializer):
+    serializer_class = ResponsiblePortalSerializer
@@ -1,3 +1,983 @@
-from django.test import TestCase
+import datetime
+import http.client
+import importlib
+import io
+import json
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from educa_digital.accounts import profiles
+from educa_digital.accounts.models import UserProfile
+from educa_digital.core import tenancy
+from educa_digital.core.models import IdempotencyKey, StoredBlob, Tenant
+from educa_digital.core.storage import document_storage
+from educa_digital.core.storage_backends import InMemoryStorage
+from educa_digital.escolas.models import CepCentroid, SchoolUnit
+from .models import (
+    StudentProfile, ResponsibleProfile, Address, Enrollment, EnrollmentArchive, EnrollmentAuditLog,
+    EnrollmentDocuments, EnrollmentEvent, EnrollmentEventSequence, WebhookSubscription,
+)
+from .serializers import (
+    EnrollmentSerializer, EnrollmentReadSerializer,
+    SchoolUnitSerializer, SchoolUnitReadSerializer,
+)
+from . import assignment, audit, webhooks
+from .views import EnrollmentCreateView
+from .validators import cpf_check_digits, normalize_cpf
+
+
+def create_enrollment(cpf='111.111.111-11', school_unit=None, **kwargs):
+    student = StudentProfile.objects.create(
+        cpf=cpf, nome='Maria Souza', rg='12.345.678-9', orgao_emissor='SSP',
+        estado_emissao='SP', email='maria@example.com',
+        data_nascimento=datetime.date(2012, 5, 17), telefone_whatsapp='11988887777',
+        genero='feminino',
+    )
+    responsible, _ = ResponsibleProfile.objects.get_or_create(
+        cpf='999.999.999-99',
+        defaults=dict(
+            nome='Ana Souza', email='ana@example.com', data_nascimento=datetime.date(1985, 1, 30),
+            telefone_whatsapp='11977776666', vinculo='mae', genero='feminino',
+        ),
+    )
+    address = Address.objects.create(cep='01001-000', estado='SP', cidade='São Paulo', bairro='Sé')
+    return Enrollment.objects.create(
+        student=student, responsible=responsible, address=address,
+        school_unit=school_unit, **kwargs
+    )
+
+
+def warm_tenant_lookup(*users):
+    # A rede das requisições do test client (hostname testserver) e o perfil
+    # dos usuários (com a rede de cada um) já em cache, para que as contagens
+    # de consultas vejam só as da view.
+    tenancy.lookup(hostname='testserver')
+    tenancy.default_tenant()
+    for user in users:
+        profiles.get_profile(user)
+
+
+class CompiledReadSerializerTests(TestCase):
+    render = staticmethod(JSONRenderer().render)
+
+    def setUp(self):
+        self.school = SchoolUnit.objects.create(nome='E.M. Centro', cnpj='12.345.678/0001-90', endereco='Rua A, 1')
+        self.enrollment = create_enrollment(school_unit=self.school, situacao='aprovado')
+        self.without_school = create_enrollment(cpf='222.222.222-22')
+
+    def test_enrollment_instance_matches_drf(self):
+        for enrollment in Enrollment.objects.select_related('student', 'responsible', 'address', 'school_unit'):
+            self.assertEqual(
+                self.render(EnrollmentReadSerializer().to_representation(enrollment)),
+                self.render(EnrollmentSerializer(enrollment).data),
+            )
+
+    def test_enrollment_values_rows_match_drf(self):
+        queryset = Enrollment.objects.order_by('pk')
+        self.assertEqual(
+            self.render(EnrollmentReadSerializer().serialize_queryset(queryset)),
+            self.render(EnrollmentSerializer(queryset, many=True).data),
+        )
+
+    def test_school_unit_matches_drf(self):
+        self.assertEqual(
+            self.render(SchoolUnitReadSerializer().to_representation(self.school)),
+            self.render(SchoolUnitSerializer(self.school).data),
+        )
+
+    def test_detail_view_uses_single_query(self):
+        client = APIClient()
+        user = User.objects.create_user('admin', password='x')
+        client.force_authenticate(user)
+        warm_tenant_lookup(user)
+        with self.assertNumQueries(1):
+            response = client.get('/matricula/enrollment/%d/' % self.enrollment.pk)
+        self.assertEqual(response.content, self.render(EnrollmentSerializer(self.enrollment).data))
+
+
+def make_cpf(number):
+    """
+    CPF válido (com os dígitos verificadores) a partir de até 9 dígitos.
+    """
+    base = '%09d' % number
+    return normalize_cpf(base + cpf_check_digits(base))
+
+
+STUDENT_CPF, SIBLING_CPF, RESPONSIBLE_CPF = make_cpf(333000001), make_cpf(555000001), make_cpf(444000001)
+
+
+def enrollment_payload(cpf=STUDENT_CPF):
+    return {
+        'student': {
+            'cpf': cpf, 'nome': 'Pedro Lima', 'rg': '1234567', 'orgao_emissor': 'SSP',
+            'estado_emissao': 'SP', 'email': 'pedro@example.com', 'data_nascimento': '2013-02-01',
+            'telefone_whatsapp': '11911112222', 'genero': 'masculino',
+        },
+        'responsible': {
+            'cpf': RESPONSIBLE_CPF, 'nome': 'Lucia Lima', 'email': 'lucia@example.com',
+            'data_nascimento': '1980-07-12', 'telefone_whatsapp': '11933334444',
+            'vinculo': 'mae', 'genero': 'feminino',
+        },
+        'address': {'cep': '01001-000', 'estado': 'SP', 'cidade': 'São Paulo', 'bairro': 'Sé'},
+        'etapa': 3,
+    }
+
+
+class EnrollmentIdempotencyTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+
+    def post(self, payload, key):
+        return self.client.post('/matricula/enrollment/', payload, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_returns_original_response(self):
+        first = self.post(enrollment_payload(), 'abc-123')
+        self.assertEqual(first.status_code, 201)
+
+        with self.assertNumQueries(1):
+            retry = self.post(enrollment_payload(), 'abc-123')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Enrollment.objects.count(), 1)
+        self.assertEqual(Address.objects.count(), 1)
+
+    def test_same_key_with_different_body_is_rejected(self):
+        self.post(enrollment_payload(), 'abc-123')
+        response = self.post(enrollment_payload(cpf=SIBLING_CPF), 'abc-123')
+        self.assertEqual(response.status_code, 422)
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_abandoned_request_can_be_retried_after_the_lock_expires(self, send):
+        # Requisição original que morreu sem responder (ex.: worker reiniciado)
+        with mock.patch.object(EnrollmentCreateView, 'create_users', side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                self.post(enrollment_payload(), 'abc-123')
+        record = IdempotencyKey.objects.get()
+        self.assertIsNone(record.status_code)
+        self.assertEqual(self.post(enrollment_payload(), 'abc-123').status_code, 409)
+
+        IdempotencyKey.objects.update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(self.post(enrollment_payload(cpf=SIBLING_CPF), 'abc-123').status_code, 422)
+        retry = self.post(enrollment_payload(), 'abc-123')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(Enrollment.objects.count(), 1)
+        record.refresh_from_db()
+        self.assertEqual((record.status_code, record.locked_until), (201, None))
+
+
+def sibling_payload(student_cpf, responsible_cpf=RESPONSIBLE_CPF, email='irmaos@example.com'):
+    payload = enrollment_payload(student_cpf)
+    payload['student']['email'] = email
+    payload['responsible']['cpf'] = responsible_cpf
+    return payload
+
+
+class EnrollmentUpsertTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+
+    def post(self, payload):
+        return self.client.post('/matricula/enrollment/', payload, format='json')
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_siblings_share_responsible_and_resubmission_updates(self, send):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post(sibling_payload(STUDENT_CPF)).status_code, 201)
+            self.assertEqual(self.post(sibling_payload(SIBLING_CPF)).status_code, 201)
+        # Responsável e o e-mail compartilhado pelos irmãos: um usuário cada
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(ResponsibleProfile.objects.count(), 1)
+        self.assertEqual(
+            sorted(User.objects.exclude(username='secretaria').values_list('username', flat=True)),
+            ['irmaos@example.com', 'lucia@example.com'],
+        )
+
+        payload = sibling_payload(STUDENT_CPF)
+        payload['student']['nome'] = 'Pedro Lima Souza'
+        payload['etapa'] = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Enrollment.objects.count(), 2)
+        enrollment = Enrollment.objects.get(student__cpf=STUDENT_CPF)
+        self.assertEqual((enrollment.student.nome, enrollment.etapa), ('Pedro Lima Souza', 4))
+        self.assertEqual(
+            EnrollmentAuditLog.objects.filter(enrollment_id=enrollment.pk).latest('pk').changes,
+            {'student.nome': ['Pedro Lima', 'Pedro Lima Souza'], 'etapa': [3, 4]},
+        )
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_resubmission_by_another_responsible_is_rejected(self, send):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post(enrollment_payload()).status_code, 201)
+        enrollment = Enrollment.objects.get()
+
+        payload = sibling_payload(STUDENT_CPF, responsible_cpf=make_cpf(666000001))
+        payload['address']['bairro'] = 'Centro'
+        response = self.post(payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cpf', response.data['responsible'])
+
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.responsible.cpf, RESPONSIBLE_CPF)
+        self.assertEqual(enrollment.address.bairro, 'Sé')
+        self.assertEqual(ResponsibleProfile.objects.count(), 1)
+        self.assertEqual(EnrollmentAuditLog.objects.count(), 1)
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_failed_enrollment_rolls_back_users_and_sends_nothing(self, send):
+        with mock.patch('educa_digital.accounts.profiles.provision', side_effect=RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                self.post(enrollment_payload())
+        send.assert_not_called()
+        self.assertFalse(Enrollment.objects.exists())
+        self.assertFalse(EnrollmentEvent.objects.exists())
+        self.assertFalse(EnrollmentAuditLog.objects.exists())
+        self.assertFalse(StudentProfile.objects.exists())
+        self.assertFalse(User.objects.filter(email='lucia@example.com').exists())
+
+
+class EnrollmentValidationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+        self.school = SchoolUnit.objects.create(nome='Escola Central', cnpj='11.222.333/0001-81', endereco='Rua A')
+
+    def payload_with_school(self, cpf=STUDENT_CPF):
+        payload = enrollment_payload(cpf)
+        payload['school_unit'] = {'nome': 'Escola Central', 'cnpj': self.school.cnpj, 'endereco': 'Rua A'}
+        return payload
+
+    def test_validation_runs_no_queries(self):
+        serializer = EnrollmentSerializer(data=self.payload_with_school())
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_cpf_check_digits_are_validated_in_python(self):
+        self.assertEqual(make_cpf(123456789), '123.456.789-09')
+        self.assertEqual(normalize_cpf('12345678909'), '123.456.789-09')
+        # Dígitos não ASCII (arábico-índicos, largura total) não são aceitos
+        self.assertIsNone(normalize_cpf('١٢٣٤٥٦٧٨٩٠٩'))
+        self.assertIsNone(normalize_cpf('１２３４５６７８９０９'))
+        for cpf in ('123.456.789-00', '333.333.333-33', '1234567890'):
+            serializer = EnrollmentSerializer(data=enrollment_payload(cpf))
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['student']['cpf'], ['CPF inválido.'])
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_existing_cpf_and_cnpj_are_upserted_not_rejected(self, send):
+        response = self.client.post('/matricula/enrollment/', self.payload_with_school(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['school_unit']['id'], self.school.pk)
+
+        # Mesmo aluno, CPF sem pontuação: atualiza a matrícula existente
+        payload = self.payload_with_school(STUDENT_CPF.replace('.', '').replace('-', ''))
+        payload['etapa'] = 5
+        response = self.client.post('/matricula/enrollment/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['student']['cpf'], STUDENT_CPF)
+        self.assertEqual(Enrollment.objects.get().etapa, 5)
+        self.assertEqual(SchoolUnit.objects.count(), 1)
+
+    def test_cached_fields_are_not_shared_between_instances(self):
+        first, second = EnrollmentSerializer(), EnrollmentSerializer()
+        self.assertIsNot(first.fields['etapa'], second.fields['etapa'])
+        self.assertIs(first.fields['student'].fields['cpf'].root, first)
+        self.assertIs(second.fields['student'].fields['cpf'].root, second)
+
+
+class NormalizeCpfMigrationTests(TestCase):
+    migration = importlib.import_module('educa_digital.matricula.migrations.0010_normalize_cpf')
+
+    def test_formats_cpfs_and_flags_duplicates(self):
+        kept = create_enrollment(cpf='111.111.111-11')
+        bare = create_enrollment(cpf='222.222.222-22')
+        duplicate = create_enrollment(cpf='333.333.333-33')
+        StudentProfile.objects.filter(pk=bare.student_id).update(cpf='22222222222')
+        StudentProfile.objects.filter(pk=duplicate.student_id).update(cpf='111 111 111 11')
+
+        with self.assertLogs(self.migration.logger, 'WARNING') as logs:
+            self.migration.normalize_cpfs(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(
+            dict(StudentProfile.objects.values_list('pk', 'cpf')),
+            {kept.student_id: '111.111.111-11', bare.student_id: '222.222.222-22',
+             duplicate.student_id: '111 111 111 11'},
+        )
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('duplica o de studentprofile %d' % kept.student_id, logs.output[0])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    """
+    Envios simultâneos com CPFs sobrepostos (irmãos com o mesmo responsável e
+    reenvios do mesmo aluno). Precisa de um banco com SELECT ... FOR UPDATE
+    (PostgreSQL); no SQLite as escritas concorrentes só geram "database is locked".
+    """
+    requests = 300
+
+    def setUp(self):
+        cache.clear()  # a rede padrão em cache foi apagada junto com o banco
+        self.user = User.objects.create_user('secretaria', password='x')
+
+    def post(self, n):
+        student = 100 + n % 120  # cada aluno é enviado 2 ou 3 vezes
+        payload = sibling_payload(
+            make_cpf(student * 1000),
+            responsible_cpf=make_cpf(student % 40 * 1000 + 1),  # 3 irmãos por responsável
+            email='familia%d@example.com' % (student % 40),
+        )
+        payload['responsible']['email'] = 'responsavel%d@example.com' % (student % 40)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post('/matricula/enrollment/', payload, format='json').status_code
+        finally:
+            connections.close_all()
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def test_parallel_creates_have_no_errors_or_duplicates(self, send):
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            statuses = list(executor.map(self.post, range(self.requests)))
+
+        self.assertEqual(set(statuses) - {200, 201}, set())
+        self.assertEqual(statuses.count(201), 120)
+        self.assertEqual(Enrollment.objects.count(), 120)
+        self.assertEqual(StudentProfile.objects.count(), 120)
+        self.assertEqual(ResponsibleProfile.objects.count(), 40)
+        self.assertEqual(Address.objects.count(), 120)
+        # 40 responsáveis + 40 e-mails de família dos alunos, sem duplicatas
+        self.assertEqual(User.objects.exclude(pk=self.user.pk).count(), 80)
+        self.assertFalse(StudentProfile.objects.filter(user__isnull=True).exists())
+        self.assertFalse(ResponsibleProfile.objects.filter(user__isnull=True).exists())
+
+
+class TenantScopingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.other = Tenant.objects.create(nome='Rede Norte', slug='norte', hostname='norte.example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+        self.their_user = User.objects.create_user('secretaria-norte', password='x')
+        UserProfile.objects.create(user=self.their_user, tipo_usuario='admin', tenant=self.other)
+
+    def test_queries_only_see_the_request_tenant(self):
+        tenancy.activate(self.other)
+        try:
+            theirs = create_enrollment()
+        finally:
+            tenancy.deactivate()
+        ours = create_enrollment(cpf='222.222.222-22')
+        self.assertEqual(theirs.tenant_id, self.other.pk)
+        self.assertEqual(ours.tenant, tenancy.default_tenant())
+
+        url = '/matricula/enrollment/%d/'
+        self.assertEqual(self.client.get(url % ours.pk).status_code, 200)
+        self.assertEqual(self.client.get(url % theirs.pk).status_code, 404)
+        self.assertEqual(self.client.get(url % ours.pk, HTTP_X_TENANT='sul').status_code, 404)
+        # A rede do cabeçalho ou do hostname precisa ser a do usuário
+        self.assertEqual(self.client.get(url % theirs.pk, HTTP_X_TENANT='norte').status_code, 403)
+        self.assertEqual(self.client.get(url % theirs.pk, HTTP_HOST='norte.example.com').status_code, 403)
+
+        self.client.force_authenticate(self.their_user)
+        self.assertEqual(self.client.get(url % theirs.pk, HTTP_X_TENANT='norte').status_code, 200)
+        self.assertEqual(self.client.get(url % theirs.pk, HTTP_HOST='norte.example.com').status_code, 200)
+        self.assertEqual(self.client.get(url % ours.pk, HTTP_HOST='norte.example.com').status_code, 404)
+        self.assertEqual(self.client.get(url % ours.pk).status_code, 403)
+
+        # A equipe atende todas as redes
+        self.client.force_authenticate(User.objects.create_user('suporte', is_staff=True))
+        self.assertEqual(self.client.get(url % theirs.pk, HTTP_X_TENANT='norte').status_code, 200)
+        self.assertEqual(self.client.get(url % ours.pk).status_code, 200)
+
+    def test_history_and_archives_stay_in_their_tenant(self):
+        tenancy.activate(self.other)
+        try:
+            theirs = create_enrollment()
+            audit.build(theirs, EnrollmentAuditLog.UPDATE, {'student.cpf': ['1', '2']}).save()
+            EnrollmentArchive.objects.create(
+                enrollment_id=theirs.pk + 1000, ano_letivo=2020, student_cpf='111.111.111-11',
+                responsible_cpf='999.999.999-99', situacao='aprovado', payload=EnrollmentArchive.compress({}),
+            )
+        finally:
+            tenancy.deactivate()
+        self.assertEqual(set(EnrollmentAuditLog.objects.values_list('tenant', flat=True)), {self.other.pk})
+        self.assertEqual(EnrollmentArchive.objects.get().tenant, self.other)
+
+        self.client.force_authenticate(User.objects.create_user('suporte', is_staff=True))
+        self.assertEqual(self.client.get('/matricula/enrollment/%d/history/' % theirs.pk).data, [])
+        archived = '/matricula/enrollment/archived/%d/' % (theirs.pk + 1000)
+        self.assertEqual(self.client.get(archived).status_code, 404)
+        self.assertEqual(self.client.get(archived, HTTP_X_TENANT='norte').status_code, 200)
+
+    def test_same_cpf_enrolls_independently_in_each_tenant(self):
+        response = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(self.their_user)
+        response = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json', HTTP_X_TENANT='norte')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('tenant', response.data)
+        self.assertEqual(
+            sorted(StudentProfile.objects.values_list('tenant__slug', 'cpf')),
+            [('norte', STUDENT_CPF), ('padrao', STUDENT_CPF)],
+        )
+
+    def test_same_school_cnpj_is_registered_in_each_tenant(self):
+        payload = enrollment_payload()
+        payload['school_unit'] = {'nome': 'Escola Central', 'cnpj': '11.222.333/0001-81', 'endereco': 'Rua A'}
+        self.assertEqual(self.client.post('/matricula/enrollment/', payload, format='json').status_code, 201)
+        self.client.force_authenticate(self.their_user)
+        response = self.client.post('/matricula/enrollment/', payload, format='json', HTTP_X_TENANT='norte')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(SchoolUnit.objects.values_list('tenant__slug', 'cnpj')),
+            [('norte', '11.222.333/0001-81'), ('padrao', '11.222.333/0001-81')],
+        )
+        # Dentro da mesma rede o CNPJ continua único
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SchoolUnit.objects.create(nome='Cópia', cnpj='11.222.333/0001-81', endereco='Rua B')
+
+    def test_each_tenant_has_its_own_cache(self):
+        default = tenancy.default_tenant()
+        tenancy.tenant_cache(default.pk).set('portal', 'padrao')
+        self.assertIsNone(tenancy.tenant_cache(self.other.pk).get('portal'))
+        self.assertIs(tenancy.tenant_cache(default.pk), tenancy.tenant_cache(default.pk))
+
+
+class ArchiveEnrollmentsTests(TestCase):
+
+    def test_archives_closed_year_and_keeps_it_readable(self):
+        old = create_enrollment(ano_letivo=2020)
+        expected = EnrollmentReadSerializer().to_representation(old)
+        current = create_enrollment(cpf='222.222.222-22')
+
+        call_command('archive_enrollments', '2020', stdout=io.StringIO())
+
+        self.assertQuerysetEqual(Enrollment.objects.all(), [current.pk], transform=lambda e: e.pk)
+        self.assertFalse(Address.objects.filter(pk=old.address_id).exists())
+        archive = EnrollmentArchive.objects.get(enrollment_id=old.pk)
+        data = archive.get_data()
+        self.assertIsNone(data.pop('documents'))
+        self.assertEqual(data, expected)
+        event = EnrollmentEvent.objects.get()
+        self.assertEqual((event.event_type, event.enrollment_id), (EnrollmentEvent.DELETED, old.pk))
+        self.assertEqual(event.data['ano_letivo'], 2020)
+
+    def test_archived_enrollment_is_visible_to_staff_and_the_family(self):
+        old = create_enrollment(ano_letivo=2020)
+        call_command('archive_enrollments', '2020', stdout=io.StringIO())
+        url = '/matricula/enrollment/archived/%d/' % old.pk
+        client = APIClient()
+
+        client.force_authenticate(User.objects.create_user('curioso@example.com'))
+        self.assertEqual(client.get(url).status_code, 404)
+
+        family = User.objects.create_user('ana@example.com')
+        ResponsibleProfile.objects.filter(pk=old.responsible_id).update(user=family)
+        client.force_authenticate(family)
+        self.assertEqual(client.get(url).status_code, 200)
+
+        client.force_authenticate(User.objects.create_user('secretaria', is_staff=True))
+        self.assertEqual(client.get(url).data['enrollment_id'], old.pk)
+
+
+class MyEnrollmentsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+
+    def post(self, payload):
+        response = self.client.post('/matricula/enrollment/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_profiles_are_linked_to_existing_user_ignoring_case(self):
+        existing = User.objects.create_user('lucia', email='lucia@example.com')
+        payload = enrollment_payload()
+        payload['responsible']['email'] = 'Lucia@Example.COM'
+        self.post(payload)
+
+        self.assertEqual(ResponsibleProfile.objects.get().user, existing)
+        self.assertEqual(StudentProfile.objects.get().user.email, 'pedro@example.com')
+        self.assertFalse(User.objects.filter(email='Lucia@Example.COM').exists())
+
+    def test_responsible_sees_all_children_in_one_query(self):
+        first = create_enrollment()
+        second = create_enrollment(cpf='222.222.222-22')
+        self.post(enrollment_payload())  # de outro responsável
+        parent = User.objects.create_user('ana@example.com', email='ana@example.com')
+        child = User.objects.create_user('maria@example.com', email='maria@example.com')
+        ResponsibleProfile.objects.filter(pk=first.responsible_id).update(user=parent)
+        StudentProfile.objects.filter(pk=second.student_id).update(user=child)
+
+        self.client.force_authenticate(parent)
+        warm_tenant_lookup(parent)
+        with self.assertNumQueries(1):
+            response = self.client.get('/matricula/enrollment/mine/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], [first.pk, second.pk])
+
+        self.client.force_authenticate(child)
+        response = self.client.get('/matricula/enrollment/mine/')
+        self.assertEqual([row['id'] for row in response.data], [second.pk])
+
+
+class ResponsiblePortalTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        tenancy.clear_caches()
+        warm_tenant_lookup()
+        self.school = SchoolUnit.objects.create(nome='E.M. Centro', cnpj='12.345.678/0001-90', endereco='Rua A, 1')
+        self.first = create_enrollment(school_unit=self.school)
+        self.second = create_enrollment(cpf='222.222.222-22')
+        other = ResponsibleProfile.objects.create(
+            cpf='888.888.888-88', nome='Paulo Dias', email='paulo@example.com',
+            data_nascimento=datetime.date(1980, 1, 1), telefone_whatsapp='11900000000', vinculo='pai',
+            genero='masculino',
+        )
+        Enrollment.objects.filter(pk=create_enrollment(cpf='333.333.333-33').pk).update(responsible=other)
+        EnrollmentDocuments.objects.create(
+            enrollment=self.first, comprovante_residencia='documents/comprovante.pdf',
+            historico_escolar='documents/historico.pdf',
+        )
+        self.parent = User.objects.create_user('ana@example.com', email='ana@example.com')
+        warm_tenant_lookup(self.parent)
+        ResponsibleProfile.objects.filter(pk=self.first.responsible_id).update(user=self.parent)
+        self.client = APIClient()
+        self.client.force_authenticate(self.parent)
+
+    def get(self):
+        response = self.client.get('/matricula/portal/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_lists_children_with_document_flags_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.get()
+        self.assertEqual([row['id'] for row in data], [self.first.pk, self.second.pk])
+        self.assertEqual(data[0]['school_unit']['nome'], 'E.M. Centro')
+        self.assertIsNone(data[1]['school_unit'])
+        self.assertEqual(
+            [(row['has_comprovante_residencia'], row['has_historico_escolar'], row['has_cartao_sus']) for row in data],
+            [(True, True, False), (False, False, False)],
+        )
+
+    def test_cached_until_enrollment_changes(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.situacao = 'aprovado'
+            self.second.save()
+            # Antes do commit, o cache continua com o estado confirmado
+            self.assertEqual(self.get()[1]['situacao'], 'pendente')
+        self.assertEqual(self.get()[1]['situacao'], 'aprovado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EnrollmentDocuments.objects.create(
+                enrollment=self.second, comprovante_residencia='documents/c.pdf', historico_escolar='documents/h.pdf',
+            )
+        self.assertTrue(self.get()[1]['has_historico_escolar'])
+
+    def test_student_school_and_responsible_changes_invalidate(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            student = self.first.student
+            student.nome = 'Maria Souza Lima'
+            student.save()
+        self.assertIn('Maria Souza Lima', [row['student']['nome'] for row in self.get()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school.nome = 'E.M. Centro Novo'
+            self.school.save()
+        self.assertEqual([row['school_unit']['nome'] for row in self.get() if row['school_unit']], ['E.M. Centro Novo'])
+
+        # O responsável passa para outra conta: o portal da anterior fica vazio
+        responsible = ResponsibleProfile.objects.get(pk=self.first.responsible_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            responsible.user = User.objects.create_user('ana2@example.com')
+            responsible.save()
+        self.assertEqual(self.get(), [])
+
+    def test_documents_of_other_families_are_not_listed(self):
+        foreign = Enrollment.objects.get(responsible__cpf='888.888.888-88')
+        EnrollmentDocuments.objects.create(
+            enrollment=foreign, comprovante_residencia='documents/c.pdf', historico_escolar='documents/h.pdf',
+        )
+        query = '/matricula/enrollment/documents/?enrollment=%d&enrollment=%d' % (self.first.pk, foreign.pk)
+
+        response = self.client.get(query)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['enrollment'] for row in response.data], [self.first.pk])
+
+        self.client.force_authenticate(User.objects.create_user('curioso@example.com'))
+        self.assertEqual(self.client.get(query).data, [])
+
+        self.client.force_authenticate(User.objects.create_user('secretaria', is_staff=True))
+        self.assertEqual(len(self.client.get(query).data), 2)
+        # Valores que não são IDs são ignorados
+        response = self.client.get(query + '&enrollment=²&enrollment=%s' % ('9' * 30))
+        self.assertEqual((response.status_code, len(response.data)), (200, 2))
+
+
+class EnrollmentAuditLogTests(TestCase):
+
+    def setUp(self):
+        cache.clear()  # a rede padrão em cache foi apagada junto com o banco
+        self.user = User.objects.create_user('secretaria', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_update_records_field_diff_in_one_insert(self):
+        enrollment = create_enrollment()
+        payload = {'situacao': 'aprovado', 'student': {'nome': 'Maria S. Souza'}, 'address': {'bairro': 'Centro'}}
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/matricula/enrollment/%d/' % enrollment.pk, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT INTO "matricula_enrollmentauditlog"')]
+        self.assertEqual(len(inserts), 1)
+
+        history = self.client.get('/matricula/enrollment/%d/history/' % enrollment.pk).data
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]['action'], 'update')
+        self.assertEqual(history[0]['actor'], self.user.pk)
+        self.assertEqual(history[0]['changes'], {
+            'situacao': ['pendente', 'aprovado'],
+            'student.nome': ['Maria Souza', 'Maria S. Souza'],
+            'address.bairro': ['Sé', 'Centro'],
+        })
+
+    def test_events_of_a_request_are_flushed_together(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json')
+        enrollment_id = response.data['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/matricula/enrollment/%d/' % enrollment_id)
+
+        history = self.client.get('/matricula/enrollment/%d/history/' % enrollment_id).data
+        self.assertEqual([event['action'] for event in history], ['create', 'delete'])
+
+    def test_history_is_restricted_to_staff_and_the_family(self):
+        enrollment = create_enrollment()
+        audit.build(enrollment, EnrollmentAuditLog.UPDATE, {'student.cpf': ['1', '2']}).save()
+        url = '/matricula/enrollment/%d/history/' % enrollment.pk
+
+        self.client.force_authenticate(User.objects.create_user('curioso@example.com'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        family = User.objects.create_user('ana@example.com')
+        ResponsibleProfile.objects.filter(pk=enrollment.responsible_id).update(user=family)
+        self.client.force_authenticate(family)
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+    def test_admin_bulk_delete_records_history_and_events(self):
+        enrollments = [create_enrollment(), create_enrollment(cpf='222.222.222-22')]
+        admin_user = User.objects.create_superuser('diretoria', password='x')
+        client = Client()
+        client.force_login(admin_user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/admin/matricula/enrollment/', {
+                'action': 'delete_selected', 'post': 'yes',
+                '_selected_action': [enrollment.pk for enrollment in enrollments],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Enrollment.objects.exists())
+        deleted = {enrollment.pk for enrollment in enrollments}
+        self.assertEqual(
+            set(EnrollmentAuditLog.objects.values_list('enrollment_id', 'action', 'actor')),
+            {(pk, EnrollmentAuditLog.DELETE, admin_user.pk) for pk in deleted},
+        )
+        self.assertEqual(
+            set(EnrollmentEvent.objects.values_list('enrollment_id', 'event_type')),
+            {(pk, EnrollmentEvent.DELETED) for pk in deleted},
+        )
+
+    def test_rolled_back_update_leaves_no_audit_row(self):
+        enrollment = create_enrollment()
+        with mock.patch('educa_digital.matricula.serializers.events.publish', side_effect=RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                self.client.patch('/matricula/enrollment/%d/' % enrollment.pk, {'situacao': 'aprovado'}, format='json')
+        enrollment.refresh_from_db()
+        self.assertEqual(enrollment.situacao, 'pendente')
+        self.assertFalse(EnrollmentAuditLog.objects.exists())
+
+
+class PurgeStaleDataTests(TestCase):
+
+    def setUp(self):
+        self.long_ago = timezone.now() - datetime.timedelta(days=90)
+
+    def test_purges_never_activated_users_past_ttl(self):
+        def user(username, **kwargs):
+            return User.objects.create_user(username, email=username, is_active=False, date_joined=self.long_ago, **kwargs)
+
+        stale = user('anonimo@example.com')
+        linked = user('ana@example.com')
+        ResponsibleProfile.objects.filter(pk=create_enrollment().responsible_id).update(user=linked)
+        user('ja-entrou@example.com', last_login=self.long_ago)
+        User.objects.create_user('recente@example.com', is_active=False)
+
+        call_command('purge_stale_data', stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(pk=stale.pk).exists())
+        self.assertEqual(User.objects.count(), 3)
+
+    def test_purges_orphan_addresses(self):
+        kept = create_enrollment()
+        create_enrollment(cpf='222.222.222-22').delete()
+        out = io.StringIO()
+        call_command('purge_stale_data', stdout=out)
+        self.assertEqual(list(Address.objects.values_list('pk', flat=True)), [kept.address_id])
+        self.assertRegex(out.getvalue(), r'endereços órfãos +1')
+
+    def test_purges_dangling_documents_and_fixes_ref_counts(self):
+        backend = InMemoryStorage()
+
+        def upload(content):
+            return SimpleUploadedFile('doc.pdf', content, content_type='application/pdf')
+
+        with mock.patch.object(document_storage(), '_backend', backend):
+            shared = [
+                EnrollmentDocuments.objects.create(
+                    enrollment=create_enrollment(cpf=cpf), comprovante_residencia=upload(b'comprovante'),
+                    historico_escolar=upload(cpf.encode()),
+                )
+                for cpf in ('111.111.111-11', '222.222.222-22')
+            ]
+            # Exclusão em cascata: as referências do documento não são liberadas.
+            shared[0].enrollment.delete()
+            recent = document_storage().save('documents/recente.pdf', ContentFile(b'upload em andamento'))
+            StoredBlob.objects.exclude(name=recent).update(last_referenced_at=self.long_ago)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('purge_stale_data', stdout=io.StringIO())
+
+        self.assertEqual(
+            dict(StoredBlob.objects.values_list('name', 'ref_count')),
+            {shared[1].comprovante_residencia.name: 1, shared[1].historico_escolar.name: 1, recent: 1},
+        )
+        self.assertFalse(backend.exists(shared[0].historico_escolar.name))
+        self.assertTrue(backend.exists(shared[1].comprovante_residencia.name))
+
+
+class EnrollmentEventTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user('secretaria', password='x')
+        self.user.user_permissions.add(Permission.objects.get(codename='view_enrollmentevent'))
+        self.client.force_authenticate(self.user)
+
+    @mock.patch('educa_digital.matricula.views.send_whatsapp_message')
+    def enroll_approve_and_delete(self, send):
+        enrollment_id = self.client.post('/matricula/enrollment/', enrollment_payload(), format='json').data['id']
+        payload = {**enrollment_payload(), 'situacao': 'aprovado'}
+        url = '/matricula/enrollment/%d/' % enrollment_id
+        self.assertEqual(self.client.put(url, payload, format='json').status_code, 200)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        return enrollment_id
+
+    def test_changes_are_published_and_read_through_the_feed(self):
+        enrollment_id = self.enroll_approve_and_delete()
+
+        response = self.client.get('/matricula/events/', {'since': 0})
+        events = response.data['events']
+        self.assertEqual([event['event_type'] for event in events], [
+            EnrollmentEvent.CREATED, EnrollmentEvent.UPDATED, EnrollmentEvent.SITUACAO_CHANGED, EnrollmentEvent.DELETED,
+        ])
+        self.assertEqual({event['enrollment_id'] for event in events}, {enrollment_id})
+        self.assertEqual(events[2]['data']['situacao'], 'aprovado')
+        self.assertEqual(events[2]['data']['situacao_anterior'], 'pendente')
+        self.assertEqual([event['position'] for event in events], [1, 2, 3, 4])
+        self.assertEqual((response.data['cursor'], response.data['has_more']), (4, False))
+
+        page = self.client.get('/matricula/events/', {'since': 1, 'limit': 2}).data
+        self.assertEqual([event['id'] for event in page['events']], [events[1]['id'], events[2]['id']])
+        self.assertTrue(page['has_more'])
+        self.assertEqual(self.client.get('/matricula/events/', {'since': page['cursor'] + 1}).data['events'], [])
+        self.assertEqual(self.client.get('/matricula/events/', {'since': 'x'}).status_code, 400)
+
+    def test_feed_is_restricted_to_staff_and_integrations(self):
+        self.enroll_approve_and_delete()
+        self.client.force_authenticate(User.objects.create_user('familia', password='x'))
+        self.assertEqual(self.client.get('/matricula/events/').status_code, 403)
+
+        self.client.force_authenticate(User.objects.create_user('equipe', password='x', is_staff=True))
+        self.assertEqual(len(self.client.get('/matricula/events/').data['events']), 4)
+
+    def test_late_commits_are_published_after_the_cursor(self):
+        self.enroll_approve_and_delete()
+        cursor = self.client.get('/matricula/events/').data['cursor']
+        # ID reservado antes dos demais por uma transação que só confirmou agora
+        late = EnrollmentEvent.objects.create(
+            id=EnrollmentEvent.objects.earliest('pk').pk - 1,
+            event_type=EnrollmentEvent.CREATED, enrollment_id=999, data={'id': 999},
+        )
+
+        response = self.client.get('/matricula/events/', {'since': cursor})
+        self.assertEqual([event['id'] for event in response.data['events']], [late.pk])
+        self.assertEqual(response.data['cursor'], cursor + 1)
+        self.assertEqual(self.client.get('/matricula/events/', {'since': cursor + 1}).data['events'], [])
+
+    def test_existing_events_keep_their_ids_as_positions(self):
+        migration = importlib.import_module('educa_digital.matricula.migrations.0011_event_position')
+        self.enroll_approve_and_delete()
+        ids = list(EnrollmentEvent.objects.order_by('pk').values_list('pk', flat=True))
+
+        migration.number_existing_events(django_apps, mock.Mock(connection=connection))
+        self.assertEqual(list(EnrollmentEvent.objects.order_by('pk').values_list('position', flat=True)), ids)
+        self.assertEqual(EnrollmentEventSequence.objects.get().last_position, ids[-1])
+
+        EnrollmentEvent.objects.create(event_type=EnrollmentEvent.CREATED, enrollment_id=999, data={'id': 999})
+        events = self.client.get('/matricula/events/', {'since': ids[-1]}).data['events']
+        self.assertEqual([event['position'] for event in events], [ids[-1] + 1])
+
+    def test_webhooks_receive_signed_batches_and_retry_with_backoff(self):
+        self.enroll_approve_and_delete()
+        subscription = WebhookSubscription.objects.create(nome='Censo', url='https://censo.example.com/hook')
+        approvals = WebhookSubscription.objects.create(
+            nome='Secretaria', url='https://secretaria.example.com/hook',
+            event_types=[EnrollmentEvent.SITUACAO_CHANGED],
+        )
+
+        with mock.patch.object(webhooks, 'post', side_effect=urllib.error.URLError('timeout')):
+            report = webhooks.dispatch(batch_size=3)
+        subscription.refresh_from_db()
+        self.assertEqual(set(report.values()), {0})
+        self.assertEqual((subscription.cursor, subscription.failures), (0, 1))
+        self.assertGreater(subscription.next_attempt_at, timezone.now())
+        self.assertEqual(subscription.last_error, '<urlopen error timeout>')
+
+        with mock.patch.object(webhooks, 'post') as post:
+            self.assertEqual(set(webhooks.dispatch(batch_size=3).values()), set())  # aguardando a nova tentativa
+            WebhookSubscription.objects.update(next_attempt_at=timezone.now())
+            webhooks.dispatch(batch_size=3)
+
+        bodies = {}
+        for (url, body, headers), _ in post.call_args_list:
+            timestamp = int(headers[webhooks.TIMESTAMP_HEADER])
+            self.assertEqual(headers[webhooks.SIGNATURE_HEADER], webhooks.sign(
+                subscription.secret if 'censo' in url else approvals.secret, timestamp, body,
+            ))
+            bodies.setdefault(url, []).append(json.loads(body))
+        self.assertEqual([len(batch['events']) for batch in bodies[subscription.url]], [3, 1])
+        self.assertEqual(
+            [event['event_type'] for event in bodies[approvals.url][0]['events']], [EnrollmentEvent.SITUACAO_CHANGED],
+        )
+        subscription.refresh_from_db()
+        self.assertEqual((subscription.cursor, subscription.failures, subscription.next_attempt_at), (4, 0, None))
+
+
+    def test_webhooks_post_outside_transactions_and_survive_broken_endpoints(self):
+        self.enroll_approve_and_delete()
+        broken = WebhookSubscription.objects.create(nome='Quebrado', url='https://quebrado.example.com/hook')
+        healthy = WebhookSubscription.objects.create(nome='Censo', url='https://censo.example.com/hook')
+        baseline = len(connection.savepoint_ids)
+        depths = []
+
+        def post(url, body, headers):
+            # Nenhuma transação (e nenhuma trava) aberta durante o POST
+            depths.append(len(connection.savepoint_ids))
+            if url == broken.url:
+                raise http.client.IncompleteRead(b'')
+            return 200
+
+        with mock.patch.object(webhooks, 'post', side_effect=post):
+            webhooks.dispatch()
+        self.assertEqual(depths, [baseline, baseline])
+        broken.refresh_from_db()
+        healthy.refresh_from_db()
+        self.assertEqual((broken.cursor, broken.failures), (0, 1))
+        self.assertIn('IncompleteRead', broken.last_error)
+        self.assertEqual((healthy.cursor, healthy.failures, healthy.next_attempt_at), (4, 0, None))
+
+class SchoolSuggestionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        assignment.clear_indexes()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('secretaria', password='x'))
+        CepCentroid.objects.bulk_create([
+            CepCentroid(cep='01001000', latitude=-23.5503, longitude=-46.6339),  # Praça da Sé
+            CepCentroid(cep='02012', latitude=-23.5015, longitude=-46.6249),  # setor de Santana
+        ])
+        self.se = self.school('EMEF Sé', '1', -23.5489, -46.6388, vagas=2)
+        self.liberdade = self.school('EMEF Liberdade', '2', -23.5587, -46.6350)
+        self.santana = self.school('EMEF Santana', '3', -23.5025, -46.6252, vagas=10)
+        self.school('EMEF Fechada', '4', -23.5503, -46.6339, ativo=False)
+        self.school('EMEF Lotada', '5', -23.5500, -46.6340, vagas=0)
+
+    def school(self, nome, cnpj, latitude, longitude, **kwargs):
+        return SchoolUnit.objects.create(
+            nome=nome, cnpj=cnpj, endereco='Rua %s' % nome, latitude=latitude, longitude=longitude, **kwargs,
+        )
+
+    def wait(self, number, cep='01001-000'):
+        enrollment = create_enrollment(cpf=make_cpf(number))
+        Address.objects.filter(pk=enrollment.address_id).update(cep=cep)
+        return enrollment
+
+    def test_suggests_nearest_active_schools_with_vacancies(self):
+        create_enrollment(cpf=make_cpf(1), school_unit=self.se, situacao='aprovado')
+
+        response = self.client.get('/matricula/schools/suggest/', {'cep': '01001-000'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([school['nome'] for school in response.data], ['EMEF Sé', 'EMEF Liberdade', 'EMEF Santana'])
+        self.assertEqual([school['vagas_livres'] for school in response.data], [1, None, 10])
+        self.assertLess(response.data[0]['distancia_km'], 1)
+        self.assertAlmostEqual(response.data[2]['distancia_km'], 5.4, delta=0.3)
+
+        response = self.client.get('/matricula/schools/suggest/', {'cep': '02012-345', 'k': 1})
+        self.assertEqual([school['nome'] for school in response.data], ['EMEF Santana'])
+
+        self.assertEqual(self.client.get('/matricula/schools/suggest/', {'cep': '99999-999'}).status_code, 404)
+        self.assertEqual(self.client.get('/matricula/schools/suggest/', {'cep': '01001-000', 'k': 0}).status_code, 400)
+        self.assertEqual(self.client.get('/matricula/schools/suggest/', {'cep': '01001-000', 'k': '²'}).status_code, 400)
+
+    def test_waiting_list_is_assigned_by_arrival_within_vacancies(self):
+        create_enrollment(cpf=make_cpf(1), school_unit=self.se)
+        first, second, third = self.wait(2), self.wait(3), self.wait(4)
+        unknown = self.wait(5, cep='99999-999')
+
+        self.assertEqual(assignment.assign_waiting_list(dry_run=True)['atribuídas'], 3)
+        self.assertFalse(Enrollment.objects.filter(pk=first.pk, school_unit__isnull=False).exists())
+
+        out = io.StringIO()
+        call_command('assign_waiting_list', stdout=out)
+        self.assertIn('atribuídas                 3', out.getvalue())
+        self.assertIn('sem localização pelo CEP   1', out.getvalue())
+        schools = dict(Enrollment.objects.values_list('pk', 'school_unit'))
+        self.assertEqual(
+            [schools[first.pk], schools[second.pk], schools[third.pk], schools[unknown.pk]],
+            [self.se.pk, self.liberdade.pk, self.liberdade.pk, None],
+        )
+        self.assertEqual(EnrollmentAuditLog.objects.filter(action=EnrollmentAuditLog.UPDATE).count(), 3)
+        events = EnrollmentEvent.objects.filter(enrollment_id=first.pk, event_type=EnrollmentEvent.UPDATED)
+        self.assertEqual(events.get().data['school_unit'], self.se.pk)
+        self.assertEqual(assignment.assign_waiting_list()['atribuídas'], 0)
@@ -1,9 +1,19 @@
 # matricula/urls.py
 from django.urls import path
-from .views import EnrollmentCreateView, EnrollmentDetailView, EnrollmentDocumentsView
+from .views import (
+    EnrollmentCreateView, EnrollmentDetailView, MyEnrollmentsView, ResponsiblePortalView,
+    EnrollmentHistoryView, EnrollmentDocumentsView, EnrollmentArchiveDetailView, EnrollmentEventFeedView,
+    SchoolSuggestionView,
+)
 
 urlpatterns = [
     path('enrollment/', EnrollmentCreateView.as_view(), name='enrollment-create'),
+    path('enrollment/mine/', MyEnrollmentsView.as_view(), name='enrollment-mine'),
+    path('portal/', ResponsiblePortalView.as_view(), name='responsible-portal'),
     path('enrollment/<int:pk>/', EnrollmentDetailView.as_view(), name='enrollment-detail'),
+    path('enrollment/<int:pk>/history/', EnrollmentHistoryView.as_view(), name='enrollment-history'),
+    path('schools/suggest/', SchoolSuggestionView.as_view(), name='school-suggestions'),
+    path('events/', EnrollmentEventFeedView.as_view(), name='enrollment-events'),
     path('enrollment/documents/', EnrollmentDocumentsView.as_view(), name='enrollment-documents'),
+    path('enrollment/archived/<int:enrollment_id>/', EnrollmentArchiveDetailView.as_view(), name='enrollment-archived-detail'),
 ]
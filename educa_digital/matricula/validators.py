@@ -0,0 +1,31 @@
+# matricula/validators.py
+"""
+Validações puras (sem consultas ao banco) dos dados das matrículas.
+"""
+import re
+
+# Só dígitos ASCII: \d também aceita dígitos Unicode (ex.: arábico-índicos)
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def cpf_check_digits(base):
+    """
+    Dígitos verificadores de um CPF a partir dos 9 primeiros dígitos.
+    """
+    digits = [int(d) for d in base]
+    for weight in (10, 11):
+        total = sum(d * w for d, w in zip(digits, range(weight, 1, -1)))
+        digits.append(total * 10 % 11 % 10)
+    return '%d%d' % tuple(digits[9:])
+
+
+def normalize_cpf(value):
+    """
+    CPF no formato `000.000.000-00`, aceitando-o com ou sem pontuação.
+    Retorna None se não tiver 11 dígitos, se os dígitos forem todos iguais
+    ou se os verificadores não conferirem.
+    """
+    digits = _NON_DIGITS.sub('', value)
+    if len(digits) != 11 or len(set(digits)) == 1 or cpf_check_digits(digits[:9]) != digits[9:]:
+        return None
+    return '%s.%s.%s-%s' % (digits[:3], digits[3:6], digits[6:9], digits[9:])
@@ -1,15 +1,41 @@
 # matricula/views.py
+import logging
+import re
 import secrets
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
 
-from .models import Enrollment, EnrollmentDocuments
-from .serializers import EnrollmentSerializer, EnrollmentDocumentsSerializer, EnrollmentDocumentsUploadSerializer
+from educa_digital.accounts import profiles
+from educa_digital.accounts.permissions import IsStaffOrCanViewModel, IsTenantMember
+from educa_digital.core import tracing
+from educa_digital.core.schema import (
+    IN_FORM, IN_HEADER, IN_QUERY, TYPE_ARRAY, TYPE_INTEGER, TYPE_STRING, Parameter, auto_schema,
+)
+from educa_digital.core.idempotency import idempotent
+from educa_digital.core.tenancy import tenant_cache
+from .models import (
+    StudentProfile, ResponsibleProfile, Enrollment, EnrollmentDocuments, EnrollmentArchive,
+    EnrollmentAuditLog, EnrollmentEvent, DOCUMENT_FIELDS, portal_cache_key,
+)
+from .serializers import (
+    EnrollmentSerializer, EnrollmentReadSerializer, EnrollmentArchiveSerializer,
+    EnrollmentDocumentsSerializer, EnrollmentDocumentsUploadSerializer,
+    ResponsiblePortalSerializer, ResponsiblePortalReadSerializer, EnrollmentAuditLogSerializer,
+    EnrollmentEventFeedSerializer, SchoolSuggestionSerializer,
+)
+from . import assignment, audit, events
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import BooleanField, Case, Q, Value, When
 
+logger = logging.getLogger(__name__)
+
+# ID de matrícula em ?enrollment=: só dígitos ASCII (str.isdigit aceita "²",
+# que int() recusa) e dentro do BigAutoField.
+ENROLLMENT_ID = re.compile(r'[0-9]{1,18}')
 
 
 def generate_random_password():
@@ -18,84 +44,185 @@ def generate_random_password():
     """
     return secrets.token_urlsafe(8)
 
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def owned_by(user, enrollments):
+    """
+    Restringe o queryset de matrículas às que `user` pode consultar: todas
+    (da rede) para a equipe; para os demais, aquelas em que é o responsável
+    ou o aluno.
+    """
+    if user.is_staff:
+        return enrollments
+    return enrollments.filter(
+        Q(responsible__in=ResponsibleProfile.objects.filter(user=user).values('pk'))
+        | Q(student__in=StudentProfile.objects.filter(user=user).values('pk'))
+    )
+
+
+def archives_owned_by(user, archives):
+    """
+    Como owned_by, para as matrículas arquivadas: o responsável e o aluno são
+    reconhecidos pelo CPF guardado no arquivo.
+    """
+    if user.is_staff:
+        return archives
+    return archives.filter(
+        Q(responsible_cpf__in=ResponsibleProfile.objects.filter(user=user).values('cpf'))
+        | Q(student_cpf__in=StudentProfile.objects.filter(user=user).values('cpf'))
+    )
+
+
+def find_user_by_email(email):
+    """
+    Usuário com o e-mail informado, sem diferenciar maiúsculas/minúsculas
+    (`email__iexact` usa o índice UPPER(email) de auth_user).
+    """
+    return get_user_model().objects.filter(email__iexact=email).order_by('pk').first()
+
+
+def get_or_create_user(email):
+    """
+    Usuário (inativo) com o e-mail informado. Retorna (usuário, senha), com a
+    senha gerada apenas se o usuário foi criado agora.
+
+    Dois envios simultâneos com o mesmo e-mail (ex.: irmãos) podem tentar
+    criar o mesmo usuário: o INSERT perdedor viola o username único e relê o
+    usuário criado pelo outro.
+    """
+    user = find_user_by_email(email)
+    if user is not None:
+        return user, None
+    password = generate_random_password()
+    try:
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username=email,
+                email=email,
+                password=password,
+                is_active=False  # Cria inativo para forçar redefinição de senha
+            )
+    except IntegrityError:
+        return get_user_model().objects.get(username=email), None
+    return user, password
+
+
 def send_whatsapp_message(phone_number, message):
     """
     Função fictícia para envio de mensagem via WhatsApp.
     Aqui você integraria com o seu provedor (ex.: Twilio, Zenvia, etc.).
-    Por enquanto, apenas logamos a mensagem.
+    Por enquanto, apenas logamos o envio (sem o texto, que contém a senha).
     """
     # Exemplo de integração: use uma API externa para enviar a mensagem.
-    print(f"Enviando WhatsApp para {phone_number}: {message}")
+    with tracing.span('whatsapp.send', tamanho=len(message)):
+        logger.info('Enviando WhatsApp', extra={'telefone': phone_number, 'tamanho': len(message)})
+
+
+def send_whatsapp_on_commit(phone_number, message):
+    # Nada é enviado se a matrícula não for gravada
+    transaction.on_commit(lambda: send_whatsapp_message(phone_number, message))
 
 
 class EnrollmentCreateView(generics.CreateAPIView):
     """
     Endpoint para criar uma nova matrícula (enrollment).
     
-    Se o CPF do aluno já existir, os dados serão atualizados.
+    Se o CPF do aluno já existir, os dados serão atualizados; se o aluno já
+    tiver matrícula, ela é atualizada e a resposta é 200 em vez de 201. O
+    reenvio precisa vir do mesmo responsável (CPF); com outro, a resposta é 400.
+    Envios simultâneos com o mesmo responsável ou aluno (ex.: irmãos) são
+    processados um de cada vez, sem duplicar perfis ou usuários.
     
     Após criar a matrícula, o sistema:
-    - Cria um usuário para o perfil do responsável e do aluno (inativos inicialmente);
+    - Cria um usuário para o perfil do responsável e do aluno (inativos inicialmente),
+      com os respectivos UserProfile ('responsavel' e 'aluno');
     - Gera uma senha aleatória para cada um;
     - Envia mensagens via WhatsApp com as informações de acesso.
     
     Os usuários criados deverão redefinir a senha no primeiro acesso.
+
+    Aceita o cabeçalho `Idempotency-Key`: repetições da mesma requisição
+    (ex.: reenvio após queda de conexão) recebem a resposta original sem
+    criar a matrícula novamente.
     """
     queryset = Enrollment.objects.all()
     serializer_class = EnrollmentSerializer
 
-    @swagger_auto_schema(
+    @auto_schema(
         request_body=EnrollmentSerializer,
-        responses={201: EnrollmentSerializer()}
+        manual_parameters=[
+            Parameter('Idempotency-Key', IN_HEADER, type=TYPE_STRING, required=False,
+                      description="Chave única da requisição, para repetições seguras")
+        ],
+        responses={201: EnrollmentSerializer(), 200: EnrollmentSerializer()}
     )
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        enrollment = serializer.save()  # Cria a matrícula
+        with tracing.span('enrollment.validate'):
+            serializer.is_valid(raise_exception=True)
 
-        User = get_user_model()
+        # Matrícula, usuários e perfis são gravados juntos ou nenhum é; as
+        # mensagens com as senhas só saem depois do commit.
+        with transaction.atomic():
+            enrollment = serializer.save()  # Cria (ou atualiza) a matrícula
+            if serializer.created:
+                audit.record(enrollment, EnrollmentAuditLog.CREATE, actor=request.user)
+            with tracing.span('enrollment.users') as attributes:
+                attributes['criados'] = self.create_users(enrollment)
+
+        headers = self.get_success_headers(serializer.data)
+        status_code = status.HTTP_201_CREATED if serializer.created else status.HTTP_200_OK
+        return Response(serializer.data, status=status_code, headers=headers)
+
+    def create_users(self, enrollment):
+        """
+        Cria os usuários (inativos) do responsável e do aluno que ainda não
+        têm um, com os respectivos UserProfile, e agenda o envio das senhas.
+        Retorna quantos usuários foram criados.
+        """
+        new_users = []  # (usuário, tipo_usuario) para criar os perfis em lote
+        responsible = enrollment.responsible
+        student = enrollment.student
+        school_name = enrollment.school_unit.nome if enrollment.school_unit else "a escola"
 
         # --- Criação do usuário para o responsável ---
-        responsible_email = enrollment.responsible.email
-        responsible_phone = enrollment.responsible.telefone_whatsapp
-        if not User.objects.filter(email=responsible_email).exists():
-            random_password_resp = generate_random_password()
-            responsible_user = User.objects.create_user(
-                username=responsible_email,
-                email=responsible_email,
-                password=random_password_resp,
-                is_active=False  # Cria inativo para forçar redefinição de senha
-            )
-            school_name = enrollment.school_unit.nome if enrollment.school_unit else "a escola"
-            message_resp = (
-                f"Olá, {enrollment.responsible.nome}, seu cadastro foi concluído com sucesso, enviamos as informações para a administração da {school_name}. "
-                f"Acompanhe o processo no sistema www.educadigital.com.br. O seu acesso é, email: {responsible_email} senha: {random_password_resp}, "
-                "ao acessar o sistema, você será solicitado a redefinir sua senha. Qualquer dúvida, entre em contato com o suporte!"
-            )
-            send_whatsapp_message(responsible_phone, message_resp)
+        # Perfis já vinculados (ex.: segundo filho do mesmo responsável) não
+        # precisam de busca por e-mail.
+        if responsible.user_id is None:
+            responsible_email = normalize_email(responsible.email)
+            responsible_user, random_password_resp = get_or_create_user(responsible_email)
+            if random_password_resp is not None:
+                new_users.append((responsible_user, 'responsavel'))
+                message_resp = (
+                    f"Olá, {responsible.nome}, seu cadastro foi concluído com sucesso, enviamos as informações para a administração da {school_name}. "
+                    f"Acompanhe o processo no sistema www.educadigital.com.br. O seu acesso é, email: {responsible_email} senha: {random_password_resp}, "
+                    "ao acessar o sistema, você será solicitado a redefinir sua senha. Qualquer dúvida, entre em contato com o suporte!"
+                )
+                send_whatsapp_on_commit(responsible.telefone_whatsapp, message_resp)
+            responsible.user = responsible_user
+            responsible.save(update_fields=['user'])
 
         # --- Criação do usuário para o aluno ---
-        student_email = enrollment.student.email
-        student_phone = enrollment.student.telefone_whatsapp
-        if not User.objects.filter(email=student_email).exists():
-            random_password_student = generate_random_password()
-            student_user = User.objects.create_user(
-                username=student_email,
-                email=student_email,
-                password=random_password_student,
-                is_active=False
-            )
-            school_name = enrollment.school_unit.nome if enrollment.school_unit else "a escola"
-            message_student = (
-                f"Olá, {enrollment.student.nome}, seu cadastro foi concluído pelo seu responsável {enrollment.responsible.nome}. "
-                f"Enviamos as informações para a administração da {school_name}. Acompanhe o processo no sistema www.educadigital.com.br. "
-                f"O seu acesso é, email: {student_email} senha: {random_password_student}, ao acessar o sistema, você será solicitado a redefinir sua senha. "
-                "Qualquer dúvida, entre em contato com o suporte!"
-            )
-            send_whatsapp_message(student_phone, message_student)
+        if student.user_id is None:
+            student_email = normalize_email(student.email)
+            student_user, random_password_student = get_or_create_user(student_email)
+            if random_password_student is not None:
+                new_users.append((student_user, 'aluno'))
+                message_student = (
+                    f"Olá, {student.nome}, seu cadastro foi concluído pelo seu responsável {responsible.nome}. "
+                    f"Enviamos as informações para a administração da {school_name}. Acompanhe o processo no sistema www.educadigital.com.br. "
+                    f"O seu acesso é, email: {student_email} senha: {random_password_student}, ao acessar o sistema, você será solicitado a redefinir sua senha. "
+                    "Qualquer dúvida, entre em contato com o suporte!"
+                )
+                send_whatsapp_on_commit(student.telefone_whatsapp, message_student)
+            student.user = student_user
+            student.save(update_fields=['user'])
 
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        profiles.provision(new_users)
+        return len(new_users)
 
 
 
@@ -104,32 +231,220 @@ class EnrollmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     Endpoint para recuperar, atualizar ou deletar uma matrícula.
     Identifica a matrícula pelo ID.
     """
-    queryset = Enrollment.objects.all()
+    queryset = Enrollment.objects.select_related('student', 'responsible', 'address', 'school_unit')
     serializer_class = EnrollmentSerializer
 
-    @swagger_auto_schema(
+    @auto_schema(
         responses={200: EnrollmentSerializer()}
     )
     def get(self, request, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
+        # Leitura pelo serializer compilado (mesma saída do EnrollmentSerializer)
+        enrollment = self.get_object()
+        serializer = EnrollmentReadSerializer(context=self.get_serializer_context())
+        return Response(serializer.to_representation(enrollment))
 
-    @swagger_auto_schema(
+    @auto_schema(
         request_body=EnrollmentSerializer,
         responses={200: EnrollmentSerializer()}
     )
     def put(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
 
-    @swagger_auto_schema(
+    @auto_schema(
         responses={204: 'No Content'}
     )
     def delete(self, request, *args, **kwargs):
         return self.destroy(request, *args, **kwargs)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            audit.record(instance, EnrollmentAuditLog.DELETE, actor=self.request.user)
+            events.publish(instance, EnrollmentAuditLog.DELETE)
+            instance.delete()
+
+
+class EnrollmentHistoryView(generics.ListAPIView):
+    """
+    Endpoint com o histórico de alterações de uma matrícula, do mais antigo
+    ao mais recente: ação, usuário, data e campos alterados ([antes, depois]).
+
+    Continua disponível após a exclusão ou o arquivamento da matrícula. A
+    equipe (is_staff) consulta qualquer matrícula da rede; os demais usuários,
+    só as matrículas (ativas ou arquivadas) em que são o responsável ou o
+    aluno. As demais retornam 404.
+    """
+    serializer_class = EnrollmentAuditLogSerializer
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return EnrollmentAuditLog.objects.none()
+        pk, user = self.kwargs['pk'], self.request.user
+        if not user.is_staff and not (
+            owned_by(user, Enrollment.objects.filter(pk=pk)).exists()
+            or archives_owned_by(user, EnrollmentArchive.objects.filter(enrollment_id=pk)).exists()
+        ):
+            raise NotFound()
+        # Varredura do índice (enrollment_id, created_at)
+        return EnrollmentAuditLog.objects.filter(enrollment_id=pk).order_by('created_at', 'pk')
+
+
+class EnrollmentEventFeedView(generics.GenericAPIView):
+    """
+    Feed das alterações das matrículas da rede (criação, alteração, exclusão
+    e mudança de situação), para sistemas que consultam em vez de receber
+    webhooks.
+
+    Retorna os eventos posteriores ao cursor `since` (0 na primeira consulta),
+    em ordem, e o `cursor` a enviar na próxima. Com `has_more`, há mais
+    eventos disponíveis imediatamente.
+
+    Restrito à equipe e aos usuários com a permissão
+    `matricula.view_enrollmentevent` (integrações).
+    """
+    serializer_class = EnrollmentEventFeedSerializer
+    permission_classes = [IsStaffOrCanViewModel]
+    max_limit = 500
+
+    def get_queryset(self):
+        return EnrollmentEvent.objects.all()
+
+    def get_int_param(self, name, default):
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = -1
+        if value < 0:
+            raise ValidationError({name: 'Informe um inteiro não negativo.'})
+        return value
+
+    @auto_schema(
+        manual_parameters=[
+            Parameter('since', IN_QUERY, type=TYPE_INTEGER, required=False,
+                      description="Cursor retornado pela consulta anterior (padrão: 0)"),
+            Parameter('limit', IN_QUERY, type=TYPE_INTEGER, required=False,
+                      description="Máximo de eventos (padrão e máximo: 500)"),
+        ],
+        responses={200: EnrollmentEventFeedSerializer()}
+    )
+    def get(self, request, *args, **kwargs):
+        since = self.get_int_param('since', 0)
+        limit = min(self.get_int_param('limit', self.max_limit), self.max_limit)
+        events.sequence(request.tenant.pk)
+        # Um a mais para saber se há outra página, sem COUNT
+        page = list(self.get_queryset().after(since)[:limit + 1])
+        page, has_more = page[:limit], len(page) > limit
+        serializer = self.get_serializer({
+            'events': page, 'cursor': page[-1].position if page else since, 'has_more': has_more,
+        })
+        return Response(serializer.data)
+
+
+class SchoolSuggestionView(generics.GenericAPIView):
+    """
+    Endpoint que sugere as escolas ativas com vaga mais próximas de um
+    endereço, pelo CEP, da mais próxima à mais distante (distância em linha
+    reta entre os centroides dos CEPs).
+
+    A busca usa o índice das escolas da rede em memória; as vagas livres
+    podem estar defasadas em até SCHOOL_INDEX_TTL segundos.
+    """
+    serializer_class = SchoolSuggestionSerializer
+    max_results = 20
+
+    @auto_schema(
+        manual_parameters=[
+            Parameter('cep', IN_QUERY, type=TYPE_STRING, required=True,
+                      description="CEP do endereço do aluno"),
+            Parameter('k', IN_QUERY, type=TYPE_INTEGER, required=False,
+                      description="Quantidade de escolas (padrão: 5, máximo: 20)"),
+        ],
+        responses={200: SchoolSuggestionSerializer(many=True), 404: 'CEP não encontrado'}
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            k = int(request.query_params.get('k', 5))
+        except ValueError:
+            k = 0
+        if not 0 < k <= self.max_results:
+            raise ValidationError({'k': 'Informe um inteiro de 1 a %d.' % self.max_results})
+        suggestions = assignment.suggest(request.query_params.get('cep', ''), k)
+        if suggestions is None:
+            raise NotFound('CEP não encontrado na base de geolocalização.')
+        return Response(self.get_serializer(suggestions, many=True).data)
+
+
+class MyEnrollmentsView(generics.ListAPIView):
+    """
+    Endpoint com as matrículas do usuário autenticado: as dos alunos pelos
+    quais ele é responsável e a dele próprio, se for aluno.
 
-class EnrollmentDocumentsView(generics.CreateAPIView):
+    Usa os vínculos do usuário com os perfis (sem busca por e-mail) e
+    responde com uma única consulta.
     """
-    Endpoint para enviar os documentos da matrícula.
+    serializer_class = EnrollmentSerializer
+    permission_classes = [IsTenantMember]
+
+    def get_queryset(self):
+        # Subconsultas pelos índices de user_id nos perfis, combinadas com OR
+        # nos índices de responsible_id/student_id da matrícula.
+        user = self.request.user
+        return Enrollment.objects.filter(
+            Q(responsible__in=ResponsibleProfile.objects.filter(user=user).values('pk'))
+            | Q(student__in=StudentProfile.objects.filter(user=user).values('pk'))
+        ).order_by('pk')
+
+    @auto_schema(
+        responses={200: EnrollmentSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        serializer = EnrollmentReadSerializer(context=self.get_serializer_context())
+        return Response(serializer.serialize_queryset(self.get_queryset()))
+
+
+class ResponsiblePortalView(generics.GenericAPIView):
+    """
+    Endpoint do portal do responsável: todas as matrículas dos alunos pelos
+    quais o usuário autenticado é responsável, com aluno, escola, situação e
+    quais documentos já foram enviados.
+
+    A lista sai de uma única consulta e fica em cache por responsável
+    (settings.PORTAL_CACHE_TIMEOUT); alterações nas matrículas ou nos
+    documentos descartam o cache.
+    """
+    serializer_class = ResponsiblePortalSerializer
+    permission_classes = [IsTenantMember]
+
+    def get_queryset(self):
+        flags = {
+            'has_%s' % field: Case(
+                When(**{'enrollmentdocuments__%s__gt' % field: ''}, then=Value(True)),
+                default=Value(False), output_field=BooleanField(),
+            )
+            for field in DOCUMENT_FIELDS
+        }
+        return (
+            Enrollment.objects.filter(responsible__user=self.request.user)
+            .annotate(**flags)
+            .order_by('student__nome', 'pk')
+        )
+
+    @auto_schema(
+        responses={200: ResponsiblePortalSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        cache = tenant_cache(request.tenant.pk)
+        key = portal_cache_key(request.user.pk)
+        data = cache.get(key)
+        if data is None:
+            data = ResponsiblePortalReadSerializer().serialize_queryset(self.get_queryset())
+            cache.set(key, data, settings.PORTAL_CACHE_TIMEOUT)
+        return Response(data)
+
+
+class EnrollmentDocumentsView(generics.ListCreateAPIView):
+    """
+    Endpoint para enviar (POST) ou consultar (GET) os documentos da matrícula.
     
     Os arquivos enviados serão encaminhados para o S3 (configurado via django-storages e boto3).
     
@@ -138,17 +453,63 @@ class EnrollmentDocumentsView(generics.CreateAPIView):
     - AWS_SECRET_ACCESS_KEY
     - AWS_STORAGE_BUCKET_NAME
     - AWS_S3_REGION_NAME
+
+    No GET, informe as matrículas da página (`?enrollment=1&enrollment=2`,
+    até 100): as URLs de download são assinadas em lote e reaproveitadas do
+    cache até pouco antes de expirarem. A equipe (is_staff) consulta qualquer
+    matrícula da rede; os demais usuários, só as matrículas em que são o
+    responsável ou o aluno (as outras são ignoradas).
     """
     queryset = EnrollmentDocuments.objects.all()
     serializer_class = EnrollmentDocumentsSerializer
     parser_classes = (MultiPartParser, FormParser)
+    max_enrollments = 100
 
-    @swagger_auto_schema(
+    def get_queryset(self):
+        if self.request.method != 'GET':
+            return super().get_queryset()
+        ids = [value for value in self.request.query_params.getlist('enrollment') if ENROLLMENT_ID.fullmatch(value)]
+        # Só matrículas da rede ativa (o manager de Enrollment aplica o filtro)
+        enrollments = owned_by(self.request.user, Enrollment.objects.filter(pk__in=ids[:self.max_enrollments]))
+        enrollments = enrollments.values('pk')
+        return EnrollmentDocuments.objects.filter(enrollment__in=enrollments).order_by('enrollment_id')
+
+    @auto_schema(
+        manual_parameters=[
+            Parameter('enrollment', IN_QUERY, description="IDs das matrículas (repetível, até 100)",
+                      type=TYPE_ARRAY, items={'type': TYPE_INTEGER},
+                      collection_format='multi')
+        ],
+        responses={200: EnrollmentDocumentsSerializer(many=True)}
+    )
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    @auto_schema(
         manual_parameters=[
-            openapi.Parameter('enrollment', openapi.IN_FORM, description="ID da matrícula", type=openapi.TYPE_INTEGER)
+            Parameter('enrollment', IN_FORM, description="ID da matrícula", type=TYPE_INTEGER)
         ],
         request_body=EnrollmentDocumentsUploadSerializer,
         responses={201: EnrollmentDocumentsSerializer()}
     )
     def post(self, request, *args, **kwargs):
         return self.create(request, *args, **kwargs)
+
+
+class EnrollmentArchiveDetailView(generics.RetrieveAPIView):
+    """
+    Endpoint para consultar uma matrícula de ano letivo encerrado.
+
+    Matrículas arquivadas (comando `archive_enrollments`) saem da tabela ativa
+    e são buscadas aqui sob demanda, pelo mesmo ID que tinham antes. A equipe
+    (is_staff) consulta qualquer matrícula arquivada da rede; os demais
+    usuários, só aquelas em que são o responsável ou o aluno.
+    """
+    queryset = EnrollmentArchive.objects.all()
+    serializer_class = EnrollmentArchiveSerializer
+    lookup_field = 'enrollment_id'
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return EnrollmentArchive.objects.none()
+        return archives_owned_by(self.request.user, super().get_queryset())
@@ -0,0 +1,161 @@
+# matricula/webhooks.py
+"""
+Entrega dos eventos de matrícula (EnrollmentEvent) aos WebhookSubscription.
+
+Cada assinatura tem o próprio cursor. Uma entrega envia em um único POST os
+eventos seguintes ao cursor (até WEBHOOK_BATCH_SIZE), e o cursor só avança
+com resposta 2xx. Após uma falha, o mesmo lote é reenviado com espera
+exponencial (WEBHOOK_RETRY_BASE, dobrando até WEBHOOK_RETRY_MAX); os eventos
+seguintes aguardam, mantendo a ordem.
+
+Corpo: {"events": [...], "cursor": <posição do último evento>}, no mesmo
+formato do feed /matricula/events/. Cabeçalhos:
+
+    X-Educa-Timestamp: <segundos desde a época>
+    X-Educa-Signature: sha256=<HMAC-SHA256(secret, "<timestamp>.<corpo>")>
+
+O receptor confere a assinatura com o `secret` da assinatura e recusa
+timestamps antigos. Como a entrega é "pelo menos uma vez", deve ignorar
+eventos com id já processado.
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from educa_digital.core import tracing
+from . import events
+from .models import EnrollmentEvent, WebhookSubscription
+from .serializers import EnrollmentEventSerializer
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Educa-Signature'
+TIMESTAMP_HEADER = 'X-Educa-Timestamp'
+
+
+def sign(secret, timestamp, body):
+    message = b'%d.%s' % (timestamp, body)
+    return 'sha256=' + hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def pending_events(subscription, limit):
+    events.sequence(subscription.tenant_id)
+    pending = EnrollmentEvent.objects.filter(tenant_id=subscription.tenant_id).after(subscription.cursor)
+    if subscription.event_types:
+        pending = pending.filter(event_type__in=subscription.event_types)
+    return list(pending[:limit])
+
+
+def post(url, body, headers):
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    # Respostas 4xx/5xx levantam HTTPError
+    with urllib.request.urlopen(request, timeout=settings.WEBHOOK_TIMEOUT) as response:
+        return response.status
+
+
+def claim(pk):
+    """
+    Reserva a assinatura `pk`, se estiver em dia, para uma entrega: numa
+    transação curta, adia `next_attempt_at` pelo prazo da entrega, para que
+    outros dispatchers a pulem enquanto o POST roda fora de transação. Se o
+    dispatcher morrer, a assinatura volta a ficar em dia ao fim do prazo.
+    Retorna a assinatura ou None.
+    """
+    with transaction.atomic():
+        subscription = due_subscriptions().select_for_update(skip_locked=True).filter(pk=pk).first()
+        if subscription is not None:
+            # Folga sobre WEBHOOK_TIMEOUT, que vale para cada operação do socket
+            lease = timezone.now() + timedelta(seconds=settings.WEBHOOK_TIMEOUT * 3)
+            WebhookSubscription.objects.filter(pk=pk).update(next_attempt_at=lease)
+    return subscription
+
+
+def _finish(subscription, claimed_cursor, **fields):
+    for name, value in fields.items():
+        setattr(subscription, name, value)
+    # Se o prazo da reserva expirou e outro dispatcher já avançou o cursor,
+    # prevalece o dele.
+    WebhookSubscription.objects.filter(pk=subscription.pk, cursor=claimed_cursor).update(**fields)
+
+
+def deliver(subscription, batch_size):
+    """
+    Envia o próximo lote de eventos à assinatura (já reservada por claim),
+    fora de transação, e então avança o cursor ou agenda a nova tentativa.
+    Retorna quantos eventos foram entregues.
+    """
+    claimed_cursor = subscription.cursor
+    batch = pending_events(subscription, batch_size)
+    if not batch:
+        _finish(subscription, claimed_cursor, next_attempt_at=None)
+        return 0
+    body = json.dumps({
+        'events': EnrollmentEventSerializer(batch, many=True).data,
+        'cursor': batch[-1].position,
+    }, cls=DjangoJSONEncoder).encode()
+    timestamp = int(time.time())
+    headers = {
+        'Content-Type': 'application/json',
+        TIMESTAMP_HEADER: str(timestamp),
+        SIGNATURE_HEADER: sign(subscription.secret, timestamp, body),
+    }
+
+    try:
+        with tracing.span('webhook.deliver', subscription=subscription.pk, eventos=len(batch)):
+            post(subscription.url, body, headers)
+    except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError) as exc:
+        failures = subscription.failures + 1
+        delay = min(settings.WEBHOOK_RETRY_BASE * 2 ** (failures - 1), settings.WEBHOOK_RETRY_MAX)
+        _finish(
+            subscription, claimed_cursor, failures=failures,
+            next_attempt_at=timezone.now() + timedelta(seconds=delay), last_error=str(exc)[:1000],
+        )
+        logger.warning('Falha na entrega do webhook %s', subscription.nome, extra={
+            'subscription': subscription.pk, 'failures': failures, 'retry_in': delay,
+        })
+        return 0
+
+    _finish(subscription, claimed_cursor, cursor=batch[-1].position, failures=0, next_attempt_at=None, last_error='')
+    return len(batch)
+
+
+def due_subscriptions():
+    return WebhookSubscription.objects.filter(ativo=True).filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=timezone.now()),
+    )
+
+
+def dispatch(batch_size=None):
+    """
+    Entrega os eventos pendentes de todas as assinaturas em dia, lote a lote.
+    Cada lote é reservado (claim) antes do envio: vários dispatchers podem
+    rodar juntos sem enviar o mesmo lote duas vezes, e nenhuma trava fica
+    presa durante o POST. Retorna {assinatura: eventos entregues}.
+    """
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    report = {}
+    for pk, nome in list(due_subscriptions().values_list('pk', 'nome')):
+        delivered = 0
+        while True:
+            subscription = claim(pk)
+            if subscription is None:
+                break
+            count = deliver(subscription, batch_size)
+            delivered += count
+            # Lote incompleto: acabaram os eventos ou a entrega falhou
+            if count < batch_size:
+                break
+        report['%s (#%d)' % (nome, pk)] = delivered
+    return report
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,14 +23,19 @@ INSTALLED_APPS = [
     'educa_digital.matricula',
     'educa_digital.escolas',
     'educa_digital.accounts',
-    
+    'educa_digital.core',
 ]
 
 MIDDLEWARE = [
+    'educa_digital.core.middleware.RequestIdMiddleware',
+    'educa_digital.core.middleware.LoadSheddingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'educa_digital.core.middleware.TenantMiddleware',
+    'educa_digital.core.middleware.ReplicaPinMiddleware',
+    'educa_digital.matricula.middleware.AuditBufferMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,17 +62,56 @@ TEMPLATES = [
 WSGI_APPLICATION = 'educa_digital.wsgi.application'
 
 # Banco de dados PostgreSQL
+# - DB_CONN_MAX_AGE: segundos que a conexão é mantida entre requisições (0 = fecha a cada requisição)
+# - DB_CONN_HEALTH_CHECKS: testa a conexão reaproveitada antes do primeiro uso na requisição
+# - DB_POOL*: pool de conexões por worker (use com DB_CONN_MAX_AGE=0)
+# - DB_PGBOUNCER: pgbouncer em modo transaction (desativa cursores no servidor; não use com DB_POOL)
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': config('DB_ENGINE', default='educa_digital.core.db.postgresql'),
         'HOST': config('DB_HOST'),
         'PORT': config('DB_PORT'),
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'POOL': {
+            'ENABLED': config('DB_POOL', default=False, cast=bool),
+            'MIN_SIZE': config('DB_POOL_MIN_SIZE', default=1, cast=int),
+            'MAX_SIZE': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+            'TIMEOUT': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        },
     }
 }
 
+# Réplicas de leitura (DB_REPLICA_HOSTS=host1,host2:5433). Leituras de
+# REPLICA_APPS vão para as réplicas; após uma escrita o cliente fica no
+# primário por REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    replica_host, _, replica_port = replica_host.partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# O banco que faz o papel de réplica nos testes fica em settings_test.py.
+
+DATABASE_ROUTERS = ['educa_digital.core.routers.PrimaryReplicaRouter']
+REPLICA_APPS = ['matricula', 'escolas', 'accounts']
+REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# O login da API (users/login.py) reconhece usuários inativos com um único hash
+AUTHENTICATION_BACKENDS = ['educa_digital.users.backends.LoginModelBackend']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -92,15 +136,102 @@ USE_TZ = True
 STATIC_URL = '/static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache compartilhado entre workers (ex.: memcached); em memória por padrão
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Redes de ensino (core/tenancy.py): a padrão atende requisições sem rede
+# identificada; cada rede tem um cache próprio com este limite de entradas
+DEFAULT_TENANT = config('DEFAULT_TENANT', default='padrao')
+TENANT_CACHE_TIMEOUT = config('TENANT_CACHE_TIMEOUT', default=300, cast=int)
+TENANT_CACHE_MAX_ENTRIES = config('TENANT_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
 # Configurações do DRF e JWT
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Autenticado e da rede da requisição (ou da equipe)
     'DEFAULT_PERMISSION_CLASSES': (
-        'rest_framework.permissions.IsAuthenticated',
+        'educa_digital.accounts.permissions.IsTenantMember',
+    ),
+    # orjson quando disponível; cai para o módulo json padrão caso contrário
+    'DEFAULT_RENDERER_CLASSES': (
+        'educa_digital.core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'educa_digital.core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
+    # Token bucket (educa_digital.core.throttling): rajada de até N tentativas,
+    # reabastecida em N fichas por período
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': config('THROTTLE_LOGIN_IP', default='20/min'),
+        'login_username': config('THROTTLE_LOGIN_USERNAME', default='5/min'),
+        'register_ip': config('THROTTLE_REGISTER_IP', default='10/hour'),
+    },
+    # Proxies confiáveis na frente da aplicação (ex.: 1 atrás do nginx/ALB): o IP
+    # do cliente vem do X-Forwarded-For; com 0, do REMOTE_ADDR
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
+}
+
+# Bloqueio de login após falhas seguidas no mesmo username
+LOGIN_LOCKOUT_THRESHOLD = config('LOGIN_LOCKOUT_THRESHOLD', default=10, cast=int)
+LOGIN_LOCKOUT_WINDOW = config('LOGIN_LOCKOUT_WINDOW', default=900, cast=int)
+LOGIN_LOCKOUT_SECONDS = config('LOGIN_LOCKOUT_SECONDS', default=300, cast=int)
+
+# Máximo de requisições simultâneas por rota em cada worker (acima disso: 503)
+LOAD_SHEDDING_LIMITS = {
+    '/users/login/': config('LOAD_SHEDDING_LOGIN', default=4, cast=int),
+    '/users/register/': config('LOAD_SHEDDING_REGISTER', default=2, cast=int),
 }
+LOAD_SHEDDING_RETRY_AFTER = config('LOAD_SHEDDING_RETRY_AFTER', default=2, cast=int)
+
+# Tempo (s) que o perfil do usuário fica em cache (descartado a cada alteração)
+PROFILE_CACHE_TIMEOUT = config('PROFILE_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Tempo (s) que o portal do responsável fica em cache (descartado quando as matrículas mudam)
+PORTAL_CACHE_TIMEOUT = config('PORTAL_CACHE_TIMEOUT', default=300, cast=int)
+
+# Tempo (s) que o Swagger/ReDoc gerado fica em cache
+SCHEMA_CACHE_TIMEOUT = config('SCHEMA_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Schema OpenAPI pré-gerado (manage.py generate_schema); servido no lugar da
+# geração a cada requisição quando existir
+SCHEMA_ARTIFACT_DIR = Path(config('SCHEMA_ARTIFACT_DIR', default=str(BASE_DIR / 'schema')))
+
+# Tempo que uma resposta fica registrada para repetições com o mesmo Idempotency-Key
+IDEMPOTENCY_KEY_TTL = timedelta(hours=config('IDEMPOTENCY_KEY_TTL_HOURS', default=24, cast=int))
+# Prazo da requisição original: se ela morrer sem responder (worker reiniciado),
+# uma repetição com a mesma chave e o mesmo corpo é executada após este tempo.
+# Deve ser maior que o timeout das requisições no servidor (ex.: gunicorn)
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(seconds=config('IDEMPOTENCY_LOCK_SECONDS', default=60, cast=int))
+
+# Limpeza periódica (manage.py purge_stale_data): contas nunca ativadas são
+# removidas após PURGE_INACTIVE_USER_TTL; arquivos sem documento, após a carência
+PURGE_INACTIVE_USER_TTL = timedelta(days=config('PURGE_INACTIVE_USER_TTL_DAYS', default=30, cast=int))
+PURGE_BLOB_GRACE = timedelta(hours=config('PURGE_BLOB_GRACE_HOURS', default=24, cast=int))
+PURGE_BATCH_SIZE = config('PURGE_BATCH_SIZE', default=500, cast=int)
+
+# Eventos das matrículas (matricula/events.py): a limpeza os remove após EVENT_RETENTION
+EVENT_RETENTION = timedelta(days=config('EVENT_RETENTION_DAYS', default=30, cast=int))
+
+# Sugestão de escolas por proximidade (matricula/assignment.py): o índice das
+# escolas e vagas de cada rede fica na memória e é reconstruído após este tempo (s)
+SCHOOL_INDEX_TTL = config('SCHOOL_INDEX_TTL', default=60, cast=int)
+
+# Entrega dos webhooks (manage.py dispatch_webhooks): eventos por POST, tempo
+# limite (s) e espera (s) antes de tentar de novo, dobrando a cada falha até o máximo
+WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=100, cast=int)
+WEBHOOK_TIMEOUT = config('WEBHOOK_TIMEOUT', default=10, cast=int)
+WEBHOOK_RETRY_BASE = config('WEBHOOK_RETRY_BASE', default=30, cast=int)
+WEBHOOK_RETRY_MAX = config('WEBHOOK_RETRY_MAX', default=3600, cast=int)
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -109,9 +240,74 @@ SIMPLE_JWT = {
 }
 
 
-AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID')
-AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY')
-AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME')
+# Onde ficam os documentos: 's3' (produção), 'local' (disco, em
+# DOCUMENT_STORAGE_ROOT) ou 'memory' (testes e benchmarks). Fora do S3 as
+# credenciais da AWS não são exigidas; ver core/storage_backends.py.
+DOCUMENT_STORAGE_BACKENDS = {
+    's3': 'storages.backends.s3boto3.S3Boto3Storage',
+    'local': 'educa_digital.core.storage_backends.ShardedFileSystemStorage',
+    'memory': 'educa_digital.core.storage_backends.InMemoryStorage',
+}
+DOCUMENT_STORAGE = config('DOCUMENT_STORAGE', default='s3')
+DEFAULT_FILE_STORAGE = DOCUMENT_STORAGE_BACKENDS[DOCUMENT_STORAGE]
+DOCUMENT_STORAGE_ROOT = Path(config('DOCUMENT_STORAGE_ROOT', default=str(BASE_DIR / 'media')))
+
+_aws_required = {} if DOCUMENT_STORAGE == 's3' else {'default': ''}
+AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', **_aws_required)
+AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', **_aws_required)
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', **_aws_required)
 AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
-AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
-DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+
+# URLs de download. AWS_S3_CUSTOM_DOMAIN pode apontar para uma CDN (CloudFront);
+# vazio, o S3 gera URLs pré-assinadas. Com AWS_CLOUDFRONT_KEY_ID/AWS_CLOUDFRONT_KEY
+# (PEM) as URLs da CDN também são assinadas.
+AWS_S3_CUSTOM_DOMAIN = config('AWS_S3_CUSTOM_DOMAIN', default=f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com' if AWS_STORAGE_BUCKET_NAME else '') or None
+AWS_CLOUDFRONT_KEY_ID = config('AWS_CLOUDFRONT_KEY_ID', default=None)
+AWS_CLOUDFRONT_KEY = config('AWS_CLOUDFRONT_KEY', default='').replace('\\n', '\n') or None
+AWS_QUERYSTRING_EXPIRE = config('AWS_QUERYSTRING_EXPIRE', default=3600, cast=int)
+# As URLs assinadas ficam em cache até esta margem (s) antes de expirarem
+SIGNED_URL_REFRESH_MARGIN = config('SIGNED_URL_REFRESH_MARGIN', default=300, cast=int)
+
+# Calculam o sha256 dos uploads durante o recebimento (deduplicação dos documentos)
+FILE_UPLOAD_HANDLERS = [
+    'educa_digital.core.uploadhandlers.HashingMemoryFileUploadHandler',
+    'educa_digital.core.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Logs em JSON (uma linha por evento, com o ID da requisição), gravados por
+# uma thread própria; ver core/log.py. Com TRACE_EXPORT_FILE, os spans das
+# etapas das requisições (core/tracing.py) são exportados nesse arquivo.
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+TRACE_EXPORT_FILE = config('TRACE_EXPORT_FILE', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'educa_digital.core.log.RequestIdFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'educa_digital.core.log.JSONFormatter'},
+        'span': {'()': 'educa_digital.core.tracing.SpanFormatter'},
+    },
+    'handlers': {
+        'console': {
+            '()': 'educa_digital.core.log.AsyncHandler',
+            'formatter': 'json',
+            'filters': ['request_id'],
+        },
+    },
+    'root': {'handlers': ['console'], 'level': LOG_LEVEL},
+    'loggers': {
+        # Sem os handlers padrão do Django: propaga para o root, em JSON
+        'django': {'handlers': [], 'level': LOG_LEVEL},
+        'educa_digital.trace': {'handlers': [], 'level': 'WARNING', 'propagate': False},
+    },
+}
+if TRACE_EXPORT_FILE:
+    LOGGING['handlers']['trace'] = {
+        '()': 'educa_digital.core.log.AsyncHandler',
+        'filename': TRACE_EXPORT_FILE,
+        'formatter': 'span',
+    }
+    LOGGING['loggers']['educa_digital.trace'].update(handlers=['trace'], level='DEBUG')
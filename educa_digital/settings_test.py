@@ -0,0 +1,18 @@
+"""
+Configurações dos testes:
+
+    python manage.py test --settings=educa_digital.settings_test
+
+(com pytest-django ou outro runner, DJANGO_SETTINGS_MODULE=educa_digital.settings_test).
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# Um segundo banco faz o papel de réplica. Não é espelho do primário: os
+# testes do roteador (core/tests.py) veem em qual conexão cada leitura caiu.
+DATABASES['replica_test'] = {
+    **DATABASES['default'],
+    'TEST': {} if 'sqlite' in DATABASES['default']['ENGINE'] else {
+        'NAME': 'test_%s_replica' % DATABASES['default']['NAME'],
+    },
+}
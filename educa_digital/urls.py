@@ -1,22 +1,8 @@
 from django.contrib import admin
-from django.urls import path, include
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from django.urls import path, include, re_path
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Back Sistema Escolar API",
-        default_version='v1',
-        description="Documentação da API para o projeto Back Sistema Escolar Digital",
-        terms_of_service="www.prodosdigital.com.br",
-        contact=openapi.Contact(email="agencia.prodosdigital@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from educa_digital.core.schema import lazy_schema_ui, schema_file_view
+from educa_digital.core.views import MetricsView, signed_file_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -27,8 +13,16 @@ urlpatterns = [
     # Endpoints para autenticação JWT
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+
+    # Contadores do worker para monitoramento (somente staff)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
+    # Download dos documentos nos backends local/memória (URLs assinadas)
+    path('files/<path:name>', signed_file_view, name='signed-file'),
     
     # Endpoints para a documentação Swagger
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    # (servidos do schema pré-gerado por generate_schema; ver core/schema.py)
+    re_path(r'^swagger\.(?P<format>json|yaml)$', schema_file_view, name='schema-json'),
+    path('swagger/', lazy_schema_ui('swagger'), name='schema-swagger-ui'),
+    path('redoc/', lazy_schema_ui('redoc'), name='schema-redoc'),
 ]
@@ -0,0 +1,30 @@
+# users/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class LoginModelBackend(ModelBackend):
+    """
+    ModelBackend que, com `allow_inactive=True` (só o login da API, ver
+    login.py), também devolve usuários inativos com a senha correta. Assim o
+    login diferencia "inativo" de "senha errada" com um único hash, sem
+    consultar de novo o usuário. Usuário inexistente continua pagando o hash
+    fictício do ModelBackend. Sessões e demais chamadas a authenticate()
+    seguem recusando usuários inativos.
+    """
+
+    def authenticate(self, request, username=None, password=None, allow_inactive=False, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Mesmo custo de uma senha errada (ver ModelBackend.authenticate)
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and (allow_inactive or self.user_can_authenticate(user)):
+            return user
+        return None
@@ -0,0 +1,85 @@
+# users/login.py
+"""
+Verificação de credenciais do CustomLoginView.
+
+- As credenciais passam por `authenticate()` (AUTHENTICATION_BACKENDS,
+  sinal user_login_failed); o ModelBackend já iguala o custo de usuário
+  inexistente ao de senha errada.
+- Usuário inativo só é revelado para quem acertou a senha. O mesmo
+  authenticate() o devolve (LoginModelBackend, allow_inactive): senha
+  errada custa um hash, com conta ativa, inativa ou inexistente.
+- Após settings.LOGIN_LOCKOUT_THRESHOLD falhas dentro de
+  LOGIN_LOCKOUT_WINDOW segundos, o username fica bloqueado por
+  LOGIN_LOCKOUT_SECONDS; enquanto bloqueado, as tentativas são recusadas
+  pelo cache, sem consultar o banco nem calcular hash.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+
+from educa_digital.core import metrics
+
+OK, INVALID, INACTIVE, LOCKED = 'ok', 'invalid', 'inactive', 'locked'
+
+
+def _cache_key(prefix, username):
+    digest = hashlib.sha256(username.strip().lower().encode()).hexdigest()[:32]
+    return 'login-%s:%s' % (prefix, digest)
+
+
+def locked_for(username):
+    """
+    Segundos restantes de bloqueio do username (0 se não estiver bloqueado).
+    """
+    locked_until = cache.get(_cache_key('locked', username))
+    if locked_until is None:
+        return 0
+    return max(int(locked_until - time.time()), 1)
+
+
+def register_failure(username):
+    key = _cache_key('failures', username)
+    cache.add(key, 0, settings.LOGIN_LOCKOUT_WINDOW)
+    try:
+        failures = cache.incr(key)
+    except ValueError:
+        # A chave expirou entre o add e o incr.
+        cache.set(key, 1, settings.LOGIN_LOCKOUT_WINDOW)
+        failures = 1
+
+    if failures >= settings.LOGIN_LOCKOUT_THRESHOLD:
+        cache.set(
+            _cache_key('locked', username), time.time() + settings.LOGIN_LOCKOUT_SECONDS,
+            settings.LOGIN_LOCKOUT_SECONDS,
+        )
+        cache.delete(key)
+        metrics.incr('login.lockouts')
+
+
+def clear_failures(username):
+    cache.delete(_cache_key('failures', username))
+
+
+def check_credentials(request, username, password):
+    """
+    Retorna (resultado, usuário ou segundos de bloqueio).
+
+    A ordem importa: bloqueio (sem custo) -> authenticate() -> is_active. O
+    status do usuário só é revelado para quem acertou a senha.
+    """
+    retry_after = locked_for(username)
+    if retry_after:
+        metrics.incr('login.rejected_locked')
+        return LOCKED, retry_after
+
+    user = authenticate(request, username=username, password=password, allow_inactive=True)
+    if user is not None:
+        clear_failures(username)
+        return (OK if user.is_active else INACTIVE), user
+
+    register_failure(username)
+    metrics.incr('login.invalid')
+    return INVALID, None
@@ -0,0 +1,85 @@
+# users/management/commands/bench_login.py
+import random
+import secrets
+import time
+from collections import Counter, defaultdict
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory
+
+from educa_digital.users.views import CustomLoginView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão do CustomLoginView com uma mistura de credenciais válidas, '
+        'senhas erradas, usernames inexistentes e usuários inativos. '
+        'Os usuários de teste são criados numa transação desfeita ao final.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--bad-ratio', type=float, default=0.8,
+                            help='Fração de tentativas com credenciais inválidas.')
+        parser.add_argument('--users', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        prefix = 'bench-%s-' % secrets.token_hex(4)
+        password = 'Senha-Bench-123'
+        active = [
+            User.objects.create_user(prefix + str(i), password=password).username
+            for i in range(options['users'])
+        ]
+        inactive = User.objects.create_user(prefix + 'inativo', password=password, is_active=False).username
+
+        scenarios = {
+            'valida': lambda: (random.choice(active), password),
+            'senha errada': lambda: (random.choice(active), 'errada'),
+            'inexistente': lambda: (prefix + secrets.token_hex(4), 'errada'),
+            'inativo': lambda: (inactive, password),
+        }
+        bad = ['senha errada', 'inexistente']
+
+        view = CustomLoginView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+        timings = defaultdict(list)
+        statuses = defaultdict(Counter)
+
+        started = time.perf_counter()
+        for _ in range(options['requests']):
+            if random.random() < options['bad_ratio']:
+                name = random.choice(bad)
+            else:
+                name = random.choice(['valida', 'valida', 'valida', 'inativo'])
+            username, pwd = scenarios[name]()
+            request = factory.post('/users/login/', {'username': username, 'password': pwd}, format='json')
+
+            t0 = time.perf_counter()
+            response = view(request)
+            timings[name].append(time.perf_counter() - t0)
+            statuses[name][response.status_code] += 1
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            '%d requisições em %.2fs: %.1f req/s' % (options['requests'], elapsed, options['requests'] / elapsed)
+        ))
+        for name, values in timings.items():
+            values.sort()
+            self.stdout.write('  %-13s n=%-4d mediana %7.2f ms  p95 %7.2f ms  status %s' % (
+                name, len(values), values[len(values) // 2] * 1e3,
+                values[int(len(values) * 0.95)] * 1e3, dict(statuses[name]),
+            ))
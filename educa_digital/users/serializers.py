@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User, Permission
 from rest_framework import serializers
 
+from educa_digital.core.serializers import CompiledSerializer
+
 class UserSerializer(serializers.ModelSerializer):
     """
     Serializer para exibir detalhes do usuário,
@@ -22,6 +24,20 @@ class UserSerializer(serializers.ModelSerializer):
         return [perm.codename for perm in obj.user_permissions.all()]
 
 
+class UserReadSerializer(CompiledSerializer):
+    """
+    Versão compilada (somente leitura) do UserSerializer, usada no login.
+    """
+    serializer_class = UserSerializer
+
+    def get_permissions(self, obj):
+        if isinstance(obj, dict):
+            queryset = Permission.objects.filter(user=obj['id'])
+        else:
+            queryset = obj.user_permissions.all()
+        return list(queryset.values_list('codename', flat=True))
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     """
     Serializer para criar novos usuários (por padrão, is_active=False).
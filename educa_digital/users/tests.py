@@ -1,3 +1,108 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import base_user
+from django.contrib.auth.models import User, Permission
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+
+from educa_digital.accounts.models import UserProfile
+from educa_digital.core.models import Tenant
+
+from .serializers import UserSerializer, UserReadSerializer
+
+
+class UserReadSerializerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('jose', 'jose@example.com', 'senha123', first_name='José')
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=['add_user', 'view_user']))
+
+    def test_matches_drf_serializer(self):
+        render = JSONRenderer().render
+        expected = render(UserSerializer(self.user).data)
+        self.assertEqual(render(UserReadSerializer().to_representation(self.user)), expected)
+        self.assertEqual(
+            render(UserReadSerializer().serialize_queryset(User.objects.filter(pk=self.user.pk))),
+            render([UserSerializer(self.user).data]),
+        )
+
+
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('jose', 'jose@example.com', 'senha123')
+
+    def test_username_bucket_returns_429_with_retry_after(self):
+        for _ in range(5):
+            response = self.client.post('/users/login/', {'username': 'jose', 'password': 'senha123'})
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post('/users/login/', {'username': 'JOSE', 'password': 'senha123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+class RejectAllBackend:
+    def authenticate(self, request, **credentials):
+        return None
+
+
+@override_settings(LOGIN_LOCKOUT_THRESHOLD=3)
+class CustomLoginViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user('jose', 'jose@example.com', 'senha123')
+        User.objects.create_user('maria', 'maria@example.com', 'senha123', is_active=False)
+
+    def login(self, username, password):
+        return self.client.post('/users/login/', {'username': username, 'password': password})
+
+    def test_invalid_credentials_return_401(self):
+        self.assertEqual(self.login('jose', 'errada').status_code, 401)
+        self.assertEqual(self.login('ninguem', 'errada').status_code, 401)
+
+    def test_inactive_user_only_revealed_with_correct_password(self):
+        self.assertEqual(self.login('maria', 'errada').status_code, 401)
+        self.assertEqual(self.login('maria', 'senha123').status_code, 403)
+
+    def test_wrong_password_costs_one_hash_for_any_account(self):
+        # Ativa, inativa (criada pela matrícula) ou inexistente: o mesmo custo
+        for username in ('jose', 'maria', 'ninguem'):
+            with mock.patch.object(base_user, 'check_password', wraps=base_user.check_password) as check, \
+                    mock.patch.object(base_user, 'make_password', wraps=base_user.make_password) as make:
+                self.assertEqual(self.login(username, 'errada').status_code, 401)
+            self.assertEqual(check.call_count + make.call_count, 1, username)
+
+    def test_credentials_go_through_authentication_backends(self):
+        failures = []
+        handler = lambda sender, credentials, **kwargs: failures.append(credentials['username'])
+        user_login_failed.connect(handler)
+        self.addCleanup(user_login_failed.disconnect, handler)
+
+        self.assertEqual(self.login('jose', 'errada').status_code, 401)
+        self.assertEqual(failures, ['jose'])
+        with override_settings(AUTHENTICATION_BACKENDS=['educa_digital.users.tests.RejectAllBackend']):
+            self.assertEqual(self.login('jose', 'senha123').status_code, 401)
+
+    def test_locked_username_is_rejected_without_queries(self):
+        for _ in range(3):
+            self.login('jose', 'errada')
+        with self.assertNumQueries(0):
+            response = self.login('jose', 'senha123')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+class UserCreateViewTests(TestCase):
+
+    def test_registration_provisions_profile_in_the_request_tenant(self):
+        cache.clear()
+        Tenant.objects.create(nome='Rede Norte', slug='norte')
+        payload = {'username': 'lucia', 'email': 'lucia@example.com', 'password': 'Senha-forte-123'}
+        response = self.client.post('/users/register/', payload, HTTP_X_TENANT='norte')
+        self.assertEqual(response.status_code, 201)
+        profile = UserProfile.objects.get(user__username='lucia')
+        self.assertEqual((profile.tipo_usuario, profile.tenant.slug), ('responsavel', 'norte'))
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import User, Permission
-from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework import status, viewsets, generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -8,8 +8,12 @@ from rest_framework.views import APIView
 
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from educa_digital.accounts import profiles
+from educa_digital.core.throttling import LoginIPThrottle, LoginUsernameThrottle, RegisterIPThrottle
+from . import login
+
 from .serializers import (
-    UserSerializer,
+    UserReadSerializer,
     UserCreateSerializer,
     UserUpdateSerializer,
     PermissionSerializer
@@ -18,7 +22,8 @@ from .serializers import (
 
 class UserCreateView(generics.CreateAPIView):
     """
-    Cria um novo usuário (is_active=False por padrão).
+    Cria um novo usuário (is_active=False por padrão), já com o perfil de
+    responsável na rede da requisição (cabeçalho X-Tenant ou hostname).
 
     Exemplo de requisição POST:
     {
@@ -44,6 +49,14 @@ class UserCreateView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserCreateSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle]
+
+    def perform_create(self, serializer):
+        # Quem se cadastra sozinho é a família que vai matricular; sem o
+        # perfil, o usuário cairia na rede padrão (accounts/profiles.py).
+        with transaction.atomic():
+            user = serializer.save()
+            profiles.provision([(user, 'responsavel')])
 
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -148,6 +161,10 @@ class CustomLoginView(APIView):
       "password": "senha123"
     }
 
+    A verificação (users/login.py) recusa primeiro, sem custo, usernames
+    bloqueados por excesso de falhas; só depois confere a senha e, por último,
+    se o usuário está ativo.
+
     Possíveis respostas:
     - 200 OK (usuário ativo):
       {
@@ -164,30 +181,41 @@ class CustomLoginView(APIView):
           "permissions": ["add_user", "change_user", ...]
         }
       }
+    - 400 Bad Request (username ou password ausentes)
     - 401 Unauthorized (credenciais inválidas)
     - 403 Forbidden (usuário inativo)
+    - 429 Too Many Requests (muitas tentativas ou username bloqueado; ver Retry-After)
     """
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
-        user = authenticate(request, username=username, password=password)
-        
-        if not user.is_active:
-            return Response({'detail': 'Usuário inativo. Aguardando ativação.'},
-                            status=status.HTTP_403_FORBIDDEN)
-            
-        if user is None:
+        if not isinstance(username, str) or not isinstance(password, str) or not username:
+            return Response({'detail': 'Informe username e password.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        result, user = login.check_credentials(request, username, password)
+
+        if result == login.LOCKED:
+            return Response({'detail': 'Muitas tentativas inválidas. Tente novamente mais tarde.'},
+                            status=status.HTTP_429_TOO_MANY_REQUESTS,
+                            headers={'Retry-After': str(user)})
+
+        if result == login.INVALID:
             return Response({'detail': 'Credenciais inválidas.'},
                             status=status.HTTP_401_UNAUTHORIZED)
 
+        if result == login.INACTIVE:
+            return Response({'detail': 'Usuário inativo. Aguardando ativação.'},
+                            status=status.HTTP_403_FORBIDDEN)
 
         refresh = RefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
         # Serializa todos os dados do usuário (incluindo permissões)
-        user_data = UserSerializer(user).data
+        user_data = UserReadSerializer().to_representation(user)
 
         return Response({
             'refresh': str(refresh),
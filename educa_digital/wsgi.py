@@ -7,10 +7,10 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/wsgi/
 """
 
-import os
+from educa_digital.boot import setup_environment
 
-from django.core.wsgi import get_wsgi_application
+setup_environment()
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'educa_digital.settings')
+from django.core.wsgi import get_wsgi_application
 
 application = get_wsgi_application()